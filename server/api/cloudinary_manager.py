@@ -5,10 +5,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import cloudinary
 import cloudinary.uploader
 from pathlib import Path
-from typing import Dict, Optional
-import cairosvg
-import io
-from PIL import Image
+from typing import Callable, Dict, Optional
+from utils.render_service import save_png
 
 # Configure environment for headless operation
 os.environ['QT_QPA_PLATFORM'] = 'offscreen'
@@ -96,18 +94,9 @@ class CloudinaryManager:
                 print(f"❌ SVG file not found: {svg_path}")
                 return False
             
-            # Set fontconfig path if not already set
-            if not os.environ.get('FONTCONFIG_PATH'):
-                os.environ['FONTCONFIG_PATH'] = '/etc/fonts'
-            
-            # Convert SVG to PNG bytes
-            png_data = cairosvg.svg2png(url=svg_path)
-            
-            # Convert to PIL Image
-            image = Image.open(io.BytesIO(png_data))
-            
-            # Save as PNG
-            image.save(png_path, 'PNG')
+            # Identical drawings reuse the render the pipeline already made
+            with open(svg_path, 'rb') as f:
+                save_png(f.read(), png_path)
             
             print(f"✅ SVG converted to PNG: {png_path}")
             return True
@@ -117,15 +106,23 @@ class CloudinaryManager:
             print("💡 This might be due to missing fontconfig or cairo dependencies")
             return False
 
-    def upload_original_svg_as_png(self) -> Optional[str]:
+    def _public_id(self, name: str, job_id: Optional[str]) -> str:
+        """Namespace public IDs by job so concurrent jobs don't overwrite each other"""
+        return f"{job_id}/{name}" if job_id else name
+
+    def upload_original_svg_as_png(self, files_dir: str = "files", job_id: Optional[str] = None) -> Optional[str]:
         """
         Convert original.svg to PNG and upload to Cloudinary
         
+        Args:
+            files_dir: Directory holding original.svg (the job workspace)
+            job_id: Job ID used to namespace the public ID
+        
         Returns:
             URL of the uploaded original.png or None if upload failed
         """
         try:
-            files_dir = Path("files")
+            files_dir = Path(files_dir)
             svg_path = files_dir / "original.svg"
             png_path = files_dir / "original.png"
             
@@ -138,7 +135,7 @@ class CloudinaryManager:
                 return None
             
             # Upload PNG to Cloudinary
-            url = self.upload_image(str(png_path), "original")
+            url = self.upload_image(str(png_path), self._public_id("original", job_id))
             
             # Clean up temporary PNG file
             if png_path.exists():
@@ -151,18 +148,22 @@ class CloudinaryManager:
             print(f"❌ Error uploading original SVG as PNG: {e}")
             return None
 
-    def upload_processing_results(self, step_results: Dict[str, int]) -> Dict[str, str]:
+    def upload_processing_results(self, step_results: Dict[str, int], files_dir: str = "files", job_id: Optional[str] = None,
+                                  on_upload: Optional[Callable[[str, str], None]] = None) -> Dict[str, str]:
         """
         Upload only PNG result images to Cloudinary
         
         Args:
             step_results: Dictionary containing step counts
+            files_dir: Directory holding the result images (the job workspace)
+            job_id: Job ID used to namespace the public IDs
+            on_upload: Optional callable(step_name, url) called after each successful upload
             
         Returns:
             Dictionary mapping step names to Cloudinary URLs
         """
         uploaded_urls = {}
-        files_dir = Path("files")
+        files_dir = Path(files_dir)
         
         # Only upload PNG result images
         png_files = {
@@ -177,9 +178,11 @@ class CloudinaryManager:
         for step_name, filename in png_files.items():
             file_path = files_dir / filename
             if file_path.exists():
-                url = self.upload_image(str(file_path), step_name)
+                url = self.upload_image(str(file_path), self._public_id(step_name, job_id))
                 if url:
                     uploaded_urls[step_name] = url
+                    if on_upload:
+                        on_upload(step_name, url)
             else:
                 
                 print(f"⚠️  File not found: {file_path}", "warning")
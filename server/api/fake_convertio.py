@@ -0,0 +1,116 @@
+"""
+Local stand-in for the Convertio API, for exercising ConvertioConverter without
+network access or API credits.
+
+Run it with:
+    uvicorn api.fake_convertio:app --port 8001
+and point the server at it:
+    CONVERTIO_BASE_URL=http://127.0.0.1:8001/convert CONVERTIO_API_KEY=test
+
+Conversions report "convert" for FAKE_CONVERTIO_DELAY seconds after upload
+(default 1) and then "finish". The converted file is FAKE_CONVERTIO_SVG if set,
+otherwise a minimal SVG. Uploads whose body doesn't start with %PDF fail.
+"""
+import os
+import time
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+app = FastAPI(title="Fake Convertio", description="Local stand-in for the Convertio API")
+
+CONVERSION_DELAY = float(os.getenv("FAKE_CONVERTIO_DELAY", "1"))
+FAKE_SVG_PATH = os.getenv("FAKE_CONVERTIO_SVG")
+DEFAULT_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100">'
+    '<path id="path1" style="fill:none;stroke:#000000" d="m 10,10 h 80 v 80 h -80 z" />'
+    '</svg>'
+)
+
+# Conversions by id
+conversions: Dict[str, Dict[str, Any]] = {}
+
+
+def error(message: str, code: int = 422) -> JSONResponse:
+    """Convertio-style error body"""
+    return JSONResponse(content={"code": code, "status": "error", "error": message}, status_code=code)
+
+
+def converted_svg() -> bytes:
+    if FAKE_SVG_PATH:
+        with open(FAKE_SVG_PATH, "rb") as f:
+            return f.read()
+    return DEFAULT_SVG.encode("utf-8")
+
+
+@app.post("/convert")
+async def start_conversion(request: Request):
+    """Start a conversion job"""
+    body = await request.json()
+    if not body.get("apikey"):
+        return error("No API key provided", 401)
+    if body.get("outputformat") != "svg":
+        return error("Only svg output is supported")
+
+    conv_id = uuid.uuid4().hex
+    conversions[conv_id] = {"uploaded_at": None, "size": 0, "failed": False}
+    return {"code": 200, "status": "ok", "data": {"id": conv_id, "minutes": 1}}
+
+
+@app.put("/convert/{conv_id}/upload")
+async def upload_file(conv_id: str, request: Request):
+    """Receive the input file"""
+    conversion = conversions.get(conv_id)
+    if conversion is None:
+        return error("Conversion not found")
+
+    size = 0
+    first_bytes = b""
+    async for chunk in request.stream():
+        if len(first_bytes) < 4:
+            first_bytes += chunk[:4]
+        size += len(chunk)
+
+    conversion["size"] = size
+    conversion["uploaded_at"] = time.monotonic()
+    conversion["failed"] = not first_bytes.startswith(b"%PDF")
+    return {"code": 200, "status": "ok", "data": {"id": conv_id, "file": "upload", "size": size}}
+
+
+@app.get("/convert/{conv_id}/status")
+async def conversion_status(conv_id: str, request: Request):
+    """Report the conversion step, with the output URL once finished"""
+    conversion = conversions.get(conv_id)
+    if conversion is None:
+        return error("Conversion not found")
+
+    data: Dict[str, Any] = {"id": conv_id, "step_percent": 0}
+    if conversion["uploaded_at"] is None:
+        data["step"] = "wait"
+    elif conversion["failed"]:
+        data["step"] = "failed"
+    elif time.monotonic() - conversion["uploaded_at"] < CONVERSION_DELAY:
+        data["step"] = "convert"
+    else:
+        data["step"] = "finish"
+        data["step_percent"] = 100
+        data["output"] = {
+            "url": str(request.url_for("download_file", conv_id=conv_id)),
+            "size": len(converted_svg())
+        }
+    return {"code": 200, "status": "ok", "data": data}
+
+
+@app.get("/files/{conv_id}.svg")
+async def download_file(conv_id: str):
+    """Serve the converted SVG"""
+    if conv_id not in conversions:
+        return error("Conversion not found", 404)
+    return Response(content=converted_svg(), media_type="image/svg+xml")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8001)
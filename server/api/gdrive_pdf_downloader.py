@@ -1,13 +1,38 @@
 import requests
 import os
 import sys
+import json
+import shutil
+import hashlib
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from typing import Optional
+from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.disk_cache import DiskCache, cache_enabled, cache_limit_bytes
+from utils.config_manager import config_manager
+
+# Google Drive download URL template
+GOOGLE_DRIVE_DOWNLOAD_URL = "https://drive.google.com/uc?export=download&id="
+
+# Stream downloads in 1 MB chunks instead of buffering the whole PDF
+CHUNK_SIZE = 1024 * 1024
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (10, 120)
+
+CACHED_PDF = "original.pdf"
+CACHED_META = "meta.json"
 
 # Global variable to store upload_id (will be set from main.py)
 global_upload_id = None
 
+# Shared HTTP session, created once per process
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_download_cache: Optional[DiskCache] = None
+
 def set_global_upload_id(upload_id: str):
     """Set the global upload_id variable"""
     global global_upload_id
@@ -20,10 +45,94 @@ def get_global_upload_id() -> Optional[str]:
     global global_upload_id
     return global_upload_id
 
+def get_session() -> requests.Session:
+    """
+    Get the shared HTTP session with a connection pool and retries
+    
+    Returns:
+        requests.Session: Session reused by every download in this process
+    """
+    global _session, _session_pid
+    # Sockets must not be shared with forked worker processes
+    if _session is None or _session_pid != os.getpid():
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        _session = requests.Session()
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+        _session_pid = os.getpid()
+    return _session
+
+def get_download_cache() -> DiskCache:
+    """Get the cache of downloaded PDFs"""
+    global _download_cache
+    if _download_cache is None:
+        _download_cache = DiskCache("downloads", cache_limit_bytes("downloads_max_mb", 2048))
+    return _download_cache
+
+def _cache_key(file_id: str) -> str:
+    return hashlib.sha256(file_id.encode("utf-8")).hexdigest()
+
+def _read_cached(file_id: str) -> Optional[Dict[str, Any]]:
+    """Return the cached metadata (with the cached PDF path) for file_id, or None"""
+    if not cache_enabled():
+        return None
+    entry_dir = get_download_cache().get(_cache_key(file_id))
+    if entry_dir is None:
+        return None
+    try:
+        with open(os.path.join(entry_dir, CACHED_META), 'r') as f:
+            meta = json.load(f)
+        meta["path"] = os.path.join(entry_dir, CACHED_PDF)
+        return meta if os.path.exists(meta["path"]) else None
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _store_cached(file_id: str, file_path: str, meta: Dict[str, Any]) -> None:
+    """Copy a downloaded PDF and its validators into the cache"""
+    if not cache_enabled():
+        return
+    staging_path = f"{file_path}.cache"
+    try:
+        shutil.copyfile(file_path, staging_path)
+        get_download_cache().put(
+            _cache_key(file_id),
+            {CACHED_META: json.dumps(meta).encode("utf-8")},
+            move_files={CACHED_PDF: staging_path}
+        )
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+
+def _refresh_cached(cached: Dict[str, Any]) -> None:
+    """Mark a revalidated cache entry as fresh again"""
+    meta = {key: value for key, value in cached.items() if key != "path"}
+    meta["fetched_at"] = time.time()
+    meta_path = os.path.join(os.path.dirname(cached["path"]), CACHED_META)
+    try:
+        with open(f"{meta_path}.tmp", 'w') as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+    except OSError as e:
+        print(f"⚠️  Could not refresh cached download: {e}")
+
+def _use_cached(cached: Dict[str, Any], file_path: str, reason: str) -> str:
+    """Copy the cached PDF into the output folder"""
+    shutil.copyfile(cached["path"], file_path)
+    print(f"♻️  Using cached PDF ({reason})")
+    print(f"File saved to: {file_path}")
+    print(f"File size: {os.path.getsize(file_path)} bytes")
+    return file_path
+
 def download_pdf_from_drive(file_id: str = None, output_folder: str = "files") -> str:
     """
     Download a PDF file from Google Drive and save it as original.pdf
     
+    The file is streamed to disk in chunks. Downloads are cached by file ID:
+    a cached copy younger than cache.downloads_ttl_seconds is used directly,
+    older ones are revalidated with a conditional request (ETag/Last-Modified)
+    and, when Drive sends no validators, by comparing content hashes.
+    
     Args:
         file_id (str): The Google Drive file ID (if None, uses global_upload_id)
         output_folder (str): The folder to save the file in (default: "files")
@@ -42,38 +151,72 @@ def download_pdf_from_drive(file_id: str = None, output_folder: str = "files") -
         
         print(f"Using global upload_id: {file_id}")
     
-    # Google Drive download URL template
-    GOOGLE_DRIVE_DOWNLOAD_URL = "https://drive.google.com/uc?export=download&id="
+    # Create output folder if it doesn't exist
+    os.makedirs(output_folder, exist_ok=True)
+    file_path = os.path.join(output_folder, "original.pdf")
+    part_path = f"{file_path}.part"
+    
+    cached = _read_cached(file_id)
+    ttl = config_manager.get_cache_config().get("downloads_ttl_seconds", 300)
+    if cached and time.time() - cached.get("fetched_at", 0) < ttl:
+        return _use_cached(cached, file_path, "fresh")
     
     try:
         
         print(f"Attempting to download file with ID: {file_id}")
         
-        # Create output folder if it doesn't exist
-        os.makedirs(output_folder, exist_ok=True)
-        
         # Construct download URL
         download_url = f"{GOOGLE_DRIVE_DOWNLOAD_URL}{file_id}"
         print(f"Download URL: {download_url}")
         
-        # Use a session to handle cookies and redirects
-        session = requests.Session()
-        response = session.get(download_url, allow_redirects=True)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
         
-        print(f"Response status code: {response.status_code}")
-        
-        if response.status_code != 200:
-            raise Exception(f"File not found or not accessible. Status code: {response.status_code}")
+        # The shared session handles cookies, redirects and connection reuse
+        with get_session().get(download_url, headers=headers, allow_redirects=True, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            print(f"Response status code: {response.status_code}")
+            
+            if response.status_code == 304 and cached:
+                _refresh_cached(cached)
+                return _use_cached(cached, file_path, "not modified")
+            
+            if response.status_code != 200:
+                raise Exception(f"File not found or not accessible. Status code: {response.status_code}")
 
-        # Check if we got a PDF file
-        content_type = response.headers.get('content-type', '')
-        if 'application/pdf' not in content_type and 'application/octet-stream' not in content_type:
-            print(f"Warning: Unexpected content type: {content_type}", "warning")
+            # Check if we got a PDF file
+            content_type = response.headers.get('content-type', '')
+            if 'application/pdf' not in content_type and 'application/octet-stream' not in content_type:
+                print(f"Warning: Unexpected content type: {content_type}", "warning")
 
+            # Stream to a temporary file and hash as we go
+            digest = hashlib.sha256()
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+            
+            meta = {
+                "file_id": file_id,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha256": digest.hexdigest(),
+                "size": os.path.getsize(part_path),
+                "fetched_at": time.time()
+            }
+        
         # Save the file as original.pdf
-        file_path = os.path.join(output_folder, "original.pdf")
-        with open(file_path, 'wb') as f:
-            f.write(response.content)
+        os.replace(part_path, file_path)
+        
+        if cached and cached.get("sha256") == meta["sha256"]:
+            print("♻️  Downloaded PDF matches the cached copy")
+            _refresh_cached(cached)
+        else:
+            _store_cached(file_id, file_path, meta)
         
         print(f"File saved to: {file_path}")
         print(f"File size: {os.path.getsize(file_path)} bytes")
@@ -83,11 +226,17 @@ def download_pdf_from_drive(file_id: str = None, output_folder: str = "files") -
     except requests.exceptions.RequestException as e:
         
         print(f"Request error: {str(e)}", "error")
+        if cached:
+            # Drive unreachable: a cached copy is better than failing the job
+            return _use_cached(cached, file_path, "revalidation failed")
         raise Exception(f"Download failed: {str(e)}")
     except Exception as e:
         
         print(f"Unexpected error: {str(e)}", "error")
         raise Exception(str(e))
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
 
 def download_with_global_id(output_folder: str = "files") -> str:
     """
@@ -1,11 +1,23 @@
 import os
 import json
+import multiprocessing
 import datetime
+import hashlib
+import re
+import shutil
+import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
+from PIL import Image
+from utils.config_manager import config_manager
+from utils.disk_cache import DiskCache, cache_enabled, cache_limit_bytes
 
 # Configure tesseract path for Railway deployment
 if os.path.exists('/usr/bin/tesseract'):
@@ -20,12 +32,554 @@ elif os.path.exists('/nix/store'):
     except:
         pass
 
-def extract_text_from_pdf(pdf_path: str = None) -> str:
+# Bump when a change to rendering or OCR makes cached page text stale
+OCR_CACHE_FORMAT = 2
+CACHED_TEXT = "text.txt"
+PREPROCESS_MODES = ("none", "grayscale", "binarize")
+PAGE_SELECTION_PATTERN = re.compile(r"^\s*\d+(\s*-\s*\d+)?(\s*,\s*\d+(\s*-\s*\d+)?)*\s*$")
+
+# A page, or one named region of a page: the unit of OCR work
+OcrItem = Tuple[int, Optional[str]]
+
+_ocr_cache = None
+
+def get_ocr_cache() -> DiskCache:
+    """Get the cache of OCR'd page text"""
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = DiskCache("ocr", cache_limit_bytes("ocr_max_mb", 256))
+    return _ocr_cache
+
+def get_ocr_options(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    OCR options from the ocr section of config.json, with per-request overrides
+    
+    Args:
+        overrides: Optional values for "dpi", "preprocess", "pages" and "regions".
+            "regions" may name a subset of the configured regions (a list or a
+            comma-separated string), or be "page" to OCR whole pages.
+    
+    Returns:
+        Dict[str, Any]: dpi, preprocess, binarize_threshold, pages and regions
+        ({name: (x, y, width, height)} as fractions of the page)
+    
+    Raises:
+        ValueError: If an option is invalid
+    """
+    config = config_manager.get_ocr_config()
+    overrides = {key: value for key, value in (overrides or {}).items() if value is not None}
+    
+    try:
+        dpi = int(overrides.get("dpi", config.get("dpi", 200)))
+        threshold = int(config.get("binarize_threshold", 160))
+    except (TypeError, ValueError):
+        raise ValueError("OCR dpi and binarize_threshold must be integers")
+    if not 50 <= dpi <= 1200:
+        raise ValueError(f"OCR dpi must be between 50 and 1200, got {dpi}")
+    
+    preprocess = overrides.get("preprocess", config.get("preprocess", "none"))
+    if preprocess not in PREPROCESS_MODES:
+        raise ValueError(f"OCR preprocess must be one of {', '.join(PREPROCESS_MODES)}, got {preprocess!r}")
+    
+    pages = overrides.get("pages", config.get("pages"))
+    if isinstance(pages, str) and pages != "all" and not PAGE_SELECTION_PATTERN.match(pages):
+        raise ValueError(f"Invalid page selection: {pages!r}")
+    
+    regions = {}
+    for name, box in (config.get("regions") or {}).items():
+        try:
+            x, y, width, height = (float(value) for value in box)
+        except (TypeError, ValueError):
+            raise ValueError(f"OCR region {name!r} must be [x, y, width, height]")
+        if not (0 <= x < 1 and 0 <= y < 1 and 0 < width and 0 < height and x + width <= 1.0001 and y + height <= 1.0001):
+            raise ValueError(f"OCR region {name!r} must lie within the page (fractions from 0 to 1)")
+        regions[name] = (x, y, width, height)
+    
+    selected = overrides.get("regions")
+    if selected is not None:
+        if isinstance(selected, str):
+            selected = [name.strip() for name in selected.split(",") if name.strip()]
+        if selected == ["page"]:
+            regions = {}
+        else:
+            unknown = [name for name in selected if name not in regions]
+            if unknown:
+                raise ValueError(f"Unknown OCR regions: {', '.join(unknown)}")
+            regions = {name: regions[name] for name in selected}
+    
+    return {
+        "dpi": dpi,
+        "preprocess": preprocess,
+        "binarize_threshold": threshold,
+        "pages": pages,
+        "regions": regions,
+    }
+
+def parse_page_selection(selection: Any, page_count: int) -> List[int]:
+    """
+    Turn a page selection into sorted 1-based page numbers
+    
+    Args:
+        selection: None or "all" for every page, a page number, a list of page
+            numbers, or a string such as "1-3,5"
+        page_count (int): Number of pages in the PDF
+    
+    Returns:
+        List[int]: The selected pages that exist in the PDF
+    
+    Raises:
+        ValueError: If the selection can't be parsed
+    """
+    if selection is None or selection == "all":
+        return list(range(1, page_count + 1))
+    
+    if isinstance(selection, int):
+        selection = [selection]
+    if isinstance(selection, str):
+        pages = set()
+        for part in selection.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                if "-" in part:
+                    first, last = (int(value) for value in part.split("-", 1))
+                    pages.update(range(first, last + 1))
+                else:
+                    pages.add(int(part))
+            except ValueError:
+                raise ValueError(f"Invalid page selection: {selection!r}")
+    else:
+        pages = {int(page) for page in selection}
+    
+    missing = sorted(page for page in pages if not 1 <= page <= page_count)
+    if missing:
+        print(f"⚠️  Ignoring pages not in the PDF: {missing}")
+    return sorted(page for page in pages if 1 <= page <= page_count)
+
+def pdf_sha256(pdf_path: str) -> str:
+    """SHA-256 of a PDF's contents"""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def ocr_settings(options: Dict[str, Any], region: Optional[str] = None, tesseract_version: str = "") -> Dict[str, Any]:
+    """Everything besides the PDF and page number that changes the OCR output of one item"""
+    return {
+        "format": OCR_CACHE_FORMAT,
+        "dpi": options["dpi"],
+        "preprocess": options["preprocess"],
+        "binarize_threshold": options["binarize_threshold"] if options["preprocess"] == "binarize" else None,
+        "crop": list(options["regions"][region]) if region is not None else None,
+        "tesseract": tesseract_version,
+    }
+
+def ocr_cache_key(pdf_hash: str, page: int, settings: Dict[str, Any]) -> str:
+    """Cache key of one page's (or region's) OCR text"""
+    key_data = json.dumps([pdf_hash, page, settings], sort_keys=True)
+    return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+def _read_cached_items(pdf_hash: str, items: List[OcrItem], options: Dict[str, Any], tesseract_version: str) -> Dict[OcrItem, str]:
+    """Return the cached OCR text of whichever items are cached"""
+    texts = {}
+    if not cache_enabled():
+        return texts
+    cache = get_ocr_cache()
+    for page, region in items:
+        settings = ocr_settings(options, region, tesseract_version)
+        path = cache.get_file(ocr_cache_key(pdf_hash, page, settings), CACHED_TEXT)
+        if path is None:
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                texts[(page, region)] = f.read()
+        except OSError:
+            continue
+    return texts
+
+def _store_cached_items(pdf_hash: str, texts: Dict[OcrItem, str], options: Dict[str, Any], tesseract_version: str) -> None:
+    """Cache freshly OCR'd text"""
+    if not cache_enabled():
+        return
+    cache = get_ocr_cache()
+    for (page, region), text in texts.items():
+        settings = ocr_settings(options, region, tesseract_version)
+        cache.put(ocr_cache_key(pdf_hash, page, settings), {CACHED_TEXT: text.encode("utf-8")})
+
+def get_ocr_workers() -> int:
+    """OCR pool size: OCR_WORKERS env var, then ocr.workers in config.json, then CPU count"""
+    value = os.environ.get("OCR_WORKERS") or config_manager.get_ocr_config().get("workers")
+    try:
+        if value:
+            return max(1, int(value))
+    except (TypeError, ValueError):
+        print(f"⚠️  Invalid OCR workers value {value!r}, using CPU count")
+    return os.cpu_count() or 1
+
+def page_size_points(pdf_path: str, page: int) -> Tuple[float, float]:
+    """
+    Size of a page in points as rendered (width and height swapped for
+    pages rotated by 90 or 270 degrees)
+    """
+    result = subprocess.run(
+        ["pdfinfo", "-f", str(page), "-l", str(page), pdf_path],
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    size_match = re.search(r"^Page\s+\d+\s+size:\s+([\d.]+) x ([\d.]+)", result.stdout, re.MULTILINE)
+    if result.returncode != 0 or size_match is None:
+        raise RuntimeError(f"Could not read the size of page {page}: {result.stderr.strip()}")
+    
+    width, height = float(size_match.group(1)), float(size_match.group(2))
+    rotation_match = re.search(r"^Page\s+\d+\s+rot:\s+(\d+)", result.stdout, re.MULTILINE)
+    if rotation_match and int(rotation_match.group(1)) % 180 == 90:
+        width, height = height, width
+    return width, height
+
+def crop_box_pixels(pdf_path: str, page: int, box: Tuple[float, float, float, float], dpi: int) -> List[int]:
+    """Convert a page-relative region into x, y, width, height pixels at the given resolution"""
+    page_width, page_height = page_size_points(pdf_path, page)
+    scale = dpi / 72.0
+    x, y, width, height = box
+    return [
+        int(x * page_width * scale),
+        int(y * page_height * scale),
+        max(1, round(width * page_width * scale)),
+        max(1, round(height * page_height * scale)),
+    ]
+
+def render_page(pdf_path: str, page: int, options: Dict[str, Any], region: Optional[str] = None) -> Image.Image:
+    """
+    Render a page, or only one named region of it, ready for OCR
+    
+    Regions are cropped by pdftoppm while rendering, so the rest of the sheet is
+    never rasterized.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        page (int): 1-based page number
+        options: OCR options from get_ocr_options
+        region: Name of a region in options["regions"], or None for the whole page
+    
+    Returns:
+        Image.Image: The rendered (and preprocessed) image
+    """
+    grayscale = options["preprocess"] != "none"
+    if region is None:
+        images = convert_from_path(pdf_path, dpi=options["dpi"], first_page=page, last_page=page, grayscale=grayscale)
+        if not images:
+            raise RuntimeError(f"Page {page} could not be rendered")
+        image = images[0]
+    else:
+        x, y, width, height = crop_box_pixels(pdf_path, page, options["regions"][region], options["dpi"])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            command = [
+                "pdftoppm", "-f", str(page), "-l", str(page), "-r", str(options["dpi"]),
+                "-x", str(x), "-y", str(y), "-W", str(width), "-H", str(height),
+                "-png", "-singlefile"
+            ]
+            if grayscale:
+                command.append("-gray")
+            output_root = os.path.join(tmp_dir, "crop")
+            result = subprocess.run(command + [pdf_path, output_root], capture_output=True, timeout=300)
+            if result.returncode != 0:
+                raise RuntimeError(f"pdftoppm failed: {result.stderr.decode(errors='replace').strip()}")
+            image = Image.open(f"{output_root}.png")
+            image.load()
+    
+    if options["preprocess"] == "binarize":
+        threshold = options["binarize_threshold"]
+        binarized = image.convert("L").point(lambda value: 255 if value >= threshold else 0)
+        image.close()
+        image = binarized
+    return image
+
+def ocr_page(pdf_path: str, page: int, options: Optional[Dict[str, Any]] = None, region: Optional[str] = None) -> str:
+    """
+    Render a single page (or one region of it) and OCR it
+    
+    Only this page is rasterized, so a worker holds at most one page image.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        page (int): 1-based page number
+        options: OCR options (get_ocr_options() if None)
+        region: Name of a region to OCR instead of the whole page
+    
+    Returns:
+        str: The page's text
+    """
+    image = render_page(pdf_path, page, options or get_ocr_options(), region)
+    try:
+        return pytesseract.image_to_string(image)
+    finally:
+        image.close()
+
+def _ocr_items(pdf_path: str, items: List[OcrItem], options: Dict[str, Any], progress_callback=None) -> Dict[OcrItem, str]:
+    """
+    OCR the given pages or page regions across a process pool and return {item: text}
+    
+    Items that fail are logged and left out. If the pool can't be used the
+    remaining items are processed in this process.
+    """
+    texts: Dict[OcrItem, str] = {}
+    finished = set()
+    
+    def item_done(item):
+        finished.add(item)
+        page, region = item
+        label = f"page {page}" if region is None else f"{region} of page {page}"
+        print(f"📖 OCR finished for {label} ({len(finished)}/{len(items)})")
+        if progress_callback:
+            progress_callback(len(finished), len(items))
+    
+    workers = min(get_ocr_workers(), len(items))
+    if workers > 1:
+        try:
+            print(f"🔀 Running OCR on {len(items)} items with {workers} workers")
+            # Spawned, not forked: this runs in a thread of a job process that is
+            # also running the pipeline, and forking a multithreaded process can deadlock
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = {
+                    executor.submit(ocr_page, pdf_path, page, options, region): (page, region)
+                    for page, region in items
+                }
+                for future in as_completed(futures):
+                    item = futures[future]
+                    try:
+                        texts[item] = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as ocr_error:
+                        print(f"⚠️  OCR failed for {item}: {ocr_error}")
+                    item_done(item)
+        except Exception as pool_error:
+            print(f"⚠️  OCR pool unavailable ({pool_error}), continuing in this process")
+    
+    for item in items:
+        if item in finished:
+            continue
+        try:
+            texts[item] = ocr_page(pdf_path, item[0], options, item[1])
+        except Exception as ocr_error:
+            print(f"⚠️  OCR failed for {item}: {ocr_error}")
+        item_done(item)
+    
+    return texts
+
+def _run_pdftotext(arguments: List[str], pdf_path: str) -> Optional[str]:
+    """Run pdftotext with the given options and return its output, or None on failure"""
+    try:
+        result = subprocess.run(
+            ["pdftotext", "-layout", "-enc", "UTF-8"] + arguments + [pdf_path, "-"],
+            capture_output=True,
+            timeout=120
+        )
+    except subprocess.TimeoutExpired:
+        print("⚠️  pdftotext timed out")
+        return None
+    
+    if result.returncode != 0:
+        print(f"⚠️  pdftotext failed: {result.stderr.decode(errors='replace').strip()}")
+        return None
+    return result.stdout.decode("utf-8", errors="replace")
+
+def extract_text_layer(pdf_path: str) -> Dict[int, str]:
     """
-    Extract text from a PDF file using OCR, print it to console, and store in data.json
+    Read the embedded text of every page with pdftotext
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+    
+    Returns:
+        Dict[int, str]: Text by 1-based page number (empty if pdftotext is unavailable)
+    """
+    if shutil.which("pdftotext") is None:
+        print("⚠️  pdftotext not found, every page will be OCR'd")
+        return {}
+    
+    output = _run_pdftotext([], pdf_path)
+    if output is None:
+        return {}
+    
+    # pdftotext ends every page with a form feed
+    return {page: text for page, text in enumerate(output.split("\f"), start=1)}
+
+def extract_region_text_layer(pdf_path: str, page: int, box: Tuple[float, float, float, float]) -> str:
+    """Read the embedded text inside a page-relative region of one page"""
+    # At 72 dpi pdftotext's crop area is in points
+    x, y, width, height = crop_box_pixels(pdf_path, page, box, 72)
+    output = _run_pdftotext(
+        ["-f", str(page), "-l", str(page), "-r", "72",
+         "-x", str(x), "-y", str(y), "-W", str(width), "-H", str(height)],
+        pdf_path
+    )
+    return (output or "").rstrip("\f")
+
+def extract_pdf_pages(pdf_path: str, progress_callback=None, options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Extract the text of the selected pages, reading the embedded text layer first
+    and OCR'ing only the pages without usable text
+    
+    When regions are configured only those parts of each page are read or OCR'd;
+    a region whose text layer is blank (e.g. a scanned title block pasted onto a
+    page with text) is OCR'd even if the rest of the page has text. OCR'd text is cached by (PDF SHA-256, page, OCR settings), so only pages
+    (or regions) that were never OCR'd before go through Tesseract.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        progress_callback: Optional callable(done, total) called as pages (or regions) finish
+        options: OCR options from get_ocr_options (the config.json settings if None)
+    
+    Returns:
+        List[Dict[str, Any]]: One entry per selected page in order, with "page", "text",
+        "method" ("text_layer", "ocr" or "failed"; "ocr" if any region was OCR'd),
+        "cached" and, in region mode, "regions" ({name: text})
+    """
+    options = options or get_ocr_options()
+    config = config_manager.get_ocr_config()
+    min_chars = config.get("min_text_chars", 20)
+    
+    # Read the page count without rendering anything
+    page_count = pdfinfo_from_path(pdf_path)["Pages"]
+    pages = parse_page_selection(options["pages"], page_count)
+    print(f"📊 PDF has {page_count} pages, extracting {len(pages)}")
+    
+    regions = list(options["regions"]) or [None]
+    items = [(page, region) for page in pages for region in regions]
+    texts: Dict[OcrItem, str] = {}
+    methods: Dict[OcrItem, str] = {}
+    cached_items = set()
+    
+    text_layer = extract_text_layer(pdf_path) if config.get("text_layer", True) else {}
+    layer_pages = [page for page in pages if len(text_layer.get(page, "").strip()) >= min_chars]
+    for page in layer_pages:
+        for region in regions:
+            if region is None:
+                text = text_layer[page]
+            else:
+                text = extract_region_text_layer(pdf_path, page, options["regions"][region])
+                if not text.strip():
+                    # Nothing embedded in this part of the page; OCR it instead
+                    continue
+            texts[(page, region)] = text
+            methods[(page, region)] = "text_layer"
+    
+    ocr_needed = [item for item in items if item not in texts]
+    print(f"📄 {len(layer_pages)} pages have a text layer, {len(ocr_needed)} of {len(items)} items need OCR")
+    if progress_callback and texts:
+        progress_callback(len(texts), len(items))
+    
+    if ocr_needed:
+        tesseract_version = None
+        try:
+            tesseract_version = str(pytesseract.get_tesseract_version())
+            print("✅ Tesseract OCR is available")
+        except Exception as tesseract_error:
+            print(f"❌ Tesseract OCR not available: {tesseract_error}")
+            print("💡 Make sure tesseract is installed and in PATH")
+        
+        if tesseract_version is not None:
+            pdf_hash = pdf_sha256(pdf_path)
+            cached = _read_cached_items(pdf_hash, ocr_needed, options, tesseract_version)
+            if cached:
+                print(f"♻️  {len(cached)} of {len(ocr_needed)} OCR items restored from cache")
+                texts.update(cached)
+                cached_items.update(cached)
+                if progress_callback:
+                    progress_callback(len(texts), len(items))
+            
+            missing = [item for item in ocr_needed if item not in cached]
+            if missing:
+                done_before = len(texts)
+                ocr_texts = _ocr_items(
+                    pdf_path,
+                    missing,
+                    options,
+                    lambda done, total: progress_callback(done_before + done, len(items)) if progress_callback else None
+                )
+                _store_cached_items(pdf_hash, ocr_texts, options, tesseract_version)
+                texts.update(ocr_texts)
+            
+            for item in ocr_needed:
+                if item in texts:
+                    methods[item] = "ocr"
+    
+    results = []
+    for page in pages:
+        page_items = [(page, region) for region in regions]
+        done_items = [item for item in page_items if item in texts]
+        if not done_items:
+            method = "failed"
+        elif any(methods.get(item) == "ocr" for item in done_items):
+            method = "ocr"
+        else:
+            method = "text_layer"
+        
+        entry = {
+            "page": page,
+            "method": method,
+            "cached": bool(done_items) and all(item in cached_items for item in done_items),
+        }
+        if regions == [None]:
+            entry["text"] = texts.get((page, None), "")
+        else:
+            entry["regions"] = {region: texts.get((page, region), "") for region in regions}
+            entry["text"] = "\n".join(
+                f"[{region}]\n{text.strip()}" for region, text in entry["regions"].items() if text.strip()
+            )
+        results.append(entry)
+    
+    return results
+
+def read_pdf_text(pdf_path: str, progress_callback=None, options: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Extract a PDF's text without storing it anywhere
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        progress_callback: Optional callable(done, total) called after each page (or region) is processed
+        options: OCR options from get_ocr_options (the config.json settings if None)
+    
+    Returns:
+        The assembled text and the per-page entries from extract_pdf_pages
+    """
+    print(f"📄 Extracting text from: {pdf_path}")
+    
+    pages = extract_pdf_pages(pdf_path, progress_callback, options)
+    text = assemble_page_text(pages)
+    
+    # Print summary
+    total_chars = len(text)
+    print(f"\n📊 Text extraction summary:")
+    print(f"   - Total pages: {len(pages)}")
+    print(f"   - Text layer pages: {sum(1 for page in pages if page['method'] == 'text_layer')}")
+    print(f"   - OCR pages: {sum(1 for page in pages if page['method'] == 'ocr')}")
+    print(f"   - Total characters extracted: {total_chars}")
+    print(f"   - File size: {os.path.getsize(pdf_path)} bytes")
+    
+    if total_chars == 0:
+        print("⚠️  No text was extracted. This might be a scanned document with poor quality.", "warning")
+    
+    return text, pages
+
+def extract_text_from_pdf(pdf_path: str = None, data_file: str = 'data.json', progress_callback=None, options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Extract text from a PDF file, print it to console, and store in data.json
+    
+    Pages with an embedded text layer are read directly; the rest are rendered one
+    at a time and OCR'd in parallel (see get_ocr_workers). The page texts are
+    reassembled in page order. options selects the DPI, preprocessing, pages and
+    regions (see get_ocr_options).
     
     Args:
         pdf_path (str): Path to the PDF file. If None, uses 'files/original.pdf'
+        data_file (str): data.json to store the text in (the job workspace's data.json)
+        progress_callback: Optional callable(done, total) called after each page (or region) is processed
+        options: OCR options from get_ocr_options (the config.json settings if None)
     
     Returns:
         str: Extracted text from the PDF
@@ -44,58 +598,12 @@ def extract_text_from_pdf(pdf_path: str = None) -> str:
     
     try:
         
-        print(f"📄 Extracting text from: {pdf_path}")
-        
-        # Test tesseract availability
-        try:
-            pytesseract.get_tesseract_version()
-            print("✅ Tesseract OCR is available")
-        except Exception as tesseract_error:
-            print(f"❌ Tesseract OCR not available: {tesseract_error}")
-            print("💡 Make sure tesseract is installed and in PATH")
-            return ""
-        
-        # Convert PDF to images
-        print("🔄 Converting PDF to images for OCR processing...")
-        images = convert_from_path(pdf_path)
-        
-        print(f"📊 PDF has {len(images)} pages")
-        extracted_text = ""
-        
-        # Extract text from each page using OCR
-        for i, image in enumerate(images):
-            print(f"📖 Processing page {i + 1}/{len(images)} with OCR...")
-            
-            try:
-                # Extract text from image using pytesseract
-                text = pytesseract.image_to_string(image)
-                
-                if text.strip():
-                    print(f"📄 Page {i + 1} extracted text:")
-                    print("-" * 50)
-                    print(text)
-                    print("-" * 50)
-                    extracted_text += f"\n--- Page {i + 1} ---\n{text}\n"
-                else:
-                    print(f"⚠️  Page {i + 1} appears to be empty or contains no extractable text", "warning")
-            except Exception as ocr_error:
-                print(f"⚠️  OCR failed for page {i + 1}: {ocr_error}")
-                continue
-        
-        # Print summary
-        total_chars = len(extracted_text)
-        print(f"\n📊 OCR Text extraction summary:")
-        print(f"   - Total pages: {len(images)}")
-        print(f"   - Total characters extracted: {total_chars}")
-        print(f"   - File size: {os.path.getsize(pdf_path)} bytes")
-        
-        if total_chars == 0:
-            print("⚠️  No text was extracted. This might be a scanned document with poor quality.", "warning")
+        extracted_text, pages = read_pdf_text(pdf_path, progress_callback, options)
         
         # Store the extracted text in data.json
         if extracted_text:
             print("💾 Storing extracted text in data.json...")
-            store_text_in_data_json(extracted_text, pdf_path)
+            store_text_in_data_json(extracted_text, pdf_path, data_file, pages)
         
         return extracted_text
         
@@ -104,18 +612,44 @@ def extract_text_from_pdf(pdf_path: str = None) -> str:
         print(f"❌ Error extracting text from PDF: {str(e)}", "error")
         return ""
 
-def store_text_in_data_json(extracted_text: str, pdf_path: str):
+def assemble_page_text(pages: List[Dict[str, Any]]) -> str:
+    """
+    Join page texts in order, with a header per page, printing each page
+    
+    Args:
+        pages: Entries returned by extract_pdf_pages
+    
+    Returns:
+        str: The document text
+    """
+    extracted_text = ""
+    for entry in pages:
+        page, text = entry["page"], entry["text"]
+        if text.strip():
+            print(f"📄 Page {page} extracted text ({entry['method']}):")
+            print("-" * 50)
+            print(text)
+            print("-" * 50)
+            extracted_text += f"\n--- Page {page} ---\n{text}\n"
+        elif entry["method"] != "failed":
+            print(f"⚠️  Page {page} appears to be empty or contains no extractable text", "warning")
+    return extracted_text
+
+def store_text_in_data_json(extracted_text: str, pdf_path: str, data_file: str = 'data.json', pages: Optional[List[Dict[str, Any]]] = None):
     """
     Store the extracted text in data.json file
     
     Args:
         extracted_text (str): The text extracted from the PDF
         pdf_path (str): Path to the original PDF file
+        data_file (str): Path of the data.json file to update
+        pages: Optional per-page entries from extract_pdf_pages; their extraction
+            methods are stored under "text_pages"
     """
     try:
         # Read existing data.json if it exists
-        if os.path.exists('data.json'):
-            with open('data.json', 'r') as file:
+        if os.path.exists(data_file):
+            with open(data_file, 'r') as file:
                 try:
                     data = json.load(file)
                 except json.JSONDecodeError:
@@ -123,11 +657,23 @@ def store_text_in_data_json(extracted_text: str, pdf_path: str):
         else:
             data = {}
         
-        # Update the data with only the extracted text
+        # Update the data with the extracted text and how each page was read
         data['extracted_text'] = extracted_text
+        if pages is not None:
+            data['text_pages'] = []
+            for entry in pages:
+                summary = {
+                    "page": entry["page"],
+                    "method": entry["method"],
+                    "cached": entry.get("cached", False),
+                    "characters": len(entry["text"])
+                }
+                if "regions" in entry:
+                    summary["regions"] = entry["regions"]
+                data['text_pages'].append(summary)
         
         # Write updated data back to data.json
-        with open('data.json', 'w') as file:
+        with open(data_file, 'w') as file:
             json.dump(data, file, indent=4)
         
         
@@ -142,7 +688,7 @@ def store_text_in_data_json(extracted_text: str, pdf_path: str):
 def main():
     """Main function to run text extraction"""
     
-    print("🔍 PDF Text Extractor (OCR)")
+    print("🔍 PDF Text Extractor (text layer + OCR)")
     print("=" * 50)
     
     # Extract text from the original.pdf file
@@ -1,21 +1,24 @@
 import os
 import asyncio
-import requests
+import shutil
+import httpx
 import sys
+from abc import ABC, abstractmethod
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Callable, List, Optional
 import json
 from pydantic import BaseModel
+from utils.config_manager import config_manager
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="PDF to SVG Converter", description="Convert PDF files to SVG format using Convertio API")
+app = FastAPI(title="PDF to SVG Converter", description="Convert PDF files to SVG format locally or with the Convertio API")
 
 # Enable CORS
 app.add_middleware(
@@ -28,16 +31,164 @@ app.add_middleware(
 
 # Configuration
 CONVERTIO_API_KEY = os.getenv('CONVERTIO_API_KEY')
-CONVERTIO_BASE_URL = "https://api.convertio.co/convert"
+# Override to point at another Convertio-compatible server, e.g. api/fake_convertio.py
+CONVERTIO_BASE_URL = os.getenv('CONVERTIO_BASE_URL', "https://api.convertio.co/convert")
 
-class ConvertioConverter:
-    def __init__(self, api_key: str = None):
+# Stream uploads and downloads in 1 MB chunks
+CHUNK_SIZE = 1024 * 1024
+
+# Per-request timeouts; the overall conversion deadline is ConvertioConverter.timeout
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# Backends accepted by SVG_CONVERTER / converter.backend
+CONVERTER_BACKENDS = ("auto", "poppler", "convertio")
+
+# The steps' patterns were written for Convertio's SVG...
+PIPELINE_BACKEND = "convertio"
+# ...so local conversion must be chosen explicitly
+DEFAULT_BACKEND = PIPELINE_BACKEND
+
+class PdfToSvgConverter(ABC):
+    """Interface of the PDF to SVG conversion backends"""
+    name = "base"
+    
+    def is_available(self) -> bool:
+        """Whether the backend can run in this environment"""
+        return True
+    
+    @abstractmethod
+    async def convert(self, pdf_path: str, output_path: str, on_progress: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Convert a PDF to an SVG file
+        
+        Args:
+            pdf_path: Path to the PDF file
+            output_path: Where to write the SVG
+            on_progress: Optional callback receiving progress messages
+        """
+    
+    async def aclose(self) -> None:
+        """Release connections or other resources held between conversions"""
+
+class PopplerConverter(PdfToSvgConverter):
+    """Converts locally with poppler's pdftocairo, which is installed alongside pdf2image's poppler-utils"""
+    name = "poppler"
+    
+    def __init__(self, executable: str = "pdftocairo", page: int = 1, timeout: float = 300):
+        self.executable = executable
+        self.page = page
+        self.timeout = timeout
+    
+    def is_available(self) -> bool:
+        return shutil.which(self.executable) is not None
+    
+    async def convert(self, pdf_path: str, output_path: str, on_progress: Optional[Callable[[str], None]] = None) -> None:
+        part_path = f"{output_path}.part"
+        args = [self.executable, "-svg", "-f", str(self.page), "-l", str(self.page), pdf_path, part_path]
+        
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise Exception(f"pdftocairo timed out after {self.timeout} seconds")
+        
+        if process.returncode != 0 or not os.path.exists(part_path) or os.path.getsize(part_path) == 0:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise Exception(f"pdftocairo failed: {stderr.decode(errors='replace').strip() or process.returncode}")
+        
+        os.replace(part_path, output_path)
+        if on_progress:
+            on_progress("PDF converted locally with pdftocairo")
+
+class FallbackConverter(PdfToSvgConverter):
+    """Tries each backend in order until one succeeds"""
+    
+    def __init__(self, converters: List[PdfToSvgConverter]):
+        self.converters = converters
+        self.name = "+".join(converter.name for converter in converters)
+        self.last_used: Optional[str] = None
+    
+    async def convert(self, pdf_path: str, output_path: str, on_progress: Optional[Callable[[str], None]] = None) -> None:
+        last_error = None
+        for converter in self.converters:
+            try:
+                await converter.convert(pdf_path, output_path, on_progress)
+                self.last_used = converter.name
+                return
+            except Exception as e:
+                last_error = e
+                print(f"⚠️  {converter.name} conversion failed: {e}")
+                if on_progress:
+                    on_progress(f"{converter.name} conversion failed, trying the next backend")
+        raise Exception(f"All converters failed: {last_error}")
+    
+    async def aclose(self) -> None:
+        for converter in self.converters:
+            await converter.aclose()
+
+class ConvertioConverter(PdfToSvgConverter):
+    """
+    Async Convertio API client.
+
+    All requests share one httpx.AsyncClient, kept open across conversions so
+    connections are reused until aclose(). Uploads and downloads are streamed in
+    chunks, and the status is polled with exponential backoff until the
+    conversion finishes or the overall timeout expires.
+    """
+    name = "convertio"
+    
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        timeout: float = 600,
+        poll_initial: float = 0.5,
+        poll_max: float = 5.0,
+        poll_factor: float = 1.5,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         if not api_key:
             api_key = CONVERTIO_API_KEY
         if not api_key:
             raise ValueError("CONVERTIO_API_KEY environment variable is required")
         self.api_key = api_key
-        self.base_url = CONVERTIO_BASE_URL
+        self.base_url = (base_url or CONVERTIO_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.poll_factor = poll_factor
+        # Custom transport, e.g. httpx.ASGITransport(app=fake_convertio.app) in tests
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the HTTP client for the running event loop (connections can't cross loops)"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, follow_redirects=True, transport=self.transport)
+            self._client_loop = loop
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the HTTP client"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    @staticmethod
+    def _json(response: httpx.Response) -> dict:
+        try:
+            return response.json()
+        except ValueError:
+            raise Exception(f"Unexpected response from Convertio (HTTP {response.status_code})")
     
     async def start_conversion(self) -> str:
         """Start a new conversion job"""
@@ -47,8 +198,8 @@ class ConvertioConverter:
             "outputformat": "svg"
         }
         
-        response = requests.post(self.base_url, json=data)
-        result = response.json()
+        response = await self._get_client().post(self.base_url, json=data)
+        result = self._json(response)
         
         if result.get('code') == 200:
             return result['data']['id']
@@ -56,43 +207,156 @@ class ConvertioConverter:
             raise Exception(f"Error starting conversion: {result.get('error')}")
     
     async def upload_file(self, conv_id: str, file_path: str) -> None:
-        """Upload file to the conversion job"""
+        """Upload file to the conversion job, streaming it from disk"""
         upload_url = f"{self.base_url}/{conv_id}/upload"
         
-        with open(file_path, 'rb') as file:
-            response = requests.put(upload_url, data=file)
-            result = response.json()
-            
-            if result.get('code') != 200:
-                raise Exception(f"File upload failed: {result.get('error')}")
+        async def file_chunks():
+            with open(file_path, 'rb') as file:
+                while True:
+                    chunk = await asyncio.to_thread(file.read, CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        
+        headers = {"Content-Length": str(os.path.getsize(file_path))}
+        response = await self._get_client().put(upload_url, content=file_chunks(), headers=headers)
+        result = self._json(response)
+        
+        if result.get('code') != 200:
+            raise Exception(f"File upload failed: {result.get('error')}")
+    
+    async def get_status(self, conv_id: str) -> dict:
+        """Fetch the raw status of a conversion job"""
+        response = await self._get_client().get(f"{self.base_url}/{conv_id}/status")
+        return self._json(response)
     
     async def check_status(self, conv_id: str) -> str:
-        """Check conversion status and return download URL when complete"""
-        status_url = f"{self.base_url}/{conv_id}/status"
+        """
+        Wait for the conversion to finish and return the download URL
+        
+        Polls quickly at first and backs off to poll_max seconds between checks.
+        
+        Raises:
+            Exception: If the conversion fails or doesn't finish within the timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        delay = self.poll_initial
         
         while True:
-            response = requests.get(status_url)
-            result = response.json()
+            result = await self.get_status(conv_id)
             
-            if 'data' in result:
+            if 'data' in result and result['data']:
                 status = result['data'].get('step')
                 
                 if status == "finish" and result['data'].get('output'):
                     return result['data']['output']['url']
                 elif status in ["failed", "error"]:
                     raise Exception("Conversion failed")
+            elif result.get('code') not in (None, 200):
+                raise Exception(f"Conversion failed: {result.get('error')}")
+            
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise Exception(f"Conversion {conv_id} did not finish within {self.timeout} seconds")
             
-            await asyncio.sleep(5)
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * self.poll_factor, self.poll_max)
     
     async def download_file(self, download_url: str, output_path: str) -> None:
-        """Download the converted file"""
-        response = requests.get(download_url)
+        """Download the converted file in chunks"""
+        part_path = f"{output_path}.part"
+        try:
+            async with self._get_client().stream("GET", download_url) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Download of converted file failed: HTTP {response.status_code}")
+                with open(part_path, 'wb') as file:
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        file.write(chunk)
+            os.replace(part_path, output_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+    
+    async def convert(self, pdf_path: str, output_path: str, on_progress: Optional[Callable[[str], None]] = None) -> None:
+        """Run a whole conversion: start, upload, wait and download"""
+        conv_id = await self.start_conversion()
+        print(f"🔄 Conversion started with ID: {conv_id}")
         
-        with open(output_path, 'wb') as file:
-            file.write(response.content)
+        await self.upload_file(conv_id, pdf_path)
+        if on_progress:
+            on_progress("PDF uploaded to conversion service")
+        
+        download_url = await self.check_status(conv_id)
+        await self.download_file(download_url, output_path)
 
-# Initialize converter
-converter = ConvertioConverter(CONVERTIO_API_KEY)
+def get_converter(backend: Optional[str] = None) -> PdfToSvgConverter:
+    """
+    Create the configured PDF to SVG converter
+    
+    Args:
+        backend: "convertio", "poppler" or "auto" (default: SVG_CONVERTER env var,
+            then converter.backend in config.json, then "convertio"). "auto"
+            uses Convertio and falls back to pdftocairo when Convertio fails
+            or no API key is set. pdftocairo writes a different SVG dialect
+            (no path ids, absolute coordinates, rgb() colors) than the one the
+            steps' patterns were written for, so a job that uses it is warned.
+    
+    Returns:
+        The converter
+    
+    Raises:
+        ValueError: If the backend is unknown or no backend is available
+    """
+    settings = config_manager.get_converter_config()
+    backend = (backend or os.getenv("SVG_CONVERTER") or settings.get("backend") or DEFAULT_BACKEND).lower()
+    if backend not in CONVERTER_BACKENDS:
+        raise ValueError(f"Unknown SVG converter backend: {backend}")
+    
+    poppler = PopplerConverter(page=settings.get("page", 1), timeout=settings.get("timeout_seconds", 300))
+    if backend == "poppler":
+        if not poppler.is_available():
+            raise ValueError("pdftocairo not found; install poppler-utils")
+        return poppler
+    convertio_timeout = settings.get("convertio_timeout_seconds", 600)
+    if backend == "convertio":
+        return ConvertioConverter(CONVERTIO_API_KEY, timeout=convertio_timeout)
+    
+    converters = []
+    if CONVERTIO_API_KEY:
+        converters.append(ConvertioConverter(CONVERTIO_API_KEY, timeout=convertio_timeout))
+    if poppler.is_available():
+        converters.append(poppler)
+    if not converters:
+        raise ValueError("No PDF to SVG converter available: install poppler-utils or set CONVERTIO_API_KEY")
+    return converters[0] if len(converters) == 1 else FallbackConverter(converters)
+
+# Converters shared by this app's requests, so connections are reused
+_app_converter: Optional[PdfToSvgConverter] = None
+_status_converter: Optional[ConvertioConverter] = None
+
+def get_app_converter() -> PdfToSvgConverter:
+    """Get or create the converter used by this app's endpoints"""
+    global _app_converter
+    if _app_converter is None:
+        _app_converter = get_converter()
+    return _app_converter
+
+def get_status_converter() -> ConvertioConverter:
+    """Get or create the Convertio client used to look up conversion status"""
+    global _status_converter
+    if _status_converter is None:
+        _status_converter = ConvertioConverter(CONVERTIO_API_KEY)
+    return _status_converter
+
+@app.on_event("shutdown")
+async def close_app_converters():
+    """Close the shared converters' connections"""
+    global _app_converter, _status_converter
+    for converter in (_app_converter, _status_converter):
+        if converter is not None:
+            await converter.aclose()
+    _app_converter = _status_converter = None
 
 # Import the Google Drive downloader
 from gdrive_pdf_downloader import download_pdf_from_drive
@@ -103,7 +367,7 @@ class FileConversionRequest(BaseModel):
 @app.post("/convert-pdf-to-svg")
 async def convert_pdf_to_svg(file_path: str, background_tasks: BackgroundTasks):
     """
-    Convert a PDF file to SVG format using Convertio API
+    Convert a PDF file to SVG format with the configured converter backend
     
     Args:
         file_path: Path to the PDF file to convert
@@ -124,17 +388,8 @@ async def convert_pdf_to_svg(file_path: str, background_tasks: BackgroundTasks):
         # Generate output path - store in files folder as original.svg
         output_path = os.path.join('files', 'original.svg')
         
-        # Start conversion process
-        conv_id = await converter.start_conversion()
-        
-        # Upload the file
-        await converter.upload_file(conv_id, file_path)
-        
-        # Wait for conversion to complete
-        download_url = await converter.check_status(conv_id)
-        
-        # Download the converted file
-        await converter.download_file(download_url, output_path)
+        # Convert with the configured backend
+        await get_app_converter().convert(file_path, output_path)
         
         # Return success response
         return JSONResponse(content={
@@ -170,17 +425,8 @@ async def convert_drive_pdf_to_svg(request: FileConversionRequest, background_ta
         print(f"Converting PDF to SVG: {pdf_path}")
         output_path = os.path.join('files', 'original.svg')
         
-        # Start conversion process
-        conv_id = await converter.start_conversion()
-        
-        # Upload the file
-        await converter.upload_file(conv_id, pdf_path)
-        
-        # Wait for conversion to complete
-        download_url = await converter.check_status(conv_id)
-        
-        # Download the converted file
-        await converter.download_file(download_url, output_path)
+        # Convert with the configured backend
+        await get_app_converter().convert(pdf_path, output_path)
         
         # Return success response
         return JSONResponse(content={
@@ -207,9 +453,7 @@ async def get_conversion_status(conv_id: str):
         JSON response with current status
     """
     try:
-        status_url = f"{CONVERTIO_BASE_URL}/{conv_id}/status"
-        response = requests.get(status_url)
-        result = response.json()
+        result = await get_status_converter().get_status(conv_id)
         
         return JSONResponse(content=result)
         
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Step2 recoloring benchmark
+
+Runs the original multi-pass modify_svg_stroke_and_fill (step2_baseline.py),
+on the whole document and tag by tag, and Step2's single-pass
+stroke_and_fill_modifier over the same drawing, checks the outputs are
+byte-identical and prints the timings.
+
+    python benchmarks/bench_step2.py [drawing.svg] [--repeat N] [--elements N]
+
+Without a drawing a synthetic one with the colors, text elements and
+styles Step2 handles is generated.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'processors'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from Step2 import stroke_and_fill_modifier
+from step2_baseline import modify_svg_stroke_and_fill
+from svg_stream import rewrite_stream
+
+STYLES = [
+    ' style="fill:none;stroke:#000000;stroke-width:0.75"',
+    ' style="fill:none;stroke:#1a2B3c;stroke-width:0.5"',
+    ' style="fill:#ffffff;fill-opacity:1;stroke:none"',
+    ' style="fill:#ffdf7f;stroke:#000000"',
+    ' style="fill:none;stroke:#fb3205"',
+    ' style="fill:none;stroke:#FFDF7F"',
+    ' style="fill:none;stroke:#0000ff"',
+    ' fill="#00ff00"',
+    '',
+]
+TEXTS = [
+    '<text x="{x}" y="{y}">A{i}</text>',
+    '<text x="{x}" y="{y}" style="font-size:8px;fill:#000000;stroke:#ff0000">B{i}</text>',
+    '<text x="{x}" y="{y}" style="fill:#ffdf7f">C{i}</text>',
+    '<text x="{x}" y="{y}"><tspan style="fill:#123456">D{i}</tspan></text>',
+]
+
+
+def synthetic_svg(elements: int, seed: int = 1) -> str:
+    """A drawing with the element mix Step2 sees in converted plans"""
+    rng = random.Random(seed)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<svg xmlns="http://www.w3.org/2000/svg" width="9000" height="6000">',
+        '<style>.a{stroke:#ffdf7f;fill:#000000}</style>',
+        '<g id="g1" style="stroke:#333333">',
+    ]
+    for i in range(elements):
+        x, y = rng.randint(0, 9000), rng.randint(0, 6000)
+        if rng.random() < 0.1:
+            lines.append(rng.choice(TEXTS).format(x=x, y=y, i=i))
+        else:
+            style = rng.choice(STYLES)
+            lines.append(f'<path id="path{i}"{style} d="m {x},{y} h {rng.randint(1, 300)} v {rng.randint(1, 300)}" />')
+    lines += ['</g>', '</svg>']
+    return "\n".join(lines)
+
+
+def timed(function, repeat: int):
+    """Best time of repeat runs, with the last result"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def stream(transform, svg_text: str) -> str:
+    output = io.StringIO()
+    rewrite_stream(io.StringIO(svg_text), output, transform)
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Step2 recoloring benchmark')
+    parser.add_argument('svg', nargs='?', help='Drawing to recolor (default: synthetic)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation')
+    parser.add_argument('--elements', type=int, default=200000, help='Elements in the synthetic drawing')
+    args = parser.parse_args()
+
+    if args.svg:
+        with open(args.svg, 'r', encoding='utf-8') as f:
+            svg_text = f.read()
+        print(f"📄 {args.svg}: {len(svg_text) / 1e6:.1f} MB")
+    else:
+        svg_text = synthetic_svg(args.elements)
+        print(f"📄 Synthetic drawing: {args.elements} elements, {len(svg_text) / 1e6:.1f} MB")
+
+    legacy_time, legacy = timed(lambda: modify_svg_stroke_and_fill(svg_text), args.repeat)
+    streamed_time, streamed = timed(lambda: stream(modify_svg_stroke_and_fill, svg_text), args.repeat)
+    single_time, single = timed(lambda: stream(stroke_and_fill_modifier(), svg_text), args.repeat)
+
+    print(f"   Multi-pass (whole document): {legacy_time:.3f}s")
+    print(f"   Multi-pass (per tag):        {streamed_time:.3f}s")
+    print(f"   Single pass:                 {single_time:.3f}s "
+          f"({legacy_time / single_time:.1f}x whole document, {streamed_time / single_time:.1f}x per tag)")
+
+    identical = legacy == single and streamed == single
+    if identical:
+        print("✅ Outputs are byte-identical")
+    else:
+        print("❌ Outputs differ")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
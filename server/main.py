@@ -1,16 +1,17 @@
 # source venv/bin/activate
 # uvicorn main:app --host 0.0.0.0 --port 5001 --reload
 
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import uvicorn
 import sys
 import os
 import json
 import asyncio
-import shutil
 from dotenv import load_dotenv
 from datetime import datetime
+from typing import Optional
 
 # Load environment variables from .env file
 load_dotenv()
@@ -40,15 +41,14 @@ except Exception as e:
 # Add the api directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'api'))
 
-# Import the PDF downloader and config manager
+# Import the PDF downloader
 from gdrive_pdf_downloader import download_pdf_from_drive
-from utils.config_manager import config_manager
-
-# Import the PDF to SVG converter
-from pdf_to_svg_converter import ConvertioConverter
+from utils.workspace import Workspace, new_job_id, find_workspace_for_upload
+from utils.job_queue import job_queue, FINISHED_STATES
+from utils.progress import read_progress, is_terminal_event
 
 # Import the PDF text extractor
-from api.pdf_text_extractor import extract_text_from_pdf
+from api.pdf_text_extractor import extract_text_from_pdf, get_ocr_options
 
 
 
@@ -60,91 +60,10 @@ app = FastAPI(
 )
 
 
-# Custom logging function
-async def log_to_client(upload_id: str, message: str, log_type: str = "info"):
-    """Log message to console"""
-    print(message)
-
-
-# Cleanup function to clear files and reset data.json
-def cleanup_after_response():
-    """Clear the files folder and reset data.json after response is sent"""
-    try:
-        # Clear the files folder
-        files_dir = "files"
-        if os.path.exists(files_dir):
-            # Remove all files in the files directory
-            for filename in os.listdir(files_dir):
-                file_path = os.path.join(files_dir, filename)
-                try:
-                    if os.path.isfile(file_path) or os.path.islink(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except Exception as e:
-                    print(f"Failed to delete {file_path}. Reason: {e}")
-            print("✅ Files folder cleared successfully")
-        else:
-            print("⚠️  Files directory does not exist")
-        
-        # Reset data.json to empty structure
-        data_json_path = "data.json"
-        empty_data = {
-            "step_results": {},
-            "cloudinary_urls": {},
-            "extracted_text": ""
-        }
-        
-        with open(data_json_path, 'w') as f:
-            json.dump(empty_data, f, indent=4)
-        
-        print("✅ data.json reset to empty structure")
-        
-    except Exception as e:
-        print(f"❌ Error during cleanup: {e}")
-
-
-
-# Modified pipeline runner with logging support
-def run_pipeline_with_logging(upload_id: str):
-    """Run the processing pipeline with logging using the proper pipeline from processors/index.py"""
-    import sys
-    import os
-    
-    # Add processors directory to Python path
-    processors_dir = os.path.abspath("processors")
-    if processors_dir not in sys.path:
-        sys.path.insert(0, processors_dir)
-    
-    try:
-        # Import the main function from processors/index.py
-        from index import main as pipeline_main
-        
-        print(f"\n{'='*60}")
-        print(f"🚀 Starting AI TakeOff Processing Pipeline")
-        print(f"{'='*60}")
-        
-        # Run the proper pipeline that includes data.json population
-        success = pipeline_main(upload_id)
-        
-        if success:
-            print(f"🎉 All steps completed successfully!")
-        else:
-            print(f"⚠️  Pipeline completed with some failures")
-        
-        return success
-        
-    except Exception as e:
-        print(f"❌ Error running pipeline: {str(e)}")
-        return False
-
-# Initialize the PDF to SVG converter
-try:
-    converter = ConvertioConverter()
-    print("✅ PDF to SVG converter initialized successfully")
-except ValueError as e:
-    print(f"⚠️  Warning: {e}. SVG conversion will not work.")
-    converter = None
+@app.on_event("shutdown")
+async def shutdown_job_queue():
+    """Stop the job worker pool"""
+    job_queue.shutdown()
 
 # Add CORS middleware
 app.add_middleware(
@@ -276,42 +195,160 @@ async def debug_dependencies():
 # AI-Takeoff specific endpoint
 @app.get("/AI-Takeoff/{upload_id}")
 async def get_ai_takeoff_result(upload_id: str, background_tasks: BackgroundTasks = None, sync: bool = True):
-    # Store the Google Drive file ID in JSON as google_drive_file_id
-    config_manager.set_file_id(upload_id)
+    # The job runs in the worker pool inside its own workspace
+    job_id = job_queue.submit(upload_id)
     
-    print(f"🔍 AI-Takeoff Request for upload_id: {upload_id}")
-    print(f"📝 Stored Google Drive file ID in JSON as google_drive_file_id: {upload_id}")
+    print(f"🔍 AI-Takeoff Request for upload_id: {upload_id} (job {job_id})")
     
-    # Force synchronous processing by default, or if sync=True
-    if sync:
-        print(f"🔄 Running in synchronous mode...")
-        result = await process_ai_takeoff_sync(upload_id)
-    else:
-        # Fallback to synchronous processing
-        result = await process_ai_takeoff_sync(upload_id)
+    if not sync:
+        # Return right away; poll /jobs/{job_id} for progress
+        return job_queue.get_status(job_id)
+    
+    # Wait for the job without blocking the event loop
+    print(f"🔄 Running in synchronous mode...")
+    try:
+        result = await job_queue.wait(job_id)
+    except Exception as e:
+        result = {
+            "id": upload_id,
+            "job_id": job_id,
+            "status": "error",
+            "error": str(e),
+            "message": "AI-Takeoff job failed"
+        }
+    
+    # Add cleanup task to run after response is sent
+    if background_tasks:
+        background_tasks.add_task(job_queue.discard, job_id)
+    
+    return result
+
+# Submit an AI-Takeoff job without waiting for it
+@app.post("/AI-Takeoff/{upload_id}/jobs")
+async def submit_ai_takeoff_job(upload_id: str):
+    """Queue an AI-Takeoff job and return its job id immediately"""
+    job_id = job_queue.submit(upload_id)
+    return job_queue.get_status(job_id)
+
+# Job status endpoint
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a queued AI-Takeoff job"""
+    status = job_queue.get_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+# Job progress stream endpoint
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, format: str = "sse"):
+    """
+    Stream a job's progress events (download, OCR, conversion, each step, uploads)
+    as server-sent events, or as newline-delimited JSON with ?format=ndjson.
+    The stream ends when the job finishes.
+    """
+    if job_queue.get_status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    workspace = Workspace(job_id)
+    ndjson = format == "ndjson"
+    
+    async def event_stream():
+        offset = 0
+        idle_seconds = 0.0
+        while True:
+            try:
+                events, offset = read_progress(workspace, offset)
+            except FileNotFoundError:
+                # The workspace was removed
+                return
+            
+            for event in events:
+                line = json.dumps(event)
+                yield f"{line}\n" if ndjson else f"data: {line}\n\n"
+                if is_terminal_event(event):
+                    return
+            
+            status = job_queue.get_status(job_id)
+            if status is None or (status["status"] in FINISHED_STATES and not events):
+                # Job discarded, or finished without a terminal event (e.g. a worker crashed)
+                return
+            
+            idle_seconds = 0.0 if events else idle_seconds + 0.5
+            if idle_seconds >= 15 and not ndjson:
+                # Keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                idle_seconds = 0.0
+            
+            await asyncio.sleep(0.5)
+    
+    media_type = "application/x-ndjson" if ndjson else "text/event-stream"
+    return StreamingResponse(
+        event_stream(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Job result endpoint
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, background_tasks: BackgroundTasks = None):
+    """Get the result of a finished AI-Takeoff job; the job is removed after the response"""
+    status = job_queue.get_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if status["status"] not in FINISHED_STATES:
+        return status
+    
+    result = job_queue.get_result(job_id) or {
+        "id": status["upload_id"],
+        "job_id": job_id,
+        "status": "error",
+        "error": status["error"],
+        "message": "AI-Takeoff job failed"
+    }
     
     # Add cleanup task to run after response is sent
     if background_tasks:
-        background_tasks.add_task(cleanup_after_response)
+        background_tasks.add_task(job_queue.discard, job_id)
     
     return result
 
 # Extract text from PDF endpoint
 @app.get("/extract-text/{upload_id}")
-async def extract_pdf_text(upload_id: str):
-    """Extract text from the PDF file and print to console"""
+async def extract_pdf_text(
+    upload_id: str,
+    background_tasks: BackgroundTasks = None,
+    dpi: Optional[int] = None,
+    preprocess: Optional[str] = None,
+    pages: Optional[str] = None,
+    regions: Optional[str] = None
+):
+    """
+    Extract text from the PDF file and print to console
+    
+    dpi, preprocess (none, grayscale or binarize), pages (e.g. "1-3,5") and
+    regions (configured region names, or "page" for whole pages) override the
+    ocr settings in config.json for this request.
+    """
+    try:
+        options = get_ocr_options({"dpi": dpi, "preprocess": preprocess, "pages": pages, "regions": regions})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    workspace = Workspace(new_job_id()).create(upload_id)
+    if background_tasks:
+        background_tasks.add_task(workspace.cleanup)
+    
     try:
-        # Store the Google Drive file ID
-        config_manager.set_file_id(upload_id)
-        
         print(f"🔍 Text extraction request for upload_id: {upload_id}")
         
-        # Download the PDF first
-        file_path = download_pdf_from_drive(upload_id)
+        # Download the PDF first (in a thread so the event loop stays responsive)
+        file_path = await asyncio.to_thread(download_pdf_from_drive, upload_id, workspace.files_dir)
         print(f"📄 PDF downloaded successfully to: {file_path}")
         
         # Extract text from the PDF
-        extracted_text = extract_text_from_pdf(file_path)
+        extracted_text = await asyncio.to_thread(extract_text_from_pdf, file_path, workspace.data_json, None, options)
         
         if extracted_text:
             return {
@@ -341,10 +378,10 @@ async def extract_pdf_text(upload_id: str):
 # Get results endpoint
 @app.get("/AI-Takeoff/{upload_id}/results")
 async def get_ai_takeoff_results(upload_id: str, background_tasks: BackgroundTasks = None):
-    """Get the results from data.json for a specific upload_id"""
-    data_json_path = os.path.join('data.json')
+    """Get the results from the most recent job workspace for a specific upload_id"""
+    workspace = find_workspace_for_upload(upload_id)
     
-    if not os.path.exists(data_json_path):
+    if workspace is None:
         return {
             "id": upload_id,
             "status": "not_found",
@@ -352,9 +389,7 @@ async def get_ai_takeoff_results(upload_id: str, background_tasks: BackgroundTas
         }
     
     try:
-        with open(data_json_path, 'r') as f:
-            import json
-            data_results = json.load(f)
+        data_results = workspace.read_data()
         
         # Check if this result belongs to the requested upload_id
         if data_results.get('upload_id') == upload_id:
@@ -366,7 +401,7 @@ async def get_ai_takeoff_results(upload_id: str, background_tasks: BackgroundTas
             
             # Add cleanup task to run after response is sent
             if background_tasks:
-                background_tasks.add_task(cleanup_after_response)
+                background_tasks.add_task(workspace.cleanup)
             
             return result
         else:
@@ -385,124 +420,6 @@ async def get_ai_takeoff_results(upload_id: str, background_tasks: BackgroundTas
         }
 
 
-async def process_ai_takeoff_sync(upload_id: str):
-    """Synchronous processing"""
-    try:
-        await log_to_client(upload_id, f"📄 Starting PDF download for upload_id: {upload_id}")
-        
-        # Step 1: Download the PDF
-        file_path = download_pdf_from_drive(upload_id)
-        await log_to_client(upload_id, f"📄 PDF downloaded successfully to: {file_path}")
-        
-        # Step 1.5: Extract text from PDF
-        await log_to_client(upload_id, f"📖 Extracting text from PDF...")
-        try:
-            extracted_text = extract_text_from_pdf(file_path)
-            await log_to_client(upload_id, f"✅ Text extraction completed, {len(extracted_text)} characters extracted")
-        except Exception as text_error:
-            await log_to_client(upload_id, f"⚠️  Text extraction failed: {text_error}", "warning")
-        
-        # Step 2: Convert PDF to SVG
-        svg_path = None
-        svg_size = None
-        
-        if converter:
-            await log_to_client(upload_id, f"🔄 Starting PDF to SVG conversion...")
-            try:
-                # Start conversion process
-                conv_id = await converter.start_conversion()
-                await log_to_client(upload_id, f"🔄 Conversion started with ID: {conv_id}")
-                
-                # Upload the file
-                await converter.upload_file(conv_id, file_path)
-                await log_to_client(upload_id, f"📤 PDF uploaded to conversion service")
-                
-                # Wait for conversion to complete
-                download_url = await converter.check_status(conv_id)
-                await log_to_client(upload_id, f"✅ Conversion completed, downloading SVG...")
-                
-                # Download the converted file
-                svg_path = os.path.join('files', 'original.svg')
-                await converter.download_file(download_url, svg_path)
-                await log_to_client(upload_id, f"✅ SVG saved to: {svg_path}")
-                
-                svg_size = os.path.getsize(svg_path) if os.path.exists(svg_path) else 0
-                
-                # Start the processing pipeline
-                await log_to_client(upload_id, f"🚀 Starting AI processing pipeline...")
-                try:
-                    pipeline_success = run_pipeline_with_logging(upload_id)
-                    if pipeline_success:
-                        await log_to_client(upload_id, f"✅ Processing pipeline completed successfully")
-                    else:
-                        await log_to_client(upload_id, f"⚠️  Processing pipeline completed with some failures")
-                except Exception as pipeline_error:
-                    await log_to_client(upload_id, f"❌ Error in processing pipeline: {pipeline_error}", "error")
-                
-            except Exception as conversion_error:
-                await log_to_client(upload_id, f"❌ Error in SVG conversion: {conversion_error}", "error")
-        else:
-            await log_to_client(upload_id, f"⚠️  Skipping SVG conversion - CONVERTIO_API_KEY not set", "warning")
-        
-        # Get file sizes
-        pdf_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-        
-        # Read the data.json file that was generated by the pipeline
-        data_json_path = os.path.join('data.json')
-        if os.path.exists(data_json_path):
-            try:
-                with open(data_json_path, 'r') as f:
-                    import json
-                    data_results = json.load(f)
-                
-                result = {
-                    "id": upload_id,
-                    "status": "completed",
-                    "pdf_path": file_path,
-                    "pdf_size": pdf_size,
-                    "svg_path": svg_path,
-                    "svg_size": svg_size,
-                    "message": "AI-Takeoff processing completed successfully",
-                    "results": data_results
-                }
-            except Exception as e:
-                await log_to_client(upload_id, f"❌ Error reading data.json: {e}", "error")
-                result = {
-                    "id": upload_id,
-                    "status": "completed",
-                    "pdf_path": file_path,
-                    "pdf_size": pdf_size,
-                    "svg_path": svg_path,
-                    "svg_size": svg_size,
-                    "message": "PDF downloaded and converted to SVG successfully, but could not read results"
-                }
-        else:
-            result = {
-                "id": upload_id,
-                "status": "completed",
-                "pdf_path": file_path,
-                "pdf_size": pdf_size,
-                "svg_path": svg_path,
-                "svg_size": svg_size,
-                "message": "PDF downloaded and converted to SVG successfully, but no results file found"
-            }
-        
-    except Exception as e:
-        await log_to_client(upload_id, f"❌ Error downloading PDF: {e}", "error")
-        
-        result = {
-            "id": upload_id,
-            "status": "error",
-            "error": str(e),
-            "message": "Failed to download PDF from Google Drive"
-        }
-    
-    # Log final result
-    await log_to_client(upload_id, f"📊 Result: {result}")
-    await log_to_client(upload_id, "-" * 50)
-    
-    return result
-
 if __name__ == "__main__":
     # Railway provides PORT environment variable
     port = int(os.environ.get("PORT", 5001))
@@ -1,5 +1,5 @@
-import re
-
+# Literal strings searched for in path d attributes. These lists decide the
+# takeoff counts; each spelling of a symbol is listed on its own.
 shores_box = [
         "h 60 v -61 h -60 v 61", "h 61 v -60 h -61 v 60",
         "h -60 v 61 h 60 v -61", "h -61 v 60 h 61 v -60",
@@ -35,13 +35,16 @@ shores_box = [
         
 ]
 
-shores = re.compile(
-    r'<path[^>]+d="[^"]*m\s*(-?\d+),(-?\d+)\s+('
+# A moveto followed by a 33/34 px diagonal, searched for in d attributes
+shores_d = (
+    r'm\s*(-?\d+),(-?\d+)\s+('
     r'-?(33|34),-?(33|34)|'
     r'-?(33|34),(33|34)|'
     r'(33|34),-?(33|34)|'
-    r'(33|34),(33|34))[^"]*"[^>]*>'
+    r'(33|34),(33|34))'
 )
+# Strings every shores_d match contains
+shores_d_literals = ["33,", "34,"]
 
 frames_6x4 = [
     "h 300 l -300,-450 h 300",
@@ -87,6 +90,8 @@ frames_5x4 = [
     "h 300 v -300 h -300 v 300",
     "h -300 v 300 h 300 v -300",
     "v -300 h 300 v 300 h -300",
+    # The missing comma joins this entry and the next into one string; adding
+    # it would count paths that never matched before
     "v 300 h -300 v -300 h 300"
 
     # ADDITIONALS
@@ -97,6 +102,12 @@ frames_5x4 = [
 
 ]
 
+# Generic frames 5x4 diagonal allowing leg lengths from 294-301px, matched
+# ignoring case like the frames_5x4 strings
+frames_5x4_diagonal = r'h\s+(?:29[4-9]|30[0-1])\s+l\s+-?(?:29[4-9]|30[0-1]),-?(?:29[4-9]|30[0-1])'
+# Strings every frames_5x4_diagonal match contains
+frames_5x4_diagonal_literals = ["294", "295", "296", "297", "298", "299", "300", "301"]
+
 frames_inBox = [
     "003,525 l 003 V",
     "003,525- l 003- V",
@@ -140,3 +151,33 @@ frames_inBox = [
     "V 8249 M 14975,8549 V 8249 L 14450,8549"
 ]
 
+# Shapes for opt-in shape matching (pipeline.shape_matching, see
+# shape_signatures.py): each one also stands for its rotations, reflections
+# and reversed direction, with every length up to shape_tolerance px longer
+# (so 60 also matches 61), found anywhere in a path's run of segments
+shape_tolerance = 1
+
+shores_box_shapes = [
+    "h 60 v -60 h -60 v 60",
+    "h 73 v -73 h -73 v 73",
+]
+
+frames_6x4_shapes = [
+    "h 300 l -300,-450 h 300",
+    "l 450,-300 v 300",
+]
+
+frames_5x4_shapes = [
+    "v 300 l 375,-300",
+    "v -300 l -375,300 v -300",
+    "v 300 l 299,-300",
+    "h 300 l -300,-300 h 300",
+    "l -300,-300 h 300 h -300",
+    "h 300 v -300 h -300 v 300",
+]
+
+frames_inBox_shapes = [
+    "h 300 l 300,525",
+    "v -300 l -525,300",
+    "h 300 l 525,300",
+]
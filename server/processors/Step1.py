@@ -4,109 +4,101 @@ import json
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-def find_and_remove_duplicate_paths(svg_path, output_path):
-    try:
-        with open(svg_path, "r", encoding="utf-8") as file:
-            svg_text = file.read()
+from utils.workspace import Workspace
+from utils.config_manager import config_manager
+from step_result import StepResult, failed
+from svg_paths import PathTable
+from path_geometry import geometry_key
+
+WHITESPACE = re.compile(r'\s+')
 
-        # Extract all paths with their IDs and d parameters
-        paths = list(re.finditer(r'<path[^>]*?id="([^"]*)"[^>]*?d="([^"]*)"', svg_text))
+def geometric_dedup_settings():
+    """
+    Whether Step1 compares path geometry instead of d text (GEOMETRIC_DEDUP env var
+    or pipeline.geometric_dedup), and the coordinate quantum (pipeline.dedup_quantum)
+    """
+    pipeline_config = config_manager.get_pipeline_config()
+    value = os.environ.get("GEOMETRIC_DEDUP")
+    if value is not None:
+        enabled = value.lower() in ("1", "true", "yes")
+    else:
+        enabled = bool(pipeline_config.get("geometric_dedup", False))
+    return enabled, float(pipeline_config.get("dedup_quantum", 0.5))
+
+def find_and_remove_duplicate_paths(svg_text, geometric=False, quantum=0.5):
+    """
+    Remove every <path> whose whitespace-normalized d parameter repeats an
+    earlier path's, keeping the first. Duplicates are collected as source
+    spans in one pass and cut out in a single splice, so elements spanning
+    several lines are removed whole.
+    
+    With geometric set, paths are compared by their absolute coordinates
+    rounded to quantum instead, which also catches the same outline written
+    with relative/absolute commands or with small jitter. Paths whose data
+    can't be parsed fall back to the text comparison.
+    """
+    try:
+        # Parse every path with its d parameter and source span
+        table = PathTable(svg_text)
         
-        # Create a dictionary to store d parameters and their corresponding IDs
+        # First path seen for each d parameter
         d_params = {}
-        paths_to_remove = set()
+        duplicates = 0
         
-        # Collect paths with same d parameter
-        for path in paths:
-            path_id = path.group(1)
-            d_param = path.group(2).strip()
-            d_param = re.sub(r'\s+', ' ', d_param)
+        for path in table:
+            if path.d is None:
+                continue
+            d_param = WHITESPACE.sub(' ', path.d.strip())
+            if geometric:
+                try:
+                    d_param = geometry_key(d_param, quantum)
+                except ValueError:
+                    pass
             
             if d_param in d_params:
-                d_params[d_param].append(path_id)
-                paths_to_remove.add(path_id)
+                table.remove(path)
+                duplicates += 1
             else:
-                d_params[d_param] = [path_id]
-
-        
-        found_duplicates = False
-        for d_param, ids in d_params.items():
-            if len(ids) > 1:
-                found_duplicates = True
+                d_params[d_param] = path
 
-        if not found_duplicates:
+        if not duplicates:
             print("No duplicate paths found")
             return svg_text
 
-        # Remove duplicate paths
-        lines = svg_text.split('\n')
-        new_lines = []
-        
-        for line in lines:
-            # Check if this line contains a path to remove
-            should_keep = True
-            for path_id in paths_to_remove:
-                if f'id="{path_id}"' in line:
-                    should_keep = False
-                    break
-            if should_keep:
-                new_lines.append(line)
-
-        # Join the lines back together
-        modified_svg_text = '\n'.join(new_lines)
-
-        # Write the modified content back to file
-        with open(output_path, "w", encoding="utf-8") as file:
-            file.write(modified_svg_text)
-
-        print(f"Removed {len(paths_to_remove)} duplicate paths")
-        
-        # Print line counts for verification
-        original_lines = len(svg_text.split('\n'))
-        new_lines_count = len(new_lines)
-
-        return modified_svg_text
+        print(f"Removed {duplicates} duplicate paths")
+        return table.render()
 
     except Exception as e:
         print(f"Error handling duplicate paths: {e}")
         return svg_text
 
 
-
-def run_step1():
+def run_step1(workspace=None):
     """
     Main function to run Step1 processing
     """
     try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
+        workspace = workspace or Workspace()
         
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/original.svg"
-            output_svg = "../files/Step1.svg"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/original.svg"
-            output_svg = "files/Step1.svg"
-        
-        # Check if input file exists
-        if not os.path.exists(input_svg):
-            print(f"Error: Input file '{input_svg}' not found!")
-            print(f"Current working directory: {os.getcwd()}")
-            print(f"Tried path: {input_svg}")
-            return False
-        else:
-            find_and_remove_duplicate_paths(input_svg, output_svg)
+        # original.svg is the converter output, read from disk on first use
+        svg_text = workspace.get_svg("original")
+        if svg_text is None:
+            print(f"Error: Input file '{workspace.svg_path('original')}' not found!")
+            return failed("Step1", "Input document 'original' not found")
+
+        geometric, quantum = geometric_dedup_settings()
+        if geometric:
+            print(f"Comparing path geometry (quantum {quantum})")
+        workspace.put_svg("Step1", find_and_remove_duplicate_paths(svg_text, geometric, quantum))
 
         print(f"✅ Step1 completed successfully:")
-        print(f"   - Input SVG: {input_svg}")
-        print(f"   - Processed SVG: {output_svg}")
-        return True
+        print(f"   - Input SVG: original")
+        print(f"   - Processed SVG: Step1")
+        return StepResult(step="Step1", success=True, artifacts={"document": "Step1"})
             
     except Exception as e:
         print(f"An error occurred: {str(e)}")
-        return False
+        return failed("Step1", str(e))
 
 # Usage
 if __name__ == "__main__":
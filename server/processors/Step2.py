@@ -3,103 +3,97 @@ import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from utils.workspace import Workspace
+from step_result import StepResult, failed
+from svg_stream import rewrite_stream
+
 
 # ====== SETTING ELEMENTS COLOR LIGHTGRAY AND BLACK SLABBANDS ====== #
 
-# This step is to modify the stroke and fill colors of the SVG file
-def modify_svg_stroke_and_fill(svg_text, black_stroke="#000000", white_stroke="#4e4e4e", new_stroke="#4e4e4e", fill_color="#4e4e4e"):
-    try:
-        # Find and print IDs of elements with #ffdf7f
-        yellow_elements = re.finditer(r'<[^>]*?id="([^"]*)"[^>]*(?:stroke|fill):#ffdf7f[^>]*>', svg_text)
-        skipped_ids = set()
-        for match in yellow_elements:
-            if match.group(1):  # if ID exists
-                skipped_ids.add(match.group(1))
-        
-        # if skipped_ids:
-            # print("Skipped elements with #ffdf7f (by ID):", ", ".join(skipped_ids))
+# Stroke/fill values the first two passes of the original recoloring rewrite
+STROKE_VALUE = re.compile(r'stroke:(#[0-9a-fA-F]{6})')
+FILL_VALUE = re.compile(r'fill:(#[0-9a-fA-F]{6})')
+# Colors whose elements keep their stroke and fill
+KEPT_COLORS = ("ffdf7f", "fb3205")
+KEPT_MARKERS = tuple(f"{prop}:#{color}" for prop in ("stroke", "fill") for color in KEPT_COLORS)
+TEXT_FILL = re.compile(r'(<text[^>]*style="[^"]*)fill:[#0-9a-fA-F]+')
+TEXT_STROKE = re.compile(r'(<text[^>]*style="[^"]*)stroke:[#0-9a-fA-F]+')
+TEXT_WITHOUT_STYLE = re.compile(r'(<text(?![^>]*style=)[^>]*)>')
 
-        # Modify stroke colors, but skip elements with #ffdf7f and #fb3205
-        modified_svg_text = re.sub(
-            r'(?:<[^>]*(?:stroke|fill):#(?:ffdf7f|fb3205)[^>]*>)|(?:stroke:(#[0-9a-fA-F]{6}))',
-            lambda m: m.group(0) if any(color in m.group(0) for color in ['ffdf7f', 'fb3205']) else (
-                f"stroke:{new_stroke}" if m.group(1) == black_stroke else f"stroke:{white_stroke}"
-            ),
-            svg_text
-        )
+def _is_kept(token):
+    """Whether a token is a whole tag carrying one of the kept colors"""
+    return token.startswith("<") and token.endswith(">") and any(marker in token for marker in KEPT_MARKERS)
 
-        # Modify fill colors, but skip elements with #ffdf7f and #fb3205
-        modified_svg_text = re.sub(
-            r'(?:<[^>]*(?:stroke|fill):#(?:ffdf7f|fb3205)[^>]*>)|(?:fill:(#[0-9a-fA-F]{6}))',
-            lambda m: m.group(0) if any(color in m.group(0) for color in ['ffdf7f', 'fb3205']) else f"fill:{fill_color}",
-            modified_svg_text
-        )
+def stroke_and_fill_modifier(black_stroke="#000000", white_stroke="#4e4e4e", new_stroke="#4e4e4e", fill_color="#4e4e4e"):
+    """
+    Step2's recoloring as a token transform: applies the original multi-pass
+    rules (kept in benchmarks/step2_baseline.py) to one tag, in the same
+    order, so the output is identical for documents without ">" inside
+    attribute values (see svg_stream.iter_tokens). Tokens the rules can't
+    touch are returned without a regex call.
+    """
+    new_stroke_value = f"stroke:{new_stroke}"
+    white_stroke_value = f"stroke:{white_stroke}"
+    fill_value = f"fill:{fill_color}"
+    text_fill = f"fill:{new_stroke}"
+    text_stroke = f"stroke:{new_stroke}"
+    text_style = f' style="fill:{new_stroke}; stroke:{new_stroke}">'
 
-        # Continue with text modifications
-        modified_svg_text = re.sub(r'(<text[^>]*style="[^"]*)fill:[#0-9a-fA-F]+', rf'\1fill:{new_stroke}', modified_svg_text)
-        modified_svg_text = re.sub(r'(<text[^>]*style="[^"]*)stroke:[#0-9a-fA-F]+', rf'\1stroke:{new_stroke}', modified_svg_text)
-        modified_svg_text = re.sub(r'(<text(?![^>]*style=)[^>]*)>', rf'\1 style="fill:{new_stroke}; stroke:{new_stroke}">', modified_svg_text)
+    def replace_stroke(match):
+        value = match.group(0)
+        if any(color in value for color in KEPT_COLORS):
+            return value
+        return new_stroke_value if match.group(1) == black_stroke else white_stroke_value
 
-        # Change all #ffdf7f elements to #000000
-        modified_svg_text = re.sub(
-            r'(stroke|fill):#ffdf7f',
-            r'\1:#000000',
-            modified_svg_text
-        )
+    def replace_fill(match):
+        value = match.group(0)
+        if any(color in value for color in KEPT_COLORS):
+            return value
+        return fill_value
 
-        return modified_svg_text
+    def transform(token):
+        if "stroke:#" in token and not _is_kept(token):
+            token = STROKE_VALUE.sub(replace_stroke, token)
+        # Checked again: the new stroke colors may themselves be kept colors
+        if "fill:#" in token and not _is_kept(token):
+            token = FILL_VALUE.sub(replace_fill, token)
 
-    except Exception as e:
-        
-        print(f"Error modifying SVG colors: {e}")
-        return svg_text
+        if "<text" in token:
+            token = TEXT_FILL.sub(lambda m: m.group(1) + text_fill, token)
+            token = TEXT_STROKE.sub(lambda m: m.group(1) + text_stroke, token)
+            token = TEXT_WITHOUT_STYLE.sub(lambda m: m.group(1) + text_style, token)
 
-def run_step2():
+        if "#ffdf7f" in token:
+            token = token.replace("stroke:#ffdf7f", "stroke:#000000").replace("fill:#ffdf7f", "fill:#000000")
+        return token
+
+    return transform
+
+def run_step2(workspace=None):
     """
     Main function to run Step2 processing
     """
     try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
-        
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step1.svg"
-            output_svg = "../files/Step2.svg"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step1.svg"
-            output_svg = "files/Step2.svg"
-        
-        # Check if input file exists
-        if not os.path.exists(input_svg):
-            print(f"Error: Input file '{input_svg}' not found!")
-            print(f"Current working directory: {os.getcwd()}")
-            print(f"Tried path: {input_svg}")
-            return False
+        workspace = workspace or Workspace()
         
-        # Read the input file
-        with open(input_svg, "r", encoding="utf-8") as file:
-            svg_text = file.read()
-        
-        # Modify the colors
+        source = workspace.open_svg("Step1")
+        if source is None:
+            print(f"Error: Input file '{workspace.svg_path('Step1')}' not found!")
+            return failed("Step2", "Input document 'Step1' not found")
         
+        # Modify the colors element by element; every rule only looks inside one tag
         print("Modifying colors...")
-        final_svg = modify_svg_stroke_and_fill(svg_text)
-        
-        # Write the final result
-        with open(output_svg, "w", encoding="utf-8") as file:
-            file.write(final_svg)
-        
+        with source, workspace.svg_writer("Step2") as output:
+            rewrite_stream(source, output, stroke_and_fill_modifier())
         
         print(f"✅ Step2 completed successfully:")
-        print(f"   - Input SVG: {input_svg}")
-        print(f"   - Processed SVG: {output_svg}")
-        return True
+        print(f"   - Input SVG: Step1")
+        print(f"   - Processed SVG: Step2")
+        return StepResult(step="Step2", success=True, artifacts={"document": "Step2"})
             
     except Exception as e:
         print(f"An error occurred: {str(e)}")
-        return False
+        return failed("Step2", str(e))
 
 # Main execution
 if __name__ == "__main__":
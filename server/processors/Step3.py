@@ -3,69 +3,72 @@ import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from utils.workspace import Workspace
+from step_result import StepResult, failed
+from svg_stream import rewrite_stream
 
-def add_background_to_svg(input_file, output_file, background_color):
+
+def add_background_to_svg(svg_text, background_color):
     """
     Adds a background color to the SVG by inserting a <rect> element.
     """
     try:
-        with open(input_file, "r", encoding="utf-8") as file:
-            svg_text = file.read()
-
         # Insert a <rect> element after the opening <svg> tag
-        svg_text = re.sub(
+        return re.sub(
             r'(<svg[^>]*>)',
             rf'\1<rect width="100%" height="100%" fill="{background_color}" />',
             svg_text,
             count=1
         )
 
-        with open(output_file, "w", encoding="utf-8") as file:
-            file.write(svg_text)
-
     except Exception as e:
         
         print(f"Error adding background to SVG: {e}")
+        return svg_text
 
-def run_step3():
+def background_inserter(background_color):
+    """
+    Streaming version of add_background_to_svg: a token transform that adds
+    the background <rect> after the opening <svg> tag
+    """
+    inserted = False
+    
+    def transform(token):
+        nonlocal inserted
+        if not inserted and "<svg" in token:
+            new_token = add_background_to_svg(token, background_color)
+            inserted = new_token != token
+            return new_token
+        return token
+    
+    return transform
+
+def run_step3(workspace=None):
     """
     Main function to run Step3 processing
     """
     try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
-        
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step2.svg"
-            output_svg = "../files/Step3.svg"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step2.svg"
-            output_svg = "files/Step3.svg"
+        workspace = workspace or Workspace()
         
         background_color = "#202124"  # Gray background
         
-        # Check if input file exists
-        if not os.path.exists(input_svg):
-            
-            print(f"Error: Input file '{input_svg}' not found!")
-            print(f"Current working directory: {os.getcwd()}")
-            print(f"Tried path: {input_svg}")
-            return False
-        
-        add_background_to_svg(input_svg, output_svg, background_color)
+        source = workspace.open_svg("Step2")
+        if source is None:
+            print(f"Error: Input file '{workspace.svg_path('Step2')}' not found!")
+            return failed("Step3", "Input document 'Step2' not found")
         
+        with source, workspace.svg_writer("Step3") as output:
+            rewrite_stream(source, output, background_inserter(background_color))
         
         print(f"✅ Step3 completed successfully:")
-        print(f"   - Input SVG: {input_svg}")
-        print(f"   - Processed SVG: {output_svg}")
-        return True
+        print(f"   - Input SVG: Step2")
+        print(f"   - Processed SVG: Step3")
+        return StepResult(step="Step3", success=True, artifacts={"document": "Step3"})
             
     except Exception as e:
         
         print(f"An error occurred: {str(e)}")
-        return False
+        return failed("Step3", str(e))
 
 # Main execution
 if __name__ == "__main__":
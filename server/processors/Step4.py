@@ -2,18 +2,39 @@ import re
 import os
 import json
 import sys
+import time
+from bisect import bisect_left
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from colorama import init, Fore, Style
-from PatternComponents import shores_box, frames_6x4, frames_5x4, frames_inBox, shores
-import cairosvg
-import io
-from PIL import Image
+from utils.workspace import Workspace
+from utils.render_service import save_png
+from step_result import StepResult, failed
+from svg_paths import PathTable
+from path_classifier import classify_paths
 
 # Configure environment for headless operation
 os.environ['QT_QPA_PLATFORM'] = 'offscreen'
 os.environ['MPLBACKEND'] = 'Agg'
 
+# Lengths that make a path a candidate neighbor of a frames 5x4 diagonal
+ADJACENT_LENGTH = re.compile(r'\b(29[4-9]|300)\b|V\s+9114', re.IGNORECASE)
+# How far apart (in path ID numbers) a neighbor and its diagonal may be
+ADJACENT_DISTANCE = 8
+
+def closest_id(sorted_ids, number):
+    """
+    The ID in sorted_ids closest to number and its distance ((None, None) if
+    there are none); ties go to the lower ID
+    """
+    position = bisect_left(sorted_ids, number)
+    closest, distance = None, None
+    for candidate in sorted_ids[max(0, position - 1):position + 1]:
+        candidate_distance = abs(number - candidate)
+        if distance is None or candidate_distance < distance:
+            closest, distance = candidate, candidate_distance
+    return closest, distance
+
 def print_table(box_count, shores_count, frames6x4_count, frames5x4_count, framesinbox_count):
     # Initialize colorama
     init()
@@ -64,9 +85,10 @@ def append_counts_to_json(box_count, shores_count, frames6x4_count, frames5x4_co
     # Keeping the function signature for compatibility but removing the JSON writing
     pass
 
-def apply_color_to_specific_paths(input_file, output_file, red="#fb0505", blue="#0000ff", green="#70ff00", pink="#ff00cd", orange="#fb7905"):
+def apply_color_to_specific_paths(svg_text, red="#fb0505", blue="#0000ff", green="#70ff00", pink="#ff00cd", orange="#fb7905"):
     """
-    Reads an SVG file and changes colors of specific paths:
+    Changes colors of specific paths in the SVG text and returns the result
+    with the per-category match counts ((None, {}) on error):
     - shores_box paths to red
     - shores paths to blue
     - frames_6x4 paths to green
@@ -74,36 +96,22 @@ def apply_color_to_specific_paths(input_file, output_file, red="#fb0505", blue="
     - frames_inBox paths to orange
     """
     try:
-        if not os.path.exists(input_file):
-            
-            print(f"{input_file} not found.", "error")
-            return
-
-        with open(input_file, "r", encoding="utf-8") as file:
-            svg_text = file.read()
-
-        # Create regex patterns
-        pattern_red = "|".join(re.escape(variation) for variation in shores_box)
-        shores_box_pattern = re.compile(rf'<path[^>]+d="[^"]*({pattern_red})[^"]*"[^>]*>')
-        
-        frames6x4_pattern = re.compile(rf'<path[^>]+d="[^"]*({"|".join(re.escape(variation) for variation in frames_6x4)})[^"]*"[^>]*>')
-        
-        # Modified frames5x4 pattern including detection of diagonal segments
-        frames5x4_base_pattern = "|".join(re.escape(variation) for variation in frames_5x4)
-        # Generic diagonal pattern allowing leg lengths from 294-301px (covers 294-299/300/301)
-        frames5x4_generic = r'h\s+(?:29[4-9]|30[0-1])\s+l\s+-?(?:29[4-9]|30[0-1]),-?(?:29[4-9]|30[0-1])'
-        frames5x4_pattern = re.compile(
-            rf'<path[^>]+d="[^"]*(?:({frames5x4_base_pattern})|({frames5x4_generic}))[^"]*"[^>]*>',
-            re.IGNORECASE)
-        
-        framesinBox_pattern = re.compile(rf'<path[^>]+d="[^"]*({"|".join(re.escape(variation) for variation in frames_inBox)})[^"]*"[^>]*>')
+        # Parse the paths once and sort them into the categories, scanning
+        # each d attribute once for every pattern
+        table = PathTable(svg_text)
+        categories = classify_paths(table)
+        shores_box_paths = categories["shores_box"]
+        shores_paths = categories["shores"]
+        frames6x4_paths = categories["frames_6x4"]
+        frames5x4_paths = categories["frames_5x4"]
+        framesinBox_paths = categories["frames_inBox"]
 
         # Count matching paths
-        match_count_box = len(shores_box_pattern.findall(svg_text))
-        match_count_33_34 = len(shores.findall(svg_text))
-        match_count_frames6x4 = len(frames6x4_pattern.findall(svg_text))
-        match_count_frames5x4 = len(frames5x4_pattern.findall(svg_text))
-        match_count_framesinBox = len(framesinBox_pattern.findall(svg_text))
+        match_count_box = len(shores_box_paths)
+        match_count_33_34 = len(shores_paths)
+        match_count_frames6x4 = len(frames6x4_paths)
+        match_count_frames5x4 = len(frames5x4_paths)
+        match_count_framesinBox = len(framesinBox_paths)
 
         # Print table with counts
         print_table(
@@ -122,212 +130,106 @@ def apply_color_to_specific_paths(input_file, output_file, red="#fb0505", blue="
             match_count_frames5x4,
             match_count_framesinBox
         )
+        
+        counts = {
+            "shores_box": match_count_box,
+            "shores": match_count_33_34,
+            "frames_6x4": match_count_frames6x4,
+            "frames_5x4": match_count_frames5x4,
+            "frames_inBox": match_count_framesinBox
+        }
 
         # Color change functions
-        def change_to_red(match):
-            path_tag = match.group(0)
+        def change_color(path_tag, color):
             if "stroke" in path_tag:
-                path_tag = re.sub(r'stroke:[#0-9a-fA-F]+', f'stroke:{red}', path_tag)
+                path_tag = re.sub(r'stroke:[#0-9a-fA-F]+', f'stroke:{color}', path_tag)
             else:
-                path_tag = path_tag.replace("<path", f"<path stroke='{red}'", 1)
+                path_tag = path_tag.replace("<path", f"<path stroke='{color}'", 1)
             if "fill" in path_tag:
-                path_tag = re.sub(r'fill:[#0-9a-fA-F]+', f'fill:{red}', path_tag)
+                path_tag = re.sub(r'fill:[#0-9a-fA-F]+', f'fill:{color}', path_tag)
             else:
-                path_tag = path_tag.replace("<path", f"<path fill='{red}'", 1)
-            # Change colors inside style attributes
-            path_tag = re.sub(r'style="[^"]*"', lambda m: re.sub(r'#[0-9a-fA-F]{6}', red, m.group(0)), path_tag)
+                path_tag = path_tag.replace("<path", f"<path fill='{color}'", 1)
             return path_tag
 
-        def change_to_blue(match):
-            path_tag = match.group(0)
-            if "stroke" in path_tag:
-                path_tag = re.sub(r'stroke:[#0-9a-fA-F]+', f'stroke:{blue}', path_tag)
-            else:
-                path_tag = path_tag.replace("<path", f"<path stroke='{blue}'", 1)
-            if "fill" in path_tag:
-                path_tag = re.sub(r'fill:[#0-9a-fA-F]+', f'fill:{blue}', path_tag)
-            else:
-                path_tag = path_tag.replace("<path", f"<path fill='{blue}'", 1)
-            return path_tag
-
-        def change_to_green(match):
-            path_tag = match.group(0)
-            if "stroke" in path_tag:
-                path_tag = re.sub(r'stroke:[#0-9a-fA-F]+', f'stroke:{green}', path_tag)
-            else:
-                path_tag = path_tag.replace("<path", f"<path stroke='{green}'", 1)
-            if "fill" in path_tag:
-                path_tag = re.sub(r'fill:[#0-9a-fA-F]+', f'fill:{green}', path_tag)
-            else:
-                path_tag = path_tag.replace("<path", f"<path fill='{green}'", 1)
-            return path_tag
-
-        def change_to_pink(match):
-            path_tag = match.group(0)
-            if "stroke" in path_tag:
-                path_tag = re.sub(r'stroke:[#0-9a-fA-F]+', f'stroke:{pink}', path_tag)
-            else:
-                path_tag = path_tag.replace("<path", f"<path stroke='{pink}'", 1)
-            if "fill" in path_tag:
-                path_tag = re.sub(r'fill:[#0-9a-fA-F]+', f'fill:{pink}', path_tag)
-            else:
-                path_tag = path_tag.replace("<path", f"<path fill='{pink}'", 1)
+        def change_to_red(path_tag):
+            path_tag = change_color(path_tag, red)
+            # Change colors inside style attributes
+            path_tag = re.sub(r'style="[^"]*"', lambda m: re.sub(r'#[0-9a-fA-F]{6}', red, m.group(0)), path_tag)
             return path_tag
 
-        def change_to_orange(match):
-            path_tag = match.group(0)
-            if "stroke" in path_tag:
-                path_tag = re.sub(r'stroke:[#0-9a-fA-F]+', f'stroke:{orange}', path_tag)
-            else:
-                path_tag = path_tag.replace("<path", f"<path stroke='{orange}'", 1)
-            if "fill" in path_tag:
-                path_tag = re.sub(r'fill:[#0-9a-fA-F]+', f'fill:{orange}', path_tag)
-            else:
-                path_tag = path_tag.replace("<path", f"<path fill='{orange}'", 1)
-            return path_tag
+        def recolor(paths, change):
+            for path in paths:
+                table.replace(path, change(table.tag(path)))
 
-        def change_adjacent_paths_to_pink(svg_text):
+        def change_adjacent_paths_to_pink():
             """
             Find and color adjacent paths that have lengths 294-300 pixels in their d parameter.
             Adjacent means the path ID is within 8 positions (greater or lesser) of a pink diagonal path ID.
             """
-            
-            def extract_path_id_number(path_id):
-                """Extract numeric part from path ID (e.g., 'path13380' -> 13380)"""
-                match = re.search(r'(\d+)', path_id)
-                return int(match.group(1)) if match else None
-            
-            def color_path_pink(path_tag):
-                """Apply pink color to a path tag."""
-                new_tag = path_tag
-                
-                # Handle stroke
-                if "stroke" in new_tag:
-                    new_tag = re.sub(r'stroke:[#0-9a-fA-F]+', f'stroke:{pink}', new_tag)
-                else:
-                    new_tag = new_tag.replace("<path", f"<path stroke='{pink}'", 1)
-                
-                # Handle fill
-                if "fill" in new_tag:
-                    new_tag = re.sub(r'fill:[#0-9a-fA-F]+', f'fill:{pink}', new_tag)
-                else:
-                    new_tag = new_tag.replace("<path", f"<path fill='{pink}'", 1)
-                
-                return new_tag
-            
             # Step 1: Find all diagonal paths (frames5x4) that will be colored pink
             diagonal_path_ids = set()
-            for match in frames5x4_pattern.finditer(svg_text):
-                path_tag = match.group(0)
-                id_match = re.search(r'id="([^"]+)"', path_tag)
-                if id_match:
-                    path_id = id_match.group(1)
-                    path_id_num = extract_path_id_number(path_id)
-                    if path_id_num is not None:
-                        diagonal_path_ids.add(path_id_num)
-                        
-                        print(f"[DIAG] Found diagonal path: {path_id} (ID number: {path_id_num})")
-            
+            for path in frames5x4_paths:
+                if path.id is not None and path.number is not None:
+                    diagonal_path_ids.add(path.number)
+                    
+                    print(f"[DIAG] Found diagonal path: {path.id} (ID number: {path.number})")
             
+            # Sorted so each path's closest diagonal is a binary search away
+            diagonal_path_ids = sorted(diagonal_path_ids)
             print(f"Found {len(diagonal_path_ids)} diagonal paths with numeric IDs")
             
             # Step 2: Find all paths that contain lengths 294-300 or "V 9114" in their d parameter
-            pattern = re.compile(r'<path[^>]+d="[^"]*(?:\b(29[4-9]|300)\b|V\s+9114)[^"]*"[^>]*>', re.IGNORECASE)
-            
-            modifications = []
             adjacent_count = 0
             
-            for match in pattern.finditer(svg_text):
-                path_tag = match.group(0)
-                
-                # Get path ID
-                id_match = re.search(r'id="([^"]+)"', path_tag)
-                if not id_match:
+            for path in table:
+                if path.number is None or not path.d:
                     continue
                 
-                path_id = id_match.group(1)
-                path_id_num = extract_path_id_number(path_id)
-                
-                if path_id_num is None:
+                match = ADJACENT_LENGTH.search(path.d)
+                if match is None:
                     continue
                 
                 # Get the matched length
                 length = match.group(1)
                 
                 # Check if this path is adjacent to any diagonal path (within 8 positions)
-                is_adjacent = False
-                closest_diagonal = None
-                min_distance = float('inf')
+                closest_diagonal, min_distance = closest_id(diagonal_path_ids, path.number)
                 
-                for diagonal_id in diagonal_path_ids:
-                    distance = abs(path_id_num - diagonal_id)
-                    if distance <= 8 and distance < min_distance:
-                        is_adjacent = True
-                        closest_diagonal = diagonal_id
-                        min_distance = distance
-                
-                if is_adjacent:
-                    # Get the d parameter for logging
-                    d_match = re.search(r'd="([^"]+)"', path_tag)
-                    d_str = d_match.group(1) if d_match else "unknown"
-                    
-                    
-                    print(f"[FOUND] Path {path_id} (ID: {path_id_num}) contains length {length} in d='{d_str}'")
+                if closest_diagonal is not None and min_distance <= ADJACENT_DISTANCE:
+                    print(f"[FOUND] Path {path.id} (ID: {path.number}) contains length {length} in d='{path.d}'")
                     print(f"[ADJACENT] Distance {min_distance} from diagonal path ID {closest_diagonal}")
                     
                     # Color this path pink
-                    pink_tag = color_path_pink(path_tag)
-                    modifications.append((path_tag, pink_tag))
+                    table.replace(path, change_color(table.tag(path), pink))
                     adjacent_count += 1
                     
-                    print(f"[NEIGH] id={path_id} → PINK (adjacent to diagonal ID {closest_diagonal}, distance: {min_distance})")
+                    print(f"[NEIGH] id={path.id} → PINK (adjacent to diagonal ID {closest_diagonal}, distance: {min_distance})")
             
             print(f"Total adjacent paths with lengths 294-300: {adjacent_count}")
-            print(f"Total modifications to apply: {len(modifications)}")
-            
-            # Apply all modifications
-            modified_text = svg_text
-            for original_tag, pink_tag in modifications:
-                modified_text = modified_text.replace(original_tag, pink_tag)
-            
-            return modified_text
 
-        # Apply colors
-        modified_svg_text = shores_box_pattern.sub(change_to_red, svg_text)
-        modified_svg_text = shores.sub(change_to_blue, modified_svg_text)
+        # Apply colors to the matched paths, then write the document once
+        recolor(shores_box_paths, change_to_red)
+        recolor(shores_paths, lambda path_tag: change_color(path_tag, blue))
         
         # First apply adjacent path coloring, then the diagonal paths
-        modified_svg_text = change_adjacent_paths_to_pink(modified_svg_text)
-        modified_svg_text = frames5x4_pattern.sub(change_to_pink, modified_svg_text)
-        modified_svg_text = framesinBox_pattern.sub(change_to_orange, modified_svg_text)
-        modified_svg_text = frames6x4_pattern.sub(change_to_green, modified_svg_text)
-
-        # Write modified content
-        with open(output_file, "w", encoding="utf-8") as file:
-            file.write(modified_svg_text)
+        change_adjacent_paths_to_pink()
+        recolor(frames5x4_paths, lambda path_tag: change_color(path_tag, pink))
+        recolor(framesinBox_paths, lambda path_tag: change_color(path_tag, orange))
+        recolor(frames6x4_paths, lambda path_tag: change_color(path_tag, green))
+        modified_svg_text = table.render()
 
-        
         print("SVG file updated successfully.")
+        return modified_svg_text, counts
 
     except Exception as e:
         
         print(f"Error applying colors: {e}", "error")
+        return None, {}
 
-def svg_to_png(svg_path, png_path):
-    """Convert SVG to PNG format"""
+def svg_to_png(svg_text, png_path):
+    """Render SVG text to a PNG file through the shared render cache"""
     try:
-        # Set fontconfig path if not already set
-        if not os.environ.get('FONTCONFIG_PATH'):
-            os.environ['FONTCONFIG_PATH'] = '/etc/fonts'
-        
-        # Convert SVG to PNG bytes
-        png_data = cairosvg.svg2png(url=svg_path)
-        
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(png_data))
-        
-        # Save as PNG
-        image.save(png_path, 'PNG')
+        save_png(svg_text, png_path)
         
         print(f"✅ SVG converted to PNG: {png_path}")
         return True
@@ -338,52 +240,49 @@ def svg_to_png(svg_path, png_path):
         print("💡 This might be due to missing fontconfig or cairo dependencies")
         return False
 
-def run_step4():
+def run_step4(workspace=None):
     """
     Main function to run Step4 processing
     """
     try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
+        workspace = workspace or Workspace()
         
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step3.svg"
-            output_svg = "../files/Step4.svg"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step3.svg"
-            output_svg = "files/Step4.svg"
+        svg_text = workspace.get_svg("Step3")
+        if svg_text is None:
+            print(f"Error: Input file '{workspace.svg_path('Step3')}' not found!", "error")
+            return failed("Step4", "Input document 'Step3' not found")
         
-        # Check if input file exists
-        if not os.path.exists(input_svg):
-            
-            print(f"Error: Input file '{input_svg}' not found!", "error")
-            print(f"Current working directory: {os.getcwd()}", "error")
-            print(f"Tried path: {input_svg}", "error")
-            return False
+        result = StepResult(step="Step4", success=True)
         
-        apply_color_to_specific_paths(input_svg, output_svg)
+        start = time.perf_counter()
+        modified_svg_text, result.counts = apply_color_to_specific_paths(svg_text)
+        result.timings["recolor"] = time.perf_counter() - start
+        if modified_svg_text is None:
+            return failed("Step4", "Could not apply pattern colors")
+        workspace.put_svg("Step4", modified_svg_text)
+        result.artifacts["document"] = "Step4"
         
         # Convert SVG to PNG
-        output_png = output_svg.replace('.svg', '-results.png')
-        if svg_to_png(output_svg, output_png):
-            
+        output_png = workspace.path("Step4-results.png")
+        start = time.perf_counter()
+        if svg_to_png(modified_svg_text, output_png):
+            result.artifacts["results_png"] = output_png
             print(f"   - Generated PNG: {output_png}")
         else:
             print(f"   - Warning: PNG conversion failed", "warning")
+        result.timings["render"] = time.perf_counter() - start
         
         
         print(f"✅ Step4 completed successfully:")
-        print(f"   - Input SVG: {input_svg}")
-        print(f"   - Processed SVG: {output_svg}")
+        print(f"   - Input SVG: Step3")
+        print(f"   - Processed SVG: Step4")
         print(f"   - Generated PNG: {output_png}")
-        return True
+        return result
             
     except Exception as e:
         
         print(f"An error occurred: {str(e)}", "error")
-        return False
+        return failed("Step4", str(e))
 
 # Main execution
 if __name__ == "__main__":
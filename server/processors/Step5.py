@@ -12,35 +12,37 @@ import re
 import os
 import shutil
 import sys
+import time
 from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-import cairosvg
-import io
 from PIL import Image
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from utils.workspace import Workspace
+from utils.render_service import render
+from step_result import StepResult, failed, boxes_from_groups
+
 # Configure environment for headless operation
 os.environ['QT_QPA_PLATFORM'] = 'offscreen'
 os.environ['MPLBACKEND'] = 'Agg'
 os.environ['OPENCV_IO_ENABLE_OPENEXR'] = '1'
 
 
-def svg_to_image(svg_path, output_path=None):
-    """Convert SVG to PIL Image"""
+def svg_to_image(svg_path, output_path=None, svg_text=None):
+    """
+    Render SVG to an RGBA NumPy array through the shared render cache,
+    rendering svg_text when given instead of reading svg_path
+    """
     try:
-        # Set fontconfig path if not already set
-        if not os.environ.get('FONTCONFIG_PATH'):
-            os.environ['FONTCONFIG_PATH'] = '/etc/fonts'
-        
-        # Convert SVG to PNG bytes
-        png_data = cairosvg.svg2png(url=svg_path)
+        if svg_text is None:
+            with open(svg_path, 'r', encoding='utf-8') as f:
+                svg_text = f.read()
         
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(png_data))
+        image = render(svg_text)
         
         if output_path:
             # Save as PNG if output path is provided
-            image.save(output_path, 'PNG')
+            Image.fromarray(image).save(output_path, 'PNG')
             
             print(f"SVG converted and saved as: {output_path}")
         
@@ -51,22 +53,23 @@ def svg_to_image(svg_path, output_path=None):
         print("💡 This might be due to missing fontconfig or cairo dependencies")
         return None
 
-def detect_blue_x_shapes(image_path, output_path='results.png'):
-    """Detect individual blue X shapes using contour detection"""
+def detect_blue_x_shapes(image_path, output_path='results.png', svg_text=None):
+    """Detect individual blue X shapes using contour detection.
+    Returns the bounding boxes of the detections (None if the image could not be loaded)."""
     
     print(f"Processing image: {image_path}")
     
     try:
         # Check if input is SVG and convert if needed
-        if str(image_path).lower().endswith('.svg'):
+        if svg_text is not None or str(image_path).lower().endswith('.svg'):
             
             print("Converting SVG to image for processing...")
-            pil_image = svg_to_image(image_path)
-            if pil_image is None:
-                return 0
+            image = svg_to_image(image_path, svg_text=svg_text)
+            if image is None:
+                return None
             
-            # Convert PIL Image to OpenCV format
-            img = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+            # Convert the RGBA array to OpenCV format
+            img = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
         else:
             # Read image directly if it's not SVG
             img = cv2.imread(str(image_path))
@@ -74,11 +77,11 @@ def detect_blue_x_shapes(image_path, output_path='results.png'):
         if img is None:
             
             print(f"Error: Could not read image {image_path}", "error")
-            return 0
+            return None
     except Exception as e:
         print(f"❌ Error in image processing setup: {e}")
         print("💡 This might be due to missing OpenGL or OpenCV dependencies")
-        return 0
+        return None
     
     # Convert to HSV for better color detection
     hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
@@ -209,18 +212,15 @@ def detect_blue_x_shapes(image_path, output_path='results.png'):
     
     print(f"Total X shapes detected: {len(valid_contours)}")
     
-    return len(valid_contours)
+    return boxes_from_groups(valid_contours)
 
-def process_svg_colors(input_svg, output_svg):
+def process_svg_colors(content):
     """
     Process SVG colors by replacing most hex colors with #202124,
     while keeping #0000ff and #fb0505 unchanged.
+    Returns the processed SVG text (None on error).
     """
     try:
-        # Read the SVG file
-        with open(input_svg, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
         # Find all hex color codes (#xxxxxx)
         hex_pattern = r'#([0-9a-fA-F]{6})'
         
@@ -235,56 +235,62 @@ def process_svg_colors(input_svg, output_svg):
         # Replace colors using the function
         processed_content = re.sub(hex_pattern, replace_color, content)
         
-        # Write the processed content to a new file
-        with open(output_svg, 'w', encoding='utf-8') as file:
-            file.write(processed_content)
-        
-        
         print("SVG processing completed!")
         print("Original colors replaced with #202124 (except #0000ff)")
-        print(f"Output saved to: {output_svg}")
-        
-    except FileNotFoundError:
+        return processed_content
         
-        print(f"Error: Could not find input file {input_svg}", "error")
     except Exception as e:
         
         print(f"Error processing SVG: {e}", "error")
+        return None
 
-def run_step5():
+def run_step5(workspace=None):
     """
     Run Step5 processing - detect blue X shapes
     """
     try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
+        workspace = workspace or Workspace()
+        output_results = workspace.path("Step5-results.svg")
         
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step4.svg"
-            output_svg = "../files/Step5.svg"
-            output_results = "../files/Step5-results.svg"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step4.svg"
-            output_svg = "files/Step5.svg"
-            output_results = "files/Step5-results.svg"
+        svg_text = workspace.get_svg("Step4")
+        if svg_text is None:
+            print(f"Error: Input file '{workspace.svg_path('Step4')}' not found!", "error")
+            return failed("Step5", "Input document 'Step4' not found")
+        
+        result = StepResult(step="Step5", success=True)
         
         # First process SVG colors
-        process_svg_colors(input_svg, output_svg)
+        start = time.perf_counter()
+        step5_svg = process_svg_colors(svg_text)
+        result.timings["recolor"] = time.perf_counter() - start
+        if step5_svg is None:
+            return failed("Step5", "Could not recolor the Step4 document")
+        workspace.put_svg("Step5", step5_svg)
+        result.artifacts["document"] = "Step5"
         
         # Then detect blue X shapes on the processed SVG
         
-        print(f"Detecting blue X shapes in: {output_svg}")
-        count = detect_blue_x_shapes(output_svg, output_results)
-        print(f"\nFinal count: {count} blue X shapes")
+        print(f"Detecting blue X shapes in: Step5")
+        start = time.perf_counter()
+        detections = detect_blue_x_shapes(workspace.svg_path("Step5"), output_results, svg_text=step5_svg)
+        result.timings["detect"] = time.perf_counter() - start
         
-        return True
+        if detections is not None:
+            result.detections = detections
+            result.count = len(detections)
+            result.artifacts["results_png"] = workspace.path("Step5-results.png")
+        else:
+            # Keep reporting 0 when the image could not be processed
+            result.count = 0
+            result.error = "Detection could not process the rendered image"
+        print(f"\nFinal count: {result.count} blue X shapes")
+        
+        return result
         
     except Exception as e:
         
         print(f"Error in processing: {e}", "error")
-        return False
+        return failed("Step5", str(e))
 
 def main():
     parser = argparse.ArgumentParser(description='Contour-based Blue X Detection')
@@ -303,35 +309,10 @@ def main():
         return
     
     # Detect X shapes
-    count = detect_blue_x_shapes(source_path, args.output)
+    detections = detect_blue_x_shapes(source_path, args.output)
+    count = len(detections) if detections is not None else 0
     
     print(f"\nFinal count: {count} blue X shapes")
 
 if __name__ == "__main__":
-    try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
-        
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step4.svg"
-            output_svg = "../files/Step5.svg"
-            output_results = "../files/Step5-results.svg"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step4.svg"
-            output_svg = "files/Step5.svg"
-            output_results = "files/Step5-results.svg"
-        
-        # First process SVG colors
-        process_svg_colors(input_svg, output_svg)
-        
-        # Then detect blue X shapes on the processed SVG
-        
-        print(f"Detecting blue X shapes in: {output_svg}")
-        count = detect_blue_x_shapes(output_svg, output_results)
-        print(f"\nFinal count: {count} blue X shapes")
-        
-    except Exception as e:
-        
-        print(f"Error in processing: {e}", "error")
\ No newline at end of file
+    run_step5()
@@ -10,34 +10,33 @@ import cv2
 import numpy as np
 from pathlib import Path
 import argparse
-import cairosvg
-import io
 from PIL import Image
 import sys
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from utils.workspace import Workspace
+from utils.render_service import render
+from step_result import StepResult, failed, boxes_from_groups
+from svg_paths import PathTable
+from pattern_registry import get_patterns
 
-# Shores pattern for detecting specific path elements
-shores = re.compile(
-    r'<path[^>]+d="[^"]*m\s*(-?\d+),(-?\d+)\s+('
-    r'-?(33|34),-?(33|34)|'
-    r'-?(33|34),(33|34)|'
-    r'(33|34),-?(33|34)|'
-    r'(33|34),(33|34))[^"]*"[^>]*>'
-)
 
-def svg_to_image(svg_path, output_path=None):
-    """Convert SVG to PIL Image"""
+def svg_to_image(svg_path, output_path=None, svg_text=None):
+    """
+    Render SVG to an RGBA NumPy array through the shared render cache,
+    rendering svg_text when given instead of reading svg_path
+    """
     try:
-        # Convert SVG to PNG bytes
-        png_data = cairosvg.svg2png(url=svg_path)
+        if svg_text is None:
+            with open(svg_path, 'r', encoding='utf-8') as f:
+                svg_text = f.read()
         
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(png_data))
+        image = render(svg_text)
         
         if output_path:
             # Save as PNG if output path is provided
-            image.save(output_path, 'PNG')
+            Image.fromarray(image).save(output_path, 'PNG')
             
             print(f"SVG converted and saved as: {output_path}")
         
@@ -47,21 +46,22 @@ def svg_to_image(svg_path, output_path=None):
         print(f"Error converting SVG to image: {e}", "error")
         return None
 
-def detect_red_squares(image_path, output_path='results.png'):
-    """Detect individual red squares with color #fb0505 using contour detection"""
+def detect_red_squares(image_path, output_path='results.png', svg_text=None):
+    """Detect individual red squares with color #fb0505 using contour detection.
+    Returns the bounding boxes of the detections (None if the image could not be loaded)."""
     
     print(f"Processing image: {image_path}")
     
     # Check if input is SVG and convert if needed
-    if str(image_path).lower().endswith('.svg'):
+    if svg_text is not None or str(image_path).lower().endswith('.svg'):
         
         print("Converting SVG to image for processing...")
-        pil_image = svg_to_image(str(image_path))
-        if pil_image is None:
-            return 0
+        image = svg_to_image(str(image_path), svg_text=svg_text)
+        if image is None:
+            return None
         
-        # Convert PIL Image to OpenCV format
-        img = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        # Convert the RGBA array to OpenCV format
+        img = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
     else:
         # Read image directly if it's not SVG
         img = cv2.imread(str(image_path))
@@ -69,7 +69,7 @@ def detect_red_squares(image_path, output_path='results.png'):
     if img is None:
         
         print(f"Error: Could not read image {image_path}", "error")
-        return 0
+        return None
     
     print(f"Image loaded successfully: {img.shape}")
     
@@ -273,30 +273,17 @@ def detect_red_squares(image_path, output_path='results.png'):
         os.remove(debug_mask_path)
         print(f"Debug mask deleted: {debug_mask_path}")
     
-    return len(valid_contours)
+    return boxes_from_groups(valid_contours)
 
-def process_svg_colors():
-    # Get the current working directory to determine the correct paths
-    current_dir = os.getcwd()
-    
-    # If we're in the processors directory, use relative paths
-    if current_dir.endswith('processors'):
-        input_svg = "../files/Step4.svg"
-        output_svg = "../files/Step6.svg"
-        output_results = "../files/Step6-results.png"
-    else:
-        # If we're in the server directory (when called from pipeline), use direct paths
-        input_svg = "files/Step4.svg"
-        output_svg = "files/Step6.svg"
-        output_results = "files/Step6-results.png"
-    
-    # PHASE 1: Color processing from Step4.svg to Step6.svg
+def process_svg_colors(content):
+    """
+    Recolor the Step4 document for red square detection and return the result.
+    All phases work on the same in-memory text.
+    """
     
-    print("PHASE 1: Processing colors from Step4.svg to Step6.svg")
+    # PHASE 1: Color processing of the Step4 document
     
-    # Read the SVG file
-    with open(input_svg, 'r', encoding='utf-8') as file:
-        content = file.read()
+    print("PHASE 1: Processing colors from Step4 to Step6")
     
     # Find all hex color codes (#xxxxxx)
     hex_pattern = r'#([0-9a-fA-F]{6})'
@@ -312,20 +299,12 @@ def process_svg_colors():
             return '#202124'
     
     # Replace colors using the function
-    processed_content = re.sub(hex_pattern, replace_color, content)
-    
-    # Write the processed content to Step6.svg
-    with open(output_svg, 'w', encoding='utf-8') as file:
-        file.write(processed_content)
-    
-    print("Phase 1 completed: Colors processed and saved to Step6.svg")
+    content = re.sub(hex_pattern, replace_color, content)
     
-    # PHASE 2: Shores processing on Step6.svg
-    print("\nPHASE 2: Processing shores on Step6.svg")
+    print("Phase 1 completed: Colors processed")
     
-    # Read the Step6.svg file for shores processing
-    with open(output_svg, 'r', encoding='utf-8') as file:
-        content = file.read()
+    # PHASE 2: Shores processing
+    print("\nPHASE 2: Processing shores")
     
     # Pattern to find elements with stroke:#fb0505 and fill:none
     # This will match the style attribute and replace fill:none with fill:#fb0505
@@ -341,8 +320,7 @@ def process_svg_colors():
     modified_content = re.sub(pattern, replace_fill, content)
     
     # Function to change shores color to #202124
-    def change_shores_color(match):
-        path_element = match.group(0)
+    def change_shores_color(path_element):
         
         # Check if the path has a style attribute
         if 'style=' in path_element:
@@ -360,8 +338,11 @@ def process_svg_colors():
         
         return path_element
     
-    # Apply the shores color change
-    modified_content = shores.sub(change_shores_color, modified_content)
+    # Apply the shores color change to the matching paths in one splice
+    table = PathTable(modified_content)
+    for path in table.matching(get_patterns().tag_regex("shores")):
+        table.replace(path, change_shores_color(table.tag(path)))
+    modified_content = table.render()
     
     # Final color transformations: #202124 to black, red to red
     # Change all #202124 to black (for squares)
@@ -370,10 +351,6 @@ def process_svg_colors():
     # Change all #fb0505 (red) to red (for background)
     modified_content = modified_content.replace('#fb0505', '#ff0000')
     
-    # Write the final processed content back to Step6.svg
-    with open(output_svg, 'w', encoding='utf-8') as file:
-        file.write(modified_content)
-    
     print("SVG processing completed!")
     print("Phase 1: Original colors replaced with #202124 (except #fb0505)")
     print("Phase 1: #0000ff changed to #fb0505")
@@ -381,14 +358,9 @@ def process_svg_colors():
     print("Phase 2: All shores matching the pattern now have stroke color #202124")
     print("Phase 2: All #202124 colors changed to black (squares)")
     print("Phase 2: All red (#fb0505) colors changed to red (background)")
-    print(f"Final output saved to: {output_svg}")
     
     # PHASE 3: Fill squares before conversion
-    print("\nPHASE 3: Filling squares in Step6.svg")
-    
-    # Read the Step6.svg file for square filling
-    with open(output_svg, 'r', encoding='utf-8') as file:
-        content = file.read()
+    print("\nPHASE 3: Filling squares")
     
     # More selective approach: only fill elements that have red stroke
     # Pattern to find elements with stroke:#ff0000 and fill:none
@@ -401,55 +373,61 @@ def process_svg_colors():
         return new_style
     
     # Apply the replacement to fill only red squares
-    filled_content = re.sub(fill_pattern, fill_red_squares, content)
-    
-    # Write the filled content back to Step6.svg
-    with open(output_svg, 'w', encoding='utf-8') as file:
-        file.write(filled_content)
+    filled_content = re.sub(fill_pattern, fill_red_squares, modified_content)
     
     print("Phase 3 completed: Squares filled with red color")
-    print(f"Filled SVG saved to: {output_svg}")
-    
-    # PHASE 4: Contour-based object detection
-    print("\nPHASE 4: Contour-based object detection on Step6.svg")
-    
-    try:
-        # Detect red squares in the processed SVG
-        count = detect_red_squares(output_svg, output_results)
-        print(f"Phase 3 completed: Detected {count} red squares")
-        print(f"Results saved to: {output_results}")
-    except Exception as e:
-        print(f"Phase 3 error: {e}", "error")
-        print("Note: Make sure cairosvg is installed: pip install cairosvg", "warning")
+    return filled_content
 
-def run_step6():
+def run_step6(workspace=None):
     """
     Run Step6 processing - detect red squares
     """
     try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
-        
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step4.svg"
-            output_svg = "../files/Step6.svg"
-            output_results = "../files/Step6-results.png"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step4.svg"
-            output_svg = "files/Step6.svg"
-            output_results = "files/Step6-results.png"
+        workspace = workspace or Workspace()
+        output_results = workspace.path("Step6-results.png")
         
-        # Run full SVG processing pipeline
-        process_svg_colors()
+        svg_text = workspace.get_svg("Step4")
+        if svg_text is None:
+            print(f"Error: Input file '{workspace.svg_path('Step4')}' not found!", "error")
+            return failed("Step6", "Input document 'Step4' not found")
+        
+        result = StepResult(step="Step6", success=True)
+        
+        # Recolor in memory, then detect on the rendered result
+        start = time.perf_counter()
+        step6_svg = process_svg_colors(svg_text)
+        result.timings["recolor"] = time.perf_counter() - start
+        workspace.put_svg("Step6", step6_svg)
+        result.artifacts["document"] = "Step6"
+        
+        # PHASE 4: Contour-based object detection
+        print("\nPHASE 4: Contour-based object detection on Step6")
+        
+        try:
+            start = time.perf_counter()
+            detections = detect_red_squares(workspace.svg_path("Step6"), output_results, svg_text=step6_svg)
+            result.timings["detect"] = time.perf_counter() - start
+            if detections is not None:
+                result.detections = detections
+                result.count = len(detections)
+                result.artifacts["results_png"] = output_results
+            else:
+                # No count when the image could not be processed, so the step
+                # is left out of step_results as it always has been
+                result.error = "Detection could not process the rendered image"
+            print(f"Phase 3 completed: Detected {result.count} red squares")
+            print(f"Results saved to: {output_results}")
+        except Exception as e:
+            print(f"Phase 3 error: {e}", "error")
+            result.error = str(e)
+            print("Note: Make sure cairosvg is installed: pip install cairosvg", "warning")
         
-        return True
+        return result
         
     except Exception as e:
         
         print(f"Error in processing: {e}", "error")
-        return False
+        return failed("Step6", str(e))
 
 def main():
     parser = argparse.ArgumentParser(description='Contour-based Red Square Detection (#fb0505)')
@@ -470,11 +448,12 @@ def main():
             print(f"Error: Source not found at {source_path}", "error")
             return
         
-        count = detect_red_squares(source_path, args.output)
+        detections = detect_red_squares(source_path, args.output)
+        count = len(detections) if detections is not None else 0
         print(f"\nFinal count: {count} red squares (#fb0505)")
     else:
         # Run full SVG processing pipeline
-        process_svg_colors()
+        run_step6()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
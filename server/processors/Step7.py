@@ -13,25 +13,31 @@ from pathlib import Path
 import argparse
 import shutil
 import sys
+import time
 from datetime import datetime
-import cairosvg
-import io
 from PIL import Image
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from utils.workspace import Workspace
+from utils.render_service import render
+from step_result import StepResult, failed, boxes_from_groups
 
-def svg_to_image(svg_path, output_path=None):
-    """Convert SVG to PIL Image"""
+
+def svg_to_image(svg_path, output_path=None, svg_text=None):
+    """
+    Render SVG to an RGBA NumPy array through the shared render cache,
+    rendering svg_text when given instead of reading svg_path
+    """
     try:
-        # Convert SVG to PNG bytes
-        png_data = cairosvg.svg2png(url=svg_path)
+        if svg_text is None:
+            with open(svg_path, 'r', encoding='utf-8') as f:
+                svg_text = f.read()
         
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(png_data))
+        image = render(svg_text)
         
         if output_path:
             # Save as PNG if output path is provided
-            image.save(output_path, 'PNG')
+            Image.fromarray(image).save(output_path, 'PNG')
             
             print(f"SVG converted and saved as: {output_path}")
         
@@ -41,27 +47,28 @@ def svg_to_image(svg_path, output_path=None):
         print(f"Error converting SVG to image: {e}", "error")
         return None
 
-def detect_pink_shapes(image_path, output_path='pink_results.png'):
-    """Detect individual pink shapes using contour detection"""
+def detect_pink_shapes(image_path, output_path='pink_results.png', svg_text=None):
+    """Detect individual pink shapes using contour detection.
+    Returns the bounding boxes of the detections (None if the image could not be loaded)."""
     
     print(f"Processing image: {image_path}")
     
     # Check if input is SVG and convert if needed
-    if str(image_path).lower().endswith('.svg'):
+    if svg_text is not None or str(image_path).lower().endswith('.svg'):
         print("Converting SVG to image for processing...")
-        pil_image = svg_to_image(image_path)
-        if pil_image is None:
-            return 0
+        image = svg_to_image(image_path, svg_text=svg_text)
+        if image is None:
+            return None
         
-        # Convert PIL Image to OpenCV format
-        img = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        # Convert the RGBA array to OpenCV format
+        img = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
     else:
         # Read image directly if it's not SVG
         img = cv2.imread(str(image_path))
     
     if img is None:
         print(f"Error: Could not read image {image_path}", "error")
-        return 0
+        return None
     
     # Convert to HSV for better color detection
     hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
@@ -188,7 +195,7 @@ def detect_pink_shapes(image_path, output_path='pink_results.png'):
     
     print(f"Total pink shapes detected: {len(valid_contours)}")
     
-    return len(valid_contours)
+    return boxes_from_groups(valid_contours)
 
 def parse_path_data(d):
     """Parse SVG path data to extract coordinates"""
@@ -291,16 +298,13 @@ def path_to_rect(match):
     
     return rect_element
 
-def process_svg_colors(input_svg, output_svg):
+def process_svg_colors(content):
     """
     Process SVG colors by replacing most hex colors with #202124,
     while keeping #ff00cd unchanged and converting strokes to fills.
+    Returns the processed SVG text (None on error).
     """
     try:
-        # Read the SVG file
-        with open(input_svg, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
         # Create first output: only pink elements (#ff00cd)
         def keep_only_pink(match):
             color = match.group(1).lower()
@@ -358,56 +362,62 @@ def process_svg_colors(input_svg, output_svg):
         # Apply the path-to-rect conversion
         processed_content = re.sub(path_pattern, path_to_rect, processed_content)
         
-        # Write the processed content to the output file
-        with open(output_svg, 'w', encoding='utf-8') as file:
-            file.write(processed_content)
-        
-        
         print("SVG processing completed!")
         print("Original colors replaced with #202124 (except #ff00cd)")
-        print(f"Output saved to: {output_svg}")
-        
-    except FileNotFoundError:
+        return processed_content
         
-        print(f"Error: Could not find input file {input_svg}", "error")
     except Exception as e:
         
         print(f"Error processing SVG: {e}", "error")
+        return None
 
-def run_step7():
+def run_step7(workspace=None):
     """
     Run Step7 processing - detect pink shapes
     """
     try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
-        
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step4.svg"
-            output_svg = "../files/Step7.svg"
-            output_results = "../files/Step7-results.png"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step4.svg"
-            output_svg = "files/Step7.svg"
-            output_results = "files/Step7-results.png"
+        workspace = workspace or Workspace()
+        output_results = workspace.path("Step7-results.png")
+        
+        svg_text = workspace.get_svg("Step4")
+        if svg_text is None:
+            print(f"Error: Input file '{workspace.svg_path('Step4')}' not found!", "error")
+            return failed("Step7", "Input document 'Step4' not found")
+        
+        result = StepResult(step="Step7", success=True)
         
         # First process SVG colors
-        process_svg_colors(input_svg, output_svg)
+        start = time.perf_counter()
+        step7_svg = process_svg_colors(svg_text)
+        result.timings["recolor"] = time.perf_counter() - start
+        if step7_svg is None:
+            return failed("Step7", "Could not recolor the Step4 document")
+        workspace.put_svg("Step7", step7_svg)
+        result.artifacts["document"] = "Step7"
         
         # Then detect pink shapes on the processed SVG
         
-        print(f"Detecting pink shapes in: {output_svg}")
-        count = detect_pink_shapes(output_svg, output_results)
-        print(f"\nFinal count: {count} pink shapes")
+        print(f"Detecting pink shapes in: Step7")
+        start = time.perf_counter()
+        detections = detect_pink_shapes(workspace.svg_path("Step7"), output_results, svg_text=step7_svg)
+        result.timings["detect"] = time.perf_counter() - start
         
-        return True
+        if detections is not None:
+            result.detections = detections
+            result.count = len(detections)
+            result.artifacts["results_png"] = workspace.path("Step7-results.png")
+        else:
+            # Keep reporting 0 when the image could not be processed
+            result.count = 0
+            result.error = "Detection could not process the rendered image"
+        print(f"\nFinal count: {result.count} pink shapes")
+        
+        return result
         
     except Exception as e:
         
         print(f"Error in processing: {e}", "error")
-        return False
+        return failed("Step7", str(e))
 
 def main():
     parser = argparse.ArgumentParser(description='Contour-based Pink Shape Detection')
@@ -425,35 +435,10 @@ def main():
         return
     
     # Detect pink shapes
-    count = detect_pink_shapes(source_path, args.output)
+    detections = detect_pink_shapes(source_path, args.output)
+    count = len(detections) if detections is not None else 0
     
     print(f"\nFinal count: {count} pink shapes")
 
 if __name__ == "__main__":
-    try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
-        
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step4.svg"
-            output_svg = "../files/Step7.svg"
-            output_results = "../files/Step7-results.png"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step4.svg"
-            output_svg = "files/Step7.svg"
-            output_results = "files/Step7-results.png"
-        
-        # First process SVG colors
-        process_svg_colors(input_svg, output_svg)
-        
-        # Then detect pink shapes on the processed SVG
-        
-        print(f"Detecting pink shapes in: {output_svg}")
-        count = detect_pink_shapes(output_svg, output_results)
-        print(f"\nFinal count: {count} pink shapes")
-        
-    except Exception as e:
-        
-        print(f"Error in processing: {e}", "error")
\ No newline at end of file
+    run_step7()
@@ -11,25 +11,31 @@ import cv2
 import numpy as np
 from pathlib import Path
 import argparse
-import cairosvg
-import io
 from PIL import Image
 import sys
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from utils.workspace import Workspace
+from utils.render_service import render
+from step_result import StepResult, failed, boxes_from_groups
 
-def svg_to_image(svg_path, output_path=None):
-    """Convert SVG to PIL Image"""
+
+def svg_to_image(svg_path, output_path=None, svg_text=None):
+    """
+    Render SVG to an RGBA NumPy array through the shared render cache,
+    rendering svg_text when given instead of reading svg_path
+    """
     try:
-        # Convert SVG to PNG bytes
-        png_data = cairosvg.svg2png(url=svg_path)
+        if svg_text is None:
+            with open(svg_path, 'r', encoding='utf-8') as f:
+                svg_text = f.read()
         
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(png_data))
+        image = render(svg_text)
         
         if output_path:
             # Save as PNG if output path is provided
-            image.save(output_path, 'PNG')
+            Image.fromarray(image).save(output_path, 'PNG')
             
             print(f"SVG converted and saved as: {output_path}")
         
@@ -39,27 +45,28 @@ def svg_to_image(svg_path, output_path=None):
         print(f"Error converting SVG to image: {e}", "error")
         return None
 
-def detect_green_rectangles(image_path, output_path='results.png'):
-    """Detect individual green rectangles using contour detection"""
+def detect_green_rectangles(image_path, output_path='results.png', svg_text=None):
+    """Detect individual green rectangles using contour detection.
+    Returns the bounding boxes of the detections (None if the image could not be loaded)."""
     
     print(f"Processing image: {image_path}")
     
     # Check if input is SVG and convert if needed
-    if str(image_path).lower().endswith('.svg'):
+    if svg_text is not None or str(image_path).lower().endswith('.svg'):
         print("Converting SVG to image for processing...")
-        pil_image = svg_to_image(image_path)
-        if pil_image is None:
-            return 0
+        image = svg_to_image(image_path, svg_text=svg_text)
+        if image is None:
+            return None
         
-        # Convert PIL Image to OpenCV format
-        img = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        # Convert the RGBA array to OpenCV format
+        img = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
     else:
         # Read image directly if it's not SVG
         img = cv2.imread(str(image_path))
     
     if img is None:
         print(f"Error: Could not read image {image_path}", "error")
-        return 0
+        return None
     
     # Convert to HSV for better color detection
     hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
@@ -191,7 +198,7 @@ def detect_green_rectangles(image_path, output_path='results.png'):
         print(f"Result saved as: {output_path}")
     print(f"Total rectangles detected: {len(valid_contours)}")
     
-    return len(valid_contours)
+    return boxes_from_groups(valid_contours)
 
 def parse_path_data(d):
     """Parse SVG path data to extract coordinates"""
@@ -294,22 +301,11 @@ def path_to_rect(match):
     
     return rect_element
 
-def process_svg_colors():
-    # Get the current working directory to determine the correct paths
-    current_dir = os.getcwd()
-    
-    # If we're in the processors directory, use relative paths
-    if current_dir.endswith('processors'):
-        input_svg = "../files/Step4.svg"
-        output_svg = "../files/Step8.svg"
-    else:
-        # If we're in the server directory (when called from pipeline), use direct paths
-        input_svg = "files/Step4.svg"
-        output_svg = "files/Step8.svg"
-    
-    # Read the SVG file
-    with open(input_svg, 'r', encoding='utf-8') as file:
-        content = file.read()
+def process_svg_colors(content):
+    """
+    Recolor the Step4 document so only green elements remain, convert them to
+    rectangles and return the resulting SVG text
+    """
     
     # Find all hex color codes (#xxxxxx)
     hex_pattern = r'#([0-9a-fA-F]{6})'
@@ -405,51 +401,57 @@ def process_svg_colors():
     # Apply the path-to-rect conversion
     processed_content = re.sub(path_pattern, path_to_rect_updated, processed_content, flags=re.DOTALL)
     
-    # Write the processed content to a new file
-    with open(output_svg, 'w', encoding='utf-8') as file:
-        file.write(processed_content)
-    
-    
     print("SVG processing completed!")
     print("Original colors replaced with #202124 (except #70ff00)")
     print("#70ff00 stroke elements converted to filled shapes")
     print("Z-shaped paths converted to squares/rectangles")
-    print(f"Output saved to: {output_svg}")
+    return processed_content
 
-def run_step8():
+def run_step8(workspace=None):
     """
     Run Step8 processing - detect green rectangles
     """
     try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
-        
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step4.svg"
-            output_svg = "../files/Step8.svg"
-            output_results = "../files/Step8-results.png"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step4.svg"
-            output_svg = "files/Step8.svg"
-            output_results = "files/Step8-results.png"
+        workspace = workspace or Workspace()
+        output_results = workspace.path("Step8-results.png")
+        
+        svg_text = workspace.get_svg("Step4")
+        if svg_text is None:
+            print(f"Error: Input file '{workspace.svg_path('Step4')}' not found!", "error")
+            return failed("Step8", "Input document 'Step4' not found")
+        
+        result = StepResult(step="Step8", success=True)
         
         # First process SVG colors and convert paths to rectangles
-        process_svg_colors()
+        start = time.perf_counter()
+        step8_svg = process_svg_colors(svg_text)
+        result.timings["recolor"] = time.perf_counter() - start
+        workspace.put_svg("Step8", step8_svg)
+        result.artifacts["document"] = "Step8"
         
         # Then detect green rectangles on the processed SVG
         
-        print(f"Detecting green rectangles in: {output_svg}")
-        count = detect_green_rectangles(output_svg, output_results)
-        print(f"\nFinal count: {count} green rectangles")
+        print(f"Detecting green rectangles in: Step8")
+        start = time.perf_counter()
+        detections = detect_green_rectangles(workspace.svg_path("Step8"), output_results, svg_text=step8_svg)
+        result.timings["detect"] = time.perf_counter() - start
         
-        return True
+        if detections is not None:
+            result.detections = detections
+            result.count = len(detections)
+            result.artifacts["results_png"] = workspace.path("Step8-results.png")
+        else:
+            # No count when the image could not be processed, so the step
+            # is left out of step_results as it always has been
+            result.error = "Detection could not process the rendered image"
+        print(f"\nFinal count: {result.count} green rectangles")
+        
+        return result
         
     except Exception as e:
         
         print(f"Error in processing: {e}", "error")
-        return False
+        return failed("Step8", str(e))
 
 def main():
     parser = argparse.ArgumentParser(description='Contour-based Green Rectangle Detection')
@@ -467,35 +469,10 @@ def main():
         return
     
     # Detect rectangles
-    count = detect_green_rectangles(source_path, args.output)
+    detections = detect_green_rectangles(source_path, args.output)
+    count = len(detections) if detections is not None else 0
     
     print(f"\nFinal count: {count} green rectangles")
 
 if __name__ == "__main__":
-    try:
-        # Get the current working directory to determine the correct paths
-        current_dir = os.getcwd()
-        
-        # If we're in the processors directory, use relative paths
-        if current_dir.endswith('processors'):
-            input_svg = "../files/Step8.svg"
-            output_svg = "../files/Step8.svg"
-            output_results = "../files/Step8-results.png"
-        else:
-            # If we're in the server directory (when called from pipeline), use direct paths
-            input_svg = "files/Step8.svg"
-            output_svg = "files/Step8.svg"
-            output_results = "files/Step8-results.png"
-        
-        # First process SVG colors and convert paths to rectangles
-        process_svg_colors()
-        
-        # Then detect green rectangles on the processed SVG
-        
-        print(f"Detecting green rectangles in: {output_svg}")
-        count = detect_green_rectangles(output_svg, output_results)
-        print(f"\nFinal count: {count} green rectangles")
-        
-    except Exception as e:
-        
-        print(f"Error in processing: {e}", "error")
\ No newline at end of file
+    run_step8()
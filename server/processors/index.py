@@ -1,30 +1,77 @@
 import os
+import multiprocessing
 import sys
 import importlib.util
 import json
+import time
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-def run_step(step_name, capture_output=False):
+from utils.config_manager import config_manager
+from utils.workspace import Workspace, SERVER_DIR, JOBS_DIR
+from utils.progress import report_progress
+from step_result import failed
+from step_cache import step_cache_key, load_step_result, store_step_result
+from pattern_registry import preload_patterns
+
+PROCESSORS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Detector steps that only read Step4 and can run in parallel, with the
+# step_results key suffix for their counts
+DETECTOR_STEPS = ["Step5", "Step6", "Step7", "Step8"]
+DETECTOR_DESCRIPTIONS = {
+    "Step5": "blue_X_shapes",
+    "Step6": "red_squares",
+    "Step7": "pink_shapes",
+    "Step8": "green_rectangles",
+}
+
+# SVG document each step reads from the workspace; documents are kept in memory
+# between steps and released as soon as no remaining step needs them
+STEP_INPUTS = {
+    "Step1": "original",
+    "Step2": "Step1",
+    "Step3": "Step2",
+    "Step4": "Step3",
+    "Step5": "Step4",
+    "Step6": "Step4",
+    "Step7": "Step4",
+    "Step8": "Step4",
+}
+
+def run_step(step_name, workspace):
     """
-    Dynamically import and run a processing step
+    Dynamically import and run a processing step inside the given workspace.
+    Returns the step's StepResult. A step whose input document and code are
+    unchanged since a previous run is restored from the step cache instead.
     """
     try:
         # Construct the path to the step file
-        step_file = f"processors/{step_name}.py"
+        step_file = os.path.join(PROCESSORS_DIR, f"{step_name}.py")
         
         if not os.path.exists(step_file):
             print(f"Step file {step_file} not found. Skipping...")
-            return False, None
+            return failed(step_name, f"Step file {step_file} not found")
         
         print(f"\n{'='*50}")
         print(f"Running {step_name}...")
         print(f"{'='*50}")
         
+        cache_key = None
+        input_svg = workspace.open_svg(STEP_INPUTS[step_name]) if step_name in STEP_INPUTS else None
+        if input_svg is not None:
+            with input_svg:
+                cache_key = step_cache_key(step_name, input_svg)
+            cached = load_step_result(step_name, cache_key, workspace)
+            if cached is not None:
+                print(f"✅ {step_name} completed successfully")
+                return cached
+        
         # Add processors directory to Python path so step modules can import from each other
-        processors_dir = os.path.abspath("processors")
-        if processors_dir not in sys.path:
-            sys.path.insert(0, processors_dir)
+        if PROCESSORS_DIR not in sys.path:
+            sys.path.insert(0, PROCESSORS_DIR)
         
         # Import and run the step
         spec = importlib.util.spec_from_file_location(step_name, step_file)
@@ -37,109 +84,146 @@ def run_step(step_name, capture_output=False):
         
         # Call the run function for the step
         run_function_name = f'run_{step_name.lower()}'
-        if hasattr(step_module, run_function_name):
-            run_function = getattr(step_module, run_function_name)
-            
-            if capture_output:
-                # Capture output while also displaying it to console
-                import io
-                import contextlib
-                
-                # Create a custom stream that writes to both console and buffer
-                class TeeOutput:
-                    def __init__(self, original_stdout):
-                        self.original_stdout = original_stdout
-                        self.buffer = io.StringIO()
-                    
-                    def write(self, text):
-                        self.original_stdout.write(text)
-                        self.buffer.write(text)
-                    
-                    def flush(self):
-                        self.original_stdout.flush()
-                        self.buffer.flush()
-                
-                # Replace stdout with our tee stream
-                original_stdout = sys.stdout
-                tee_output = TeeOutput(original_stdout)
-                sys.stdout = tee_output
-                
-                try:
-                    success = run_function()
-                    output = tee_output.buffer.getvalue()
-                    
-                    # Extract count based on step
-                    count = extract_count_from_output(step_name, output)
-                    
-                    if success:
-                        print(f"✅ {step_name} completed successfully")
-                        return True, count
-                    else:
-                        print(f"❌ {step_name} failed")
-                        return False, None
-                finally:
-                    # Restore original stdout
-                    sys.stdout = original_stdout
-            else:
-                success = run_function()
-                if success:
-                    print(f"✅ {step_name} completed successfully")
-                    return True, None
-                else:
-                    print(f"❌ {step_name} failed")
-                    return False, None
-        else:
+        if not hasattr(step_module, run_function_name):
             print(f"⚠️  No run function found for {step_name}")
-            return False, None
+            return failed(step_name, f"No run function found for {step_name}")
+        
+        start = time.perf_counter()
+        result = getattr(step_module, run_function_name)(workspace)
+        result.timings["total"] = time.perf_counter() - start
+        
+        if result.success:
+            if cache_key is not None:
+                store_step_result(cache_key, result, workspace)
+            print(f"✅ {step_name} completed successfully")
+        else:
+            print(f"❌ {step_name} failed")
+        return result
         
     except Exception as e:
         print(f"❌ Error running {step_name}: {str(e)}")
-        return False, None
+        return failed(step_name, str(e))
+
+def parallel_detectors_enabled():
+    """
+    Whether Steps 5-8 run in a process pool (PARALLEL_DETECTORS env var or pipeline.parallel_detectors)
+    """
+    value = os.environ.get("PARALLEL_DETECTORS")
+    if value is not None:
+        return value.lower() in ("1", "true", "yes")
+    return bool(config_manager.get_pipeline_config().get("parallel_detectors", True))
 
-def extract_count_from_output(step_name, output):
+def get_detector_workers():
     """
-    Extract count from step output based on step name
-    Only Steps 5-8 have count patterns to extract
+    Number of processes for Steps 5-8 (pipeline.detector_workers, at most one per detector)
+    """
+    value = config_manager.get_pipeline_config().get("detector_workers")
+    try:
+        if value:
+            return max(1, min(int(value), len(DETECTOR_STEPS)))
+    except (TypeError, ValueError):
+        print(f"⚠️  Invalid detector_workers value {value!r}, using {len(DETECTOR_STEPS)}")
+    return min(len(DETECTOR_STEPS), os.cpu_count() or 1)
+
+def run_detector(step_name, job_id, jobs_root, keep_artifacts, step4_svg):
+    """
+    Run one detector step in a pool worker. The Step4 document is passed in
+    directly so the worker doesn't have to read it back from disk.
+    """
+    workspace = Workspace(job_id, jobs_root, keep_artifacts=keep_artifacts)
+    workspace.documents["Step4"] = step4_svg
+    return run_step(step_name, workspace)
+
+def run_detectors_sequential(workspace, steps=None):
     """
-    count_patterns = {
-        "Step5": "Final count: ",
-        "Step6": "Total squares detected: ",
-        "Step7": "Final count: ",
-        "Step8": "Total rectangles detected: "
-    }
+    Run detector steps one after another in this process
+    """
+    results = {}
+    for step in steps or DETECTOR_STEPS:
+        results[step] = run_step(step, workspace)
+    return results
+
+def run_detectors_parallel(workspace):
+    """
+    Run Steps 5-8 concurrently in a process pool and return {step: StepResult}.
+    Falls back to running any unfinished detectors in this process if the pool fails.
+    """
+    step4_svg = workspace.get_svg("Step4")
+    if step4_svg is None:
+        print(f"Error: Input file '{workspace.svg_path('Step4')}' not found!")
+        return {step: failed(step, "Input document 'Step4' not found") for step in DETECTOR_STEPS}
     
-    # Only extract counts for Steps 5-8
-    if step_name not in count_patterns:
-        return None
+    jobs_root = os.path.dirname(workspace.files_dir) if workspace.job_id else JOBS_DIR
+    results = {}
     
-    pattern = count_patterns.get(step_name)
-    if not pattern:
-        return None
+    try:
+        max_workers = get_detector_workers()
+        print(f"\n🔀 Running {', '.join(DETECTOR_STEPS)} in parallel ({max_workers} workers)")
+        # Spawned, not forked: job processes are multithreaded (text extraction runs
+        # in a thread alongside the pipeline) and forking those can deadlock
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=preload_patterns
+        ) as executor:
+            futures = {
+                executor.submit(run_detector, step, workspace.job_id, jobs_root, workspace.keep_artifacts, step4_svg): step
+                for step in DETECTOR_STEPS
+            }
+            for future in as_completed(futures):
+                step = futures[future]
+                try:
+                    results[step] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    print(f"❌ Error running {step}: {str(e)}")
+                    results[step] = failed(step, str(e))
+    except Exception as e:
+        print(f"⚠️  Parallel detectors unavailable ({e}), running them sequentially")
     
-    for line in output.split('\n'):
-        if pattern in line:
-            try:
-                count = int(line.split(pattern)[1].split()[0])
-                return count
-            except (IndexError, ValueError):
-                continue
+    remaining = [step for step in DETECTOR_STEPS if step not in results]
+    if remaining:
+        results.update(run_detectors_sequential(workspace, remaining))
     
-    return None
+    return results
+
+def report_step_completed(workspace, result, steps_completed, steps_total):
+    """
+    Record a finished step's counts and timings in the job's progress log,
+    with the error of a detector that could not process its image
+    """
+    details = {"error": result.error} if result.error else {}
+    report_progress(
+        workspace,
+        result.step,
+        "completed",
+        count=result.count,
+        counts=result.counts,
+        timings={name: round(seconds, 3) for name, seconds in result.timings.items()},
+        steps_completed=steps_completed,
+        steps_total=steps_total,
+        **details
+    )
 
+def release_documents(workspace, remaining_steps):
+    """
+    Drop in-memory SVG documents that none of the remaining steps read
+    """
+    needed = {STEP_INPUTS.get(step) for step in remaining_steps}
+    for name in list(workspace.documents):
+        if name not in needed:
+            workspace.release_svg(name)
 
 
-def update_data_json(step_counts, upload_id=None):
+def update_data_json(step_counts, workspace, upload_id=None):
     """
-    Update data.json with the collected step counts and Cloudinary URLs
+    Update the workspace data.json with the collected step counts and Cloudinary URLs
     """
     try:
         # Read existing data.json
-        data_file = "data.json"
-        if os.path.exists(data_file):
-            with open(data_file, 'r') as f:
-                data = json.load(f)
-        else:
-            data = {}
+        data_file = workspace.data_json
+        data = workspace.read_data()
         
         # Add upload_id if provided
         if upload_id:
@@ -160,13 +244,21 @@ def update_data_json(step_counts, upload_id=None):
             
             if cloudinary_manager:
                 print("☁️  Uploading processing results to Cloudinary...")
+                report_progress(workspace, "upload", "started")
                 
                 # Upload original.svg as original.png first
                 print("📤 Uploading original.svg as original.png...")
-                original_url = cloudinary_manager.upload_original_svg_as_png()
+                original_url = cloudinary_manager.upload_original_svg_as_png(workspace.files_dir, workspace.job_id)
+                if original_url:
+                    report_progress(workspace, "upload", "progress", image="original", url=original_url)
                 
                 # Upload processing result images
-                cloudinary_urls = cloudinary_manager.upload_processing_results(step_counts)
+                cloudinary_urls = cloudinary_manager.upload_processing_results(
+                    step_counts,
+                    workspace.files_dir,
+                    workspace.job_id,
+                    on_upload=lambda name, url: report_progress(workspace, "upload", "progress", image=name, url=url)
+                )
                 
                 # Combine all URLs
                 all_urls = {}
@@ -183,15 +275,17 @@ def update_data_json(step_counts, upload_id=None):
                     print(f"✅ Total images uploaded to Cloudinary: {len(all_urls)}")
                 else:
                     print("⚠️  No images were uploaded to Cloudinary")
+                report_progress(workspace, "upload", "completed", uploaded=len(all_urls))
             else:
                 print("⚠️  Cloudinary not configured - skipping image uploads")
+                report_progress(workspace, "upload", "skipped", message="Cloudinary not configured")
                 
         except Exception as e:
             print(f"⚠️  Error uploading to Cloudinary: {str(e)}")
+            report_progress(workspace, "upload", "failed", error=str(e))
         
         # Write back to data.json
-        with open(data_file, 'w') as f:
-            json.dump(data, f, indent=4)
+        workspace.write_data(data)
         
         print(f"✅ Updated {data_file} with step results and Cloudinary URLs")
         return True
@@ -200,13 +294,13 @@ def update_data_json(step_counts, upload_id=None):
         print(f"❌ Error updating data.json: {str(e)}")
         return False
 
-def check_prerequisites():
+def check_prerequisites(workspace):
     """
     Check if required files exist before starting processing
     """
     required_files = [
-        "files/original.svg",
-        "utils/config.json"
+        workspace.path("original.svg"),
+        os.path.join(SERVER_DIR, "utils", "config.json")
     ]
     
     missing_files = []
@@ -223,55 +317,75 @@ def check_prerequisites():
     print("✅ All required files found")
     return True
 
-def main(upload_id=None):
+def main(upload_id=None, workspace=None):
     """
-    Main orchestrator function that runs all processing steps
+    Main orchestrator function that runs all processing steps.
+    All files are read from and written to the job's workspace.
     """
+    workspace = workspace or Workspace()
+    
     print("🚀 Starting AI TakeOff Processing Pipeline")
+    print(f"📁 Workspace: {workspace.files_dir}")
     print("=" * 60)
     
     # Check prerequisites
-    if not check_prerequisites():
+    if not check_prerequisites(workspace):
         print("❌ Prerequisites not met. Exiting.")
         return False
     
-    # Define the processing steps in order
-    steps = [
+    # Steps 1-4 each build on the previous one and run in sequence
+    sequential_steps = [
         "Step1",  # Remove duplicate paths
         "Step2",  # Modify colors (lightgray and black)
         "Step3",  # Add background
         "Step4",  # Apply color coding to specific patterns
-        "Step5",  # Detect blue X shapes
-        "Step6",  # Detect red squares
-        "Step7",  # Detect pink shapes
-        "Step8",  # Detect green rectangles
     ]
     
     successful_steps = 0
-    total_steps = len(steps)
+    total_steps = len(sequential_steps) + len(DETECTOR_STEPS)
     step_counts = {}
     
     # Run each step in sequence
-    for step in steps:
-        # Capture output for all steps to show progress and extract counts from Steps 5-8
-        capture_output = True
-        success, count = run_step(step, capture_output)
+    for index, step in enumerate(sequential_steps):
+        report_progress(workspace, step, "started", steps_completed=successful_steps, steps_total=total_steps)
+        result = run_step(step, workspace)
         
-        if success:
+        if result.success:
             successful_steps += 1
-            # Store count if captured (only for Steps 5-8)
-            if count is not None:
-                step_descriptions = {
-                    "Step5": "blue_X_shapes",
-                    "Step6": "red_squares", 
-                    "Step7": "pink_shapes",
-                    "Step8": "green_rectangles"
-                }
-                step_number = step.lower().replace("step", "step")
-                step_counts[f"{step_number}_{step_descriptions[step]}"] = count
+            report_step_completed(workspace, result, successful_steps, total_steps)
         else:
+            report_progress(workspace, step, "failed", error=result.error, steps_completed=successful_steps, steps_total=total_steps)
             print(f"⚠️  Pipeline stopped due to failure in {step}")
             break
+        
+        release_documents(workspace, sequential_steps[index + 1:] + DETECTOR_STEPS)
+    
+    # Steps 5-8 only read Step4, so they can run side by side
+    if successful_steps == len(sequential_steps):
+        for step in DETECTOR_STEPS:
+            report_progress(workspace, step, "started", steps_completed=successful_steps, steps_total=total_steps)
+        
+        if parallel_detectors_enabled():
+            detector_results = run_detectors_parallel(workspace)
+        else:
+            detector_results = run_detectors_sequential(workspace)
+        
+        # Record in step order so step_results is stable whatever finished first
+        for step in DETECTOR_STEPS:
+            result = detector_results.get(step) or failed(step, "Step did not run")
+            if result.success:
+                successful_steps += 1
+                report_step_completed(workspace, result, successful_steps, total_steps)
+                # Steps 6 and 8 have no count when detection failed (see result.error);
+                # leave them out so that stays distinguishable from finding nothing
+                if result.count is not None:
+                    step_counts[f"{step.lower()}_{DETECTOR_DESCRIPTIONS[step]}"] = result.count
+            else:
+                report_progress(workspace, step, "failed", error=result.error, steps_completed=successful_steps, steps_total=total_steps)
+                print(f"⚠️  {step} failed")
+    
+    # Nothing is read after the last step
+    release_documents(workspace, [])
     
     # Summary
     print(f"\n{'='*60}")
@@ -284,16 +398,15 @@ def main(upload_id=None):
         
         # Update data.json with the collected counts
         if step_counts:
-            if update_data_json(step_counts, upload_id):
+            if update_data_json(step_counts, workspace, upload_id):
                 print("✅ Step counts successfully stored in data.json")
             else:
                 print("⚠️  Failed to store step counts in data.json")
         
         # Check if data.json was created/updated
-        if os.path.exists("data.json"):
+        if os.path.exists(workspace.data_json):
             try:
-                with open("data.json", 'r') as f:
-                    data = json.load(f)
+                data = workspace.read_data()
                 print("📄 data.json updated with processing results")
                 if 'original_drawing' in data:
                     print(f"   - Original drawing URL: {data['original_drawing']}")
@@ -315,8 +428,4 @@ def main(upload_id=None):
     return True
 
 if __name__ == "__main__":
-    # Change to the server directory to ensure proper file paths
-    server_dir = Path(__file__).parent.parent
-    os.chdir(server_dir)
-    
     main()
\ No newline at end of file
@@ -0,0 +1,48 @@
+from typing import Dict
+
+from pattern_registry import get_patterns
+
+# Step4's categories in the order their colors are applied; a path in several
+# categories gets each color in turn, so the later ones take precedence
+CATEGORIES = ("shores_box", "shores", "frames_5x4", "frames_inBox", "frames_6x4")
+
+
+def classify(d: str) -> int:
+    """
+    Bits (get_patterns().bits) of the pattern sets whose patterns a path's d
+    attribute contains
+    """
+    patterns = get_patterns()
+    mask = patterns.shapes.lookup(d)
+    for _, value in patterns.automaton.iter(d):
+        mask |= value
+
+    for name, regex in patterns.regexes.items():
+        bit = patterns.bits[name]
+        candidate = patterns.candidates[name]
+        if not mask & bit and (not candidate or mask & candidate) and regex.search(d):
+            mask |= bit
+    return mask
+
+
+def classify_paths(table) -> Dict[str, list]:
+    """
+    Sort the paths of a PathTable into Step4's categories: each d attribute
+    is looked up by shape and scanned once for the literal strings
+
+    Returns:
+        Category name -> its paths in document order, for every category in
+        CATEGORIES; a path appears under each category it matches
+    """
+    bits = get_patterns().bits
+    found = {category: [] for category in CATEGORIES}
+    for path in table:
+        if not path.d:
+            continue
+        categories = classify(path.d)
+        if not categories:
+            continue
+        for category in CATEGORIES:
+            if categories & bits[category]:
+                found[category].append(path)
+    return found
@@ -0,0 +1,134 @@
+import re
+import hashlib
+from typing import List, Tuple
+
+# Path data tokens: a command letter or a number
+PATH_TOKEN = re.compile(r'([MmLlHhVvCcSsQqTtAaZz])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+
+# Parameters taken by each command
+PARAMETER_COUNTS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+Segment = Tuple  # (command, *absolute parameters)
+
+
+def absolute_segments(d: str) -> List[Segment]:
+    """
+    Parse path data into absolute segments using only M, L, C, Q, A and Z:
+    relative commands are resolved, H/V become L, and the smooth S/T curves
+    become C/Q with their reflected control points
+
+    Raises:
+        ValueError: If the path data can't be parsed
+    """
+    segments: List[Segment] = []
+    x = y = 0.0
+    start_x = start_y = 0.0
+    # Last control point of the previous curve, for S and T
+    last_cubic = last_quadratic = None
+
+    command = None
+    numbers: List[float] = []
+
+    def flush(command, numbers):
+        nonlocal x, y, start_x, start_y, last_cubic, last_quadratic
+        upper = command.upper()
+        relative = command != upper
+        count = PARAMETER_COUNTS[upper]
+        if upper == "Z":
+            if numbers:
+                raise ValueError("Z takes no parameters")
+            segments.append(("Z",))
+            x, y = start_x, start_y
+            last_cubic = last_quadratic = None
+            return
+        if not numbers or len(numbers) % count:
+            raise ValueError(f"{command} needs a multiple of {count} parameters")
+
+        for offset in range(0, len(numbers), count):
+            values = numbers[offset:offset + count]
+            # Pairs after the first of a moveto are linetos
+            current = upper if not (upper == "M" and offset) else "L"
+            cubic = quadratic = None
+
+            if current == "M" or current == "L":
+                px, py = values
+                if relative:
+                    px, py = px + x, py + y
+                segments.append((current, px, py))
+                if current == "M":
+                    start_x, start_y = px, py
+                x, y = px, py
+            elif current == "H":
+                px = values[0] + x if relative else values[0]
+                segments.append(("L", px, y))
+                x = px
+            elif current == "V":
+                py = values[0] + y if relative else values[0]
+                segments.append(("L", x, py))
+                y = py
+            elif current in ("C", "S"):
+                if current == "C":
+                    x1, y1, x2, y2, px, py = values
+                    if relative:
+                        x1, y1 = x1 + x, y1 + y
+                else:
+                    x2, y2, px, py = values
+                    x1, y1 = (2 * x - last_cubic[0], 2 * y - last_cubic[1]) if last_cubic else (x, y)
+                if relative:
+                    x2, y2, px, py = x2 + x, y2 + y, px + x, py + y
+                segments.append(("C", x1, y1, x2, y2, px, py))
+                cubic = (x2, y2)
+                x, y = px, py
+            elif current in ("Q", "T"):
+                if current == "Q":
+                    x1, y1, px, py = values
+                    if relative:
+                        x1, y1 = x1 + x, y1 + y
+                else:
+                    px, py = values
+                    x1, y1 = (2 * x - last_quadratic[0], 2 * y - last_quadratic[1]) if last_quadratic else (x, y)
+                if relative:
+                    px, py = px + x, py + y
+                segments.append(("Q", x1, y1, px, py))
+                quadratic = (x1, y1)
+                x, y = px, py
+            elif current == "A":
+                rx, ry, rotation, large_arc, sweep, px, py = values
+                if relative:
+                    px, py = px + x, py + y
+                segments.append(("A", abs(rx), abs(ry), rotation, int(large_arc), int(sweep), px, py))
+                x, y = px, py
+
+            last_cubic, last_quadratic = cubic, quadratic
+
+    for match in PATH_TOKEN.finditer(d):
+        letter, number = match.groups()
+        if letter:
+            if command is not None:
+                flush(command, numbers)
+            elif letter not in "Mm":
+                raise ValueError("Path data must start with a moveto")
+            command, numbers = letter, []
+        else:
+            if command is None:
+                raise ValueError("Path data must start with a moveto")
+            numbers.append(float(number))
+    if command is not None:
+        flush(command, numbers)
+    return segments
+
+
+def geometry_key(d: str, quantum: float = 0.5) -> str:
+    """
+    Hash of a path's geometry: its absolute segments with every coordinate
+    rounded to a multiple of quantum, so the same outline written with
+    relative or absolute commands, or with small jitter, gets the same key
+
+    Raises:
+        ValueError: If the path data can't be parsed
+    """
+    parts = []
+    for segment in absolute_segments(d):
+        values = ",".join(str(round(value / quantum)) for value in segment[1:])
+        parts.append(f"{segment[0]}{values}")
+    return hashlib.blake2b("|".join(parts).encode("ascii"), digest_size=16).hexdigest()
@@ -0,0 +1,303 @@
+import os
+import re
+import sys
+import json
+import pickle
+import hashlib
+from collections import deque
+from dataclasses import dataclass
+from itertools import product
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import PatternComponents as components
+from shape_signatures import ShapeTable
+from utils.disk_cache import DiskCache, cache_enabled, cache_limit_bytes
+from utils.config_manager import config_manager
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+PROCESSORS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bump when the way definitions are compiled changes; it is part of every
+# pattern set's version
+COMPILED_FORMAT = "1"
+COMPILED_FILE = "patterns.pickle"
+
+# Modules whose classes end up in the pickled patterns
+COMPILER_MODULES = ("pattern_registry.py", "shape_signatures.py")
+
+# Pattern sets each step uses; a step's cached results only depend on these
+STEP_PATTERN_SETS = {
+    "Step4": ("shores_box", "shores", "frames_5x4", "frames_inBox", "frames_6x4"),
+    "Step6": ("shores",),
+}
+
+
+def shape_matching_enabled() -> bool:
+    """
+    Whether Step4 also matches symbols by shape (SHAPE_MATCHING env var or
+    pipeline.shape_matching); off by default because it finds symbols the
+    literal lists never counted
+    """
+    value = os.environ.get("SHAPE_MATCHING")
+    if value is not None:
+        return value.lower() in ("1", "true", "yes")
+    return bool(config_manager.get_pipeline_config().get("shape_matching", False))
+
+
+def pattern_definitions() -> Dict[str, Dict[str, Any]]:
+    """
+    Every pattern set as plain data, from PatternComponents:
+    - literals: strings searched for in d attributes
+    - regex: d-attribute regex, only run on paths containing one of
+      regex_literals
+    - ignore_case: literals and regex match regardless of case
+    - shapes: relative path data matched by shape, with lengths up to
+      tolerance px longer; only with shape matching enabled
+
+    The definitions are what each set's version is computed from, so turning
+    shape matching on or off also invalidates the steps that use the sets.
+    """
+    definitions = {
+        "shores_box": {"literals": components.shores_box},
+        "shores": {"regex": components.shores_d, "regex_literals": components.shores_d_literals},
+        "frames_5x4": {
+            "literals": components.frames_5x4,
+            "regex": components.frames_5x4_diagonal,
+            "regex_literals": components.frames_5x4_diagonal_literals,
+            "ignore_case": True,
+        },
+        "frames_inBox": {"literals": components.frames_inBox},
+        "frames_6x4": {"literals": components.frames_6x4},
+    }
+    if shape_matching_enabled():
+        shapes = {
+            "shores_box": components.shores_box_shapes,
+            "frames_5x4": components.frames_5x4_shapes,
+            "frames_inBox": components.frames_inBox_shapes,
+            "frames_6x4": components.frames_6x4_shapes,
+        }
+        for name, set_shapes in shapes.items():
+            definitions[name]["shapes"] = set_shapes
+            definitions[name]["tolerance"] = components.shape_tolerance
+    return definitions
+
+
+def definition_version(definition: Dict[str, Any]) -> str:
+    """Version of one pattern set: a hash of its definition"""
+    digest = hashlib.sha256(COMPILED_FORMAT.encode())
+    digest.update(json.dumps(definition, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def patterns_version(names: Optional[Iterable[str]] = None) -> str:
+    """
+    Combined version of the named pattern sets (all of them by default), for
+    keying anything computed from those patterns
+    """
+    return _combined_version(pattern_definitions(), names)
+
+
+def _combined_version(definitions: Dict[str, Dict[str, Any]], names: Optional[Iterable[str]] = None) -> str:
+    digest = hashlib.sha256()
+    for name in sorted(names if names is not None else definitions):
+        digest.update(f"{name}:{definition_version(definitions[name])}\n".encode())
+    return digest.hexdigest()
+
+
+class _Automaton:
+    """
+    Pure-Python Aho-Corasick automaton with the part of pyahocorasick's
+    Automaton interface used here (add_word, make_automaton, iter)
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._values: List[list] = [[]]
+        # Transitions resolved through the failure links, filled while scanning
+        self._delta: List[Dict[str, int]] = [{}]
+
+    def add_word(self, word: str, value) -> None:
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._values.append([])
+                self._delta.append({})
+                self._goto[state][char] = next_state
+            state = next_state
+        self._values[state] = [value]
+
+    def make_automaton(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # A state also reports every word ending at its failure state
+                self._values[next_state] = self._values[next_state] + self._values[self._fail[next_state]]
+                queue.append(next_state)
+
+    def _step(self, state: int, char: str) -> int:
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(char, 0)
+
+    def iter(self, text: str) -> Iterator[Tuple[int, object]]:
+        """(end index, value) for every word occurrence in text"""
+        delta = self._delta
+        values = self._values
+        state = 0
+        for index, char in enumerate(text):
+            next_state = delta[state].get(char)
+            if next_state is None:
+                next_state = delta[state][char] = self._step(state, char)
+            state = next_state
+            for value in values[state]:
+                yield index, value
+
+
+def case_variants(literal: str) -> Iterator[str]:
+    """Every upper/lower case spelling of a literal"""
+    choices = [(char.lower(), char.upper()) if char.isalpha() else (char,) for char in literal]
+    for spelling in product(*choices):
+        yield "".join(spelling)
+
+
+@dataclass
+class CompiledPatterns:
+    """
+    Every pattern set compiled for matching path d attributes.
+
+    Each set has a bit in bits. The automaton reports the bits of the
+    literals found in a d attribute and the shape table those of the shapes;
+    a set's regex only runs when the automaton also reported its candidate
+    bit (or the set has no candidate literals).
+    """
+    version: str
+    bits: Dict[str, int]
+    automaton: Any
+    shapes: ShapeTable
+    regexes: Dict[str, Pattern]
+    candidates: Dict[str, int]
+    tag_regexes: Dict[str, Pattern]
+
+    def tag_regex(self, name: str) -> Pattern:
+        """Tag-level form of a set's regex, for PathTable.matching()"""
+        return self.tag_regexes[name]
+
+
+def compile_patterns(definitions: Dict[str, Dict[str, Any]]) -> CompiledPatterns:
+    """Compile pattern definitions, with pyahocorasick's automaton when it is installed"""
+    bits = {name: 1 << position for position, name in enumerate(definitions)}
+    shapes = ShapeTable(components.shape_tolerance)
+    masks: Dict[str, int] = {}
+    regexes = {}
+    candidates = {}
+    tag_regexes = {}
+
+    def add(literals: Iterable[str], bit: int, ignore_case: bool):
+        for literal in literals:
+            for spelling in set(case_variants(literal)) if ignore_case else (literal,):
+                masks[spelling] = masks.get(spelling, 0) | bit
+
+    for name, definition in definitions.items():
+        ignore_case = definition.get("ignore_case", False)
+        for shape in definition.get("shapes", ()):
+            shapes.add(shape, bits[name], definition.get("tolerance"))
+        add(definition.get("literals", ()), bits[name], ignore_case)
+
+        if definition.get("regex"):
+            flags = re.IGNORECASE if ignore_case else 0
+            regexes[name] = re.compile(definition["regex"], flags)
+            tag_regexes[name] = re.compile(rf'<path[^>]+d="[^"]*(?:{definition["regex"]})[^"]*"[^>]*>', flags)
+            candidate_literals = definition.get("regex_literals")
+            candidates[name] = 1 << (len(definitions) + len(candidates)) if candidate_literals else 0
+            if candidate_literals:
+                add(candidate_literals, candidates[name], ignore_case)
+
+    automaton = ahocorasick.Automaton() if ahocorasick is not None else _Automaton()
+    for literal, mask in masks.items():
+        automaton.add_word(literal, mask)
+    automaton.make_automaton()
+
+    return CompiledPatterns(
+        version=_combined_version(definitions),
+        bits=bits,
+        automaton=automaton,
+        shapes=shapes,
+        regexes=regexes,
+        candidates=candidates,
+        tag_regexes=tag_regexes,
+    )
+
+
+_pattern_cache: Optional[DiskCache] = None
+_patterns: Optional[CompiledPatterns] = None
+
+
+def get_pattern_cache() -> DiskCache:
+    """Get the cache of compiled patterns"""
+    global _pattern_cache
+    if _pattern_cache is None:
+        _pattern_cache = DiskCache("patterns", cache_limit_bytes("patterns_max_mb", 64))
+    return _pattern_cache
+
+
+def compiled_cache_key() -> str:
+    """Cache key of the compiled patterns: their version and the code that built them"""
+    digest = hashlib.sha256(patterns_version().encode())
+    digest.update(f"{sys.version_info[:2]}:{'ahocorasick' if ahocorasick is not None else 'python'}".encode())
+    for filename in COMPILER_MODULES:
+        with open(os.path.join(PROCESSORS_DIR, filename), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_patterns() -> CompiledPatterns:
+    """Load the compiled patterns from the disk cache, compiling and storing them on a miss"""
+    key = compiled_cache_key() if cache_enabled() else None
+    if key is not None:
+        path = get_pattern_cache().get_file(key, COMPILED_FILE)
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    return pickle.load(f)
+            except Exception as e:
+                print(f"⚠️  Ignoring unreadable compiled patterns: {e}")
+                get_pattern_cache().delete(key)
+
+    patterns = compile_patterns(pattern_definitions())
+    if key is not None:
+        try:
+            get_pattern_cache().put(key, {COMPILED_FILE: pickle.dumps(patterns, protocol=pickle.HIGHEST_PROTOCOL)})
+        except Exception as e:
+            print(f"⚠️  Could not cache compiled patterns: {e}")
+    return patterns
+
+
+def get_patterns() -> CompiledPatterns:
+    """This process's compiled patterns, loaded on first use"""
+    global _patterns
+    if _patterns is None:
+        _patterns = load_patterns()
+    return _patterns
+
+
+def preload_patterns() -> None:
+    """Process pool initializer: have the patterns ready before the first task"""
+    try:
+        get_patterns()
+    except Exception as e:
+        print(f"⚠️  Could not preload patterns: {e}")
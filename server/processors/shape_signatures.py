@@ -0,0 +1,203 @@
+from itertools import product
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from path_geometry import PATH_TOKEN, PARAMETER_COUNTS
+
+Vector = Tuple[float, float]
+
+# How far a length may be from a whole pixel and still count as one
+WHOLE_PIXEL = 1e-6
+
+# The symmetries of the square: 4 rotations, each optionally mirrored
+TRANSFORMS = (
+    lambda x, y: (x, y),
+    lambda x, y: (-y, x),
+    lambda x, y: (-x, -y),
+    lambda x, y: (y, -x),
+    lambda x, y: (-x, y),
+    lambda x, y: (y, x),
+    lambda x, y: (x, -y),
+    lambda x, y: (-y, -x),
+)
+
+
+def _length(value: float) -> float:
+    """A whole-pixel length as an int (so it can equal a shape's); others stay as they are"""
+    whole = round(value)
+    return whole if abs(value - whole) < WHOLE_PIXEL else value
+
+
+def relative_runs(d: str) -> List[List[Vector]]:
+    """
+    A path's straight segments as relative (dx, dy) vectors, split into runs
+    at every moveto and curve. Lengths that aren't whole pixels are kept as
+    they are, so they never equal a shape's.
+
+    Only the end points matter here, so this walks the path data directly
+    instead of building absolute_segments()
+
+    Raises:
+        ValueError: If the path data can't be parsed
+    """
+    runs: List[List[Vector]] = []
+    run: List[Vector] = []
+    x = y = start_x = start_y = 0.0
+    command = None
+    relative = False
+    count = 0
+    params: List[float] = []
+
+    for letter, number in PATH_TOKEN.findall(d):
+        if letter:
+            if params:
+                raise ValueError(f"{command} is missing parameters")
+            if command is None and letter not in "Mm":
+                raise ValueError("Path data must start with a moveto")
+            command = letter.upper()
+            relative = letter != command
+            count = PARAMETER_COUNTS[command]
+            if command == "Z":
+                vector = (_length(start_x - x), _length(start_y - y))
+                # Closing an already closed outline adds nothing
+                if vector != (0, 0):
+                    run.append(vector)
+                x, y = start_x, start_y
+            continue
+
+        if command is None:
+            raise ValueError("Path data must start with a moveto")
+        if not count:
+            raise ValueError("Z takes no parameters")
+        params.append(float(number))
+        if len(params) < count:
+            continue
+
+        if command == "M":
+            # A moveto ends the run; pairs after the first are linetos
+            if run:
+                runs.append(run)
+                run = []
+            target_x, target_y = params
+            if relative:
+                target_x, target_y = target_x + x, target_y + y
+            x, y = start_x, start_y = target_x, target_y
+            command = "L"
+        elif command in ("L", "H", "V"):
+            if command == "L":
+                target_x, target_y = params
+            elif command == "H":
+                target_x, target_y = params[0], (0.0 if relative else y)
+            else:
+                target_x, target_y = (0.0 if relative else x), params[0]
+            if relative:
+                target_x, target_y = target_x + x, target_y + y
+            run.append((_length(target_x - x), _length(target_y - y)))
+            x, y = target_x, target_y
+        else:
+            # A curve ends the run
+            if run:
+                runs.append(run)
+                run = []
+            if relative:
+                x, y = x + params[-2], y + params[-1]
+            else:
+                x, y = params[-2], params[-1]
+        params = []
+
+    if params:
+        raise ValueError(f"{command} is missing parameters")
+    if run:
+        runs.append(run)
+    return runs
+
+
+def orientations(vectors: Tuple[Vector, ...]) -> Set[Tuple[Vector, ...]]:
+    """
+    Every rotation and reflection of a segment sequence, each also drawn in
+    the opposite direction
+    """
+    found = set()
+    for transform in TRANSFORMS:
+        turned = tuple(transform(dx, dy) for dx, dy in vectors)
+        found.add(turned)
+        found.add(tuple((-dx, -dy) for dx, dy in reversed(turned)))
+    return found
+
+
+def signature(vectors: Tuple[Vector, ...]) -> Tuple[Vector, ...]:
+    """Canonical form of a segment sequence: the smallest of its orientations"""
+    return min(orientations(vectors))
+
+
+def tolerance_variants(vectors: Tuple[Vector, ...], tolerance: int) -> Iterator[Tuple[Vector, ...]]:
+    """
+    The sequence with every nonzero length made up to tolerance pixels longer
+    (60 becomes 60 or 61, -60 becomes -60 or -61); horizontal and vertical
+    segments stay that way
+    """
+    choices = [
+        [value + extra if value > 0 else value - extra for extra in range(tolerance + 1)] if value else (0,)
+        for vector in vectors for value in vector
+    ]
+    for values in product(*choices):
+        yield tuple(zip(values[::2], values[1::2]))
+
+
+class ShapeTable:
+    """
+    Shapes to look for in paths, each with a bit mask (e.g. its category).
+
+    A shape is relative path data such as "h 60 v -60 h -60 v 60"; it matches
+    any run of consecutive straight segments in a path that is the same shape
+    rotated, mirrored or drawn backwards, with each length at most the
+    tolerance longer.
+    Every such variant is indexed when the shape is added, so looking up a
+    path costs one hash lookup per run of segments, however many shapes the
+    table holds.
+    """
+
+    def __init__(self, tolerance: int = 1):
+        self.tolerance = tolerance
+        self.signatures: Dict[Tuple[Vector, ...], int] = {}
+        self._index: Dict[Tuple[Vector, ...], int] = {}
+        self._lengths: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def add(self, shape: str, mask: int, tolerance: Optional[int] = None) -> None:
+        """
+        Index a shape, with lengths up to tolerance px longer (the table's by default)
+
+        Raises:
+            ValueError: If the shape isn't a single run of straight segments
+        """
+        runs = relative_runs(f"m 0,0 {shape}")
+        if len(runs) != 1:
+            raise ValueError(f"Shape must be one run of straight segments: {shape}")
+        vectors = tuple(runs[0])
+
+        key = signature(vectors)
+        self.signatures[key] = self.signatures.get(key, 0) | mask
+        self._lengths.add(len(vectors))
+        tolerance = self.tolerance if tolerance is None else tolerance
+        for variant in tolerance_variants(vectors, tolerance):
+            for oriented in orientations(variant):
+                self._index[oriented] = self._index.get(oriented, 0) | mask
+
+    def lookup(self, d: str) -> int:
+        """Masks of every shape found in a path's data, or'ed together (0 if none)"""
+        if not self._index:
+            return 0
+        try:
+            runs = relative_runs(d)
+        except ValueError:
+            return 0
+
+        mask = 0
+        index = self._index
+        for run in runs:
+            for length in self._lengths:
+                for start in range(len(run) - length + 1):
+                    mask |= index.get(tuple(run[start:start + length]), 0)
+        return mask
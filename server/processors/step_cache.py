@@ -0,0 +1,161 @@
+import os
+import json
+import shutil
+import hashlib
+import time
+from typing import Any, Dict, Optional, TextIO
+
+from utils.disk_cache import DiskCache, cache_enabled, cache_limit_bytes
+from utils.workspace import Workspace
+from step_result import StepResult
+from svg_stream import CHUNK_SIZE
+from pattern_registry import STEP_PATTERN_SETS, patterns_version
+
+PROCESSORS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bump to invalidate every cached step output (e.g. when the entry layout changes)
+CACHE_FORMAT = "1"
+
+# Modules shared by the steps, relative to processors/; editing any of them
+# invalidates every step. Pattern definitions are versioned by pattern_registry
+# instead, so editing one only invalidates the steps that use it.
+SHARED_MODULES = (
+    "step_result.py",
+    "svg_paths.py",
+    "svg_stream.py",
+    "path_geometry.py",
+    "path_classifier.py",
+    "shape_signatures.py",
+    "pattern_registry.py",
+    os.path.join("..", "utils", "render_service.py"),
+)
+
+RESULT_FILE = "result.json"
+OUTPUT_FILE = "output.svg"
+
+_step_cache: Optional[DiskCache] = None
+_step_versions = {}
+
+
+def get_step_cache() -> DiskCache:
+    """Get or create the per-process step cache"""
+    global _step_cache
+    if _step_cache is None:
+        _step_cache = DiskCache("steps", cache_limit_bytes("steps_max_mb", 2048))
+    return _step_cache
+
+
+def step_version(step_name: str) -> str:
+    """
+    Version of a step's code: a hash of the step module, the shared modules
+    it may use and the versions of the pattern sets it uses, so editing any
+    of them invalidates cached outputs
+    """
+    if step_name not in _step_versions:
+        digest = hashlib.sha256(CACHE_FORMAT.encode())
+        for filename in (f"{step_name}.py",) + SHARED_MODULES:
+            with open(os.path.join(PROCESSORS_DIR, filename), "rb") as f:
+                digest.update(f.read())
+        if step_name in STEP_PATTERN_SETS:
+            digest.update(patterns_version(STEP_PATTERN_SETS[step_name]).encode())
+        _step_versions[step_name] = digest.hexdigest()
+    return _step_versions[step_name]
+
+
+def step_settings(step_name: str) -> Dict[str, Any]:
+    """Configuration that changes a step's output"""
+    if step_name == "Step1":
+        from Step1 import geometric_dedup_settings
+        geometric, quantum = geometric_dedup_settings()
+        return {"geometric_dedup": geometric, "dedup_quantum": quantum} if geometric else {}
+    return {}
+
+
+def step_cache_key(step_name: str, input_svg: TextIO) -> str:
+    """Cache key for running step_name on the input document read from a text stream"""
+    digest = hashlib.sha256()
+    digest.update(step_name.encode())
+    digest.update(step_version(step_name).encode())
+    settings = step_settings(step_name)
+    if settings:
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+    for chunk in iter(lambda: input_svg.read(CHUNK_SIZE), ""):
+        digest.update(chunk.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_step_result(step_name: str, key: str, workspace: Workspace) -> Optional[StepResult]:
+    """
+    Restore a cached step into the workspace
+
+    Puts the cached output document in the workspace, copies the cached result
+    images into it and returns the StepResult, or None on a miss.
+    """
+    if not cache_enabled():
+        return None
+
+    start = time.perf_counter()
+    entry_dir = get_step_cache().get(key)
+    if entry_dir is None:
+        return None
+
+    try:
+        with open(os.path.join(entry_dir, RESULT_FILE), "r", encoding="utf-8") as f:
+            result = StepResult.from_dict(json.load(f))
+
+        output_path = os.path.join(entry_dir, OUTPUT_FILE)
+        if os.path.exists(output_path):
+            workspace.put_svg_file(step_name, output_path)
+
+        # Result images are stored by file name and copied back into this workspace
+        for handle, value in result.artifacts.items():
+            if handle == "document":
+                continue
+            filename = os.path.basename(value)
+            shutil.copyfile(os.path.join(entry_dir, filename), workspace.path(filename))
+            result.artifacts[handle] = workspace.path(filename)
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable {step_name} cache entry: {e}")
+        get_step_cache().delete(key)
+        return None
+
+    result.timings = {"cache": time.perf_counter() - start}
+    print(f"♻️  {step_name} restored from cache")
+    return result
+
+
+def store_step_result(key: str, result: StepResult, workspace: Workspace) -> None:
+    """
+    Save a successful step's output document, result and result images; a
+    detector whose image could not be processed (error set) is not cached
+    """
+    if not cache_enabled() or not result.success or result.error:
+        return
+
+    files = {RESULT_FILE: json.dumps(result.to_dict()).encode("utf-8")}
+
+    for handle, value in result.artifacts.items():
+        if handle == "document":
+            continue
+        if not os.path.exists(value):
+            return
+        with open(value, "rb") as f:
+            files[os.path.basename(value)] = f.read()
+
+    move_files = {}
+    document = result.artifacts.get("document")
+    if document is not None:
+        if document in workspace.documents:
+            files[OUTPUT_FILE] = workspace.documents[document].encode("utf-8")
+        elif os.path.exists(workspace.svg_path(document)):
+            # Streamed documents only exist on disk; copy them without loading
+            copy_path = workspace.path(f"{document}.svg.cache")
+            shutil.copyfile(workspace.svg_path(document), copy_path)
+            move_files[OUTPUT_FILE] = copy_path
+
+    try:
+        get_step_cache().put(key, files, move_files)
+    finally:
+        for path in move_files.values():
+            if os.path.exists(path):
+                os.remove(path)
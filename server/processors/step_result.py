@@ -0,0 +1,58 @@
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class StepResult:
+    """
+    Outcome of one processing step, returned by every run_stepN function.
+
+    count is the step's headline number (detections for Steps 5-8); counts holds
+    per-category numbers such as Step4's matched patterns.
+
+    artifacts maps a handle name to what the step produced, e.g.
+    {"document": "Step4", "results_png": "/.../Step4-results.png"}; documents
+    are names in the workspace document store, everything else is a file path.
+    """
+    step: str
+    success: bool
+    count: Optional[int] = None
+    counts: Dict[str, int] = field(default_factory=dict)
+    detections: List[Dict[str, Any]] = field(default_factory=list)
+    artifacts: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return self.success
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form of the result"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StepResult":
+        """Rebuild a result from to_dict() output"""
+        return cls(**data)
+
+
+def failed(step: str, error: str) -> StepResult:
+    """Build the result of a step that could not run"""
+    return StepResult(step=step, success=False, error=error)
+
+
+def boxes_from_groups(groups) -> List[Dict[str, Any]]:
+    """
+    Convert grouped contours (contours, x, y, w, h) into plain bounding boxes
+    in image pixels
+    """
+    return [
+        {
+            "x": float(x),
+            "y": float(y),
+            "width": float(w),
+            "height": float(h),
+            "contours": len(contours),
+        }
+        for contours, x, y, w, h in groups
+    ]
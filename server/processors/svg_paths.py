@@ -0,0 +1,143 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+
+# A path element's opening tag; the pattern components all match within one tag
+PATH_TAG = re.compile(r'<path[^>]*>')
+ID_ATTR = re.compile(r'\bid="([^"]*)"')
+D_ATTR = re.compile(r'\sd="([^"]*)"')
+STYLE_ATTR = re.compile(r'\bstyle="([^"]*)"')
+ID_NUMBER = re.compile(r'(\d+)')
+
+
+@dataclass(slots=True)
+class PathRecord:
+    """
+    One <path> tag of a document: its attributes and where it sits in the
+    source text (source[start:end] is the tag)
+    """
+    index: int
+    id: Optional[str]
+    number: Optional[int]
+    d: Optional[str]
+    style: Optional[str]
+    start: int
+    end: int
+
+
+class PathTable:
+    """
+    Every <path> tag of an SVG document, parsed in one pass.
+
+    Steps query the table instead of re-scanning the document, and record
+    their edits by path; render() applies all edits in a single splice so the
+    document is copied once no matter how many paths change. Edits replace
+    whole tags (or remove whole elements) and are expected to leave the d
+    attribute alone, so queries always run against the original source.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.paths: List[PathRecord] = []
+        self._by_start: Dict[int, PathRecord] = {}
+        # Path index -> (start, end, replacement) in the source
+        self._edits: Dict[int, Tuple[int, int, str]] = {}
+
+        for match in PATH_TAG.finditer(source):
+            tag = match.group(0)
+            path_id = _attribute(ID_ATTR, tag)
+            number = ID_NUMBER.search(path_id) if path_id else None
+            record = PathRecord(
+                index=len(self.paths),
+                id=path_id,
+                number=int(number.group(1)) if number else None,
+                d=_attribute(D_ATTR, tag),
+                style=_attribute(STYLE_ATTR, tag),
+                start=match.start(),
+                end=match.end(),
+            )
+            self.paths.append(record)
+            self._by_start[record.start] = record
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def tag(self, record: PathRecord) -> str:
+        """The record's tag, including any edit made so far"""
+        edit = self._edits.get(record.index)
+        return edit[2] if edit is not None else self.source[record.start:record.end]
+
+    def matches(self, pattern: Pattern) -> List[Tuple[PathRecord, re.Match]]:
+        """
+        Paths whose tag matches a tag-level pattern such as
+        r'<path[^>]+d="[^"]*(...)[^"]*"[^>]*>', with the match objects
+        """
+        found = []
+        for match in pattern.finditer(self.source):
+            record = self._by_start.get(match.start())
+            if record is not None:
+                found.append((record, match))
+        return found
+
+    def matching(self, pattern: Pattern) -> List[PathRecord]:
+        """Paths whose tag matches a tag-level pattern"""
+        return [record for record, _ in self.matches(pattern)]
+
+    def replace(self, record: PathRecord, new_tag: str) -> None:
+        """Replace a path's tag"""
+        self._edits[record.index] = (record.start, record.end, new_tag)
+
+    def element_end(self, record: PathRecord) -> int:
+        """End of the whole element: the tag itself if self-closing, else its </path>"""
+        if self.source.endswith("/>", record.start, record.end):
+            return record.end
+        close = self.source.find("</path>", record.end)
+        return close + len("</path>") if close != -1 else record.end
+
+    def remove(self, record: PathRecord) -> None:
+        """
+        Drop a path element from the output, along with the rest of its
+        line(s) when nothing else is on them
+        """
+        start, end = record.start, self.element_end(record)
+
+        line_start = self.source.rfind("\n", 0, start) + 1
+        line_end = self.source.find("\n", end)
+        if line_end == -1:
+            line_end = len(self.source)
+        if not self.source[line_start:start].strip() and not self.source[end:line_end].strip():
+            start = line_start
+            if line_end < len(self.source):
+                end = line_end + 1
+            else:
+                # Last line without a newline: drop the one before it instead
+                end = line_end
+                start = max(0, start - 1)
+
+        self._edits[record.index] = (start, end, "")
+
+    @property
+    def edited(self) -> bool:
+        return bool(self._edits)
+
+    def render(self) -> str:
+        """The document with every edit applied"""
+        if not self._edits:
+            return self.source
+
+        pieces = []
+        position = 0
+        for start, end, replacement in sorted(self._edits.values()):
+            pieces.append(self.source[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(self.source[position:])
+        return "".join(pieces)
+
+
+def _attribute(pattern: Pattern, tag: str) -> Optional[str]:
+    match = pattern.search(tag)
+    return match.group(1) if match else None
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The server and its processors are imported the way the pipeline imports them
+for path in (SERVER_DIR, os.path.join(SERVER_DIR, "processors"), os.path.join(SERVER_DIR, "api")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# config_manager reads utils/config.json relative to the working directory
+os.chdir(SERVER_DIR)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point every disk cache at an empty directory"""
+    root = tmp_path / "cache"
+    monkeypatch.setenv("AI_TAKEOFF_CACHE_DIR", str(root))
+    monkeypatch.setenv("AI_TAKEOFF_CACHE", "1")
+    return root
+
+
+@pytest.fixture
+def thread_job_queue(monkeypatch):
+    """
+    A JobQueue that runs jobs on one worker thread instead of in worker processes,
+    with process_ai_takeoff replaced by a job that waits for the returned gate.
+    Set gate.result (or gate.error) before setting the gate to choose the outcome.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from utils import takeoff_job
+    from utils.job_queue import JobQueue
+
+    gate = threading.Event()
+    gate.result = {"status": "success", "results": {"step_results": {"Step5": 3}}}
+    gate.error = None
+
+    async def process_ai_takeoff(upload_id, workspace):
+        assert gate.wait(10), "test never released the job"
+        if gate.error is not None:
+            raise gate.error
+        return gate.result
+
+    monkeypatch.setattr(takeoff_job, "process_ai_takeoff", process_ai_takeoff)
+
+    class ThreadJobQueue(JobQueue):
+        def _get_executor(self):
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            return self._executor
+
+    queue = ThreadJobQueue(max_workers=1)
+    yield queue, gate
+
+    gate.set()
+    if queue._executor is not None:
+        queue._executor.shutdown(wait=True)
+    for job_id in list(queue.jobs):
+        queue.discard(job_id)
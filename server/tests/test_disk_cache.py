@@ -0,0 +1,91 @@
+import os
+import time
+
+from utils import disk_cache
+from utils.disk_cache import DiskCache
+
+
+def test_put_and_get(tmp_path):
+    cache = DiskCache("test", 1024, root=str(tmp_path))
+    entry_dir = cache.put("ab12", {"a.txt": b"hello", "b.txt": b"world"})
+
+    assert entry_dir == cache.get("ab12")
+    with open(cache.get_file("ab12", "a.txt"), "rb") as f:
+        assert f.read() == b"hello"
+    assert cache.get_file("ab12", "missing.txt") is None
+    assert cache.get("cd34") is None
+    assert cache.size() == 10
+
+
+def test_put_moves_files(tmp_path):
+    cache = DiskCache("test", 1024, root=str(tmp_path))
+    source = tmp_path / "render.png"
+    source.write_bytes(b"png")
+
+    cache.put("ab12", {}, {"render.png": str(source)})
+
+    assert not source.exists()
+    assert cache.get_file("ab12", "render.png") is not None
+
+
+def test_put_replaces_entry(tmp_path):
+    cache = DiskCache("test", 1024, root=str(tmp_path))
+    cache.put("ab12", {"a.txt": b"old", "b.txt": b"old"})
+    cache.put("ab12", {"a.txt": b"new"})
+
+    assert cache.get_file("ab12", "b.txt") is None
+    with open(cache.get_file("ab12", "a.txt"), "rb") as f:
+        assert f.read() == b"new"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache("test", 25, root=str(tmp_path))
+    for key in ("aa01", "bb02"):
+        cache.put(key, {"data": b"x" * 10})
+    # Make aa01 the most recently used entry
+    old = time.time() - 60
+    os.utime(cache.get("bb02"), (old, old))
+    cache.get("aa01")
+
+    cache.put("cc03", {"data": b"x" * 10})
+
+    assert cache.get("bb02") is None
+    assert cache.get("aa01") is not None
+    assert cache.get("cc03") is not None
+    assert cache.size() <= 25
+
+
+def test_put_only_scans_when_over_limit(tmp_path, monkeypatch):
+    cache = DiskCache("test", 1000, root=str(tmp_path))
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+
+    for index in range(20):
+        cache.put(f"{index:04x}", {"data": b"x" * 10})
+    assert len(scans) == 1
+
+    cache.put("ffff", {"data": b"x" * 1000})
+    assert len(scans) == 2
+    assert cache.size() <= 1000
+
+
+def test_put_rescans_after_interval(tmp_path, monkeypatch):
+    cache = DiskCache("test", 1000, root=str(tmp_path))
+    cache.put("aa01", {"data": b"x"})
+    # Another process filled the cache meanwhile
+    other = DiskCache("test", 1000, root=str(tmp_path))
+    other.put("bb02", {"data": b"x" * 995})
+    assert cache.get("bb02") is not None
+
+    monkeypatch.setattr(disk_cache, "RESCAN_SECONDS", 0)
+    cache.put("cc03", {"data": b"x" * 10})
+
+    assert cache.size() <= 1000
+
+
+def test_cache_enabled_from_environment(monkeypatch):
+    monkeypatch.setenv("AI_TAKEOFF_CACHE", "0")
+    assert not disk_cache.cache_enabled()
+    monkeypatch.setenv("AI_TAKEOFF_CACHE", "1")
+    assert disk_cache.cache_enabled()
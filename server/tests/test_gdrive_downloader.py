@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+import gdrive_pdf_downloader as downloader
+
+PDF = b"%PDF-1.4 test"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def session(cache_dir, monkeypatch):
+    def install(*responses):
+        fake = FakeSession(*responses)
+        monkeypatch.setattr(downloader, "get_session", lambda: fake)
+        return fake
+    monkeypatch.setattr(downloader, "_download_cache", None)
+    return install
+
+
+def ok(body=PDF, etag='"v1"'):
+    return FakeResponse(200, body, {"content-type": "application/pdf", "ETag": etag})
+
+
+def test_downloads_and_caches(session, tmp_path):
+    fake = session(ok())
+
+    path = downloader.download_pdf_from_drive("file1", str(tmp_path / "job1"))
+
+    with open(path, "rb") as f:
+        assert f.read() == PDF
+    assert fake.requests == [{}]
+    assert downloader._read_cached("file1")["etag"] == '"v1"'
+
+
+def test_fresh_entry_skips_the_request(session, tmp_path):
+    fake = session(ok())
+    downloader.download_pdf_from_drive("file1", str(tmp_path / "job1"))
+
+    path = downloader.download_pdf_from_drive("file1", str(tmp_path / "job2"))
+
+    assert len(fake.requests) == 1
+    with open(path, "rb") as f:
+        assert f.read() == PDF
+
+
+def test_expired_entry_is_revalidated(session, tmp_path, monkeypatch):
+    fake = session(ok(), FakeResponse(304))
+    downloader.download_pdf_from_drive("file1", str(tmp_path / "job1"))
+
+    # Move past the TTL
+    now = time.time() + downloader.config_manager.get_cache_config().get("downloads_ttl_seconds", 300) + 1
+    monkeypatch.setattr(downloader.time, "time", lambda: now)
+    path = downloader.download_pdf_from_drive("file1", str(tmp_path / "job2"))
+
+    assert fake.requests[1] == {"If-None-Match": '"v1"'}
+    with open(path, "rb") as f:
+        assert f.read() == PDF
+    assert downloader._read_cached("file1")["fetched_at"] == now
+
+
+def test_expired_entry_is_replaced_when_changed(session, tmp_path, monkeypatch):
+    session(ok(), ok(b"%PDF-1.4 changed", '"v2"'))
+    downloader.download_pdf_from_drive("file1", str(tmp_path / "job1"))
+
+    monkeypatch.setattr(downloader.time, "time", lambda: 0.0 + 1e12)
+    path = downloader.download_pdf_from_drive("file1", str(tmp_path / "job2"))
+
+    with open(path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 changed"
+    assert downloader._read_cached("file1")["etag"] == '"v2"'
+
+
+def test_missing_file_fails_without_cache(session, tmp_path):
+    session(FakeResponse(404))
+
+    with pytest.raises(Exception):
+        downloader.download_pdf_from_drive("file1", str(tmp_path / "job1"))
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+
+import pytest
+
+for module in ("requests", "dotenv", "uvicorn", "pdf2image", "pytesseract", "PIL"):
+    pytest.importorskip(module)
+pytest.importorskip("fastapi.testclient")
+
+from fastapi.testclient import TestClient
+
+import main
+from utils.progress import report_progress
+from utils.workspace import Workspace
+
+
+@pytest.fixture
+def client(thread_job_queue, monkeypatch):
+    queue, gate = thread_job_queue
+    monkeypatch.setattr(main, "job_queue", queue)
+    return TestClient(main.app), queue, gate
+
+
+def wait_for(client, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job never became {status}")
+
+
+def stages(events):
+    return [(event["stage"], event["status"]) for event in events]
+
+
+def test_unknown_job(client):
+    client, queue, gate = client
+
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.get("/jobs/missing/events").status_code == 404
+    assert client.get("/jobs/missing/result").status_code == 404
+
+
+def test_submit_and_poll(client):
+    client, queue, gate = client
+
+    with open("utils/config.json", "rb") as f:
+        config = f.read()
+
+    job = client.post("/AI-Takeoff/file1/jobs").json()
+    assert job["upload_id"] == "file1"
+    assert Workspace(job["job_id"]).read_data()["upload_id"] == "file1"
+    # Submitting doesn't touch the shared config
+    with open("utils/config.json", "rb") as f:
+        assert f.read() == config
+    assert job["status"] in ("queued", "running")
+
+    wait_for(client, job["job_id"], "running")
+    assert client.get(f"/jobs/{job['job_id']}/result").json()["status"] == "running"
+
+    gate.set()
+    wait_for(client, job["job_id"], "completed")
+    assert client.get(f"/jobs/{job['job_id']}/result").json() == gate.result
+    # The result is handed out once, then the job is removed
+    assert client.get(f"/jobs/{job['job_id']}").status_code == 404
+
+
+def test_sse_streams_until_the_job_finishes(client):
+    client, queue, gate = client
+    job_id = client.post("/AI-Takeoff/file1/jobs").json()["job_id"]
+    wait_for(client, job_id, "running")
+
+    def finish():
+        report_progress(Workspace(job_id), "Step4", "completed", count=2)
+        gate.set()
+    threading.Timer(0.3, finish).start()
+
+    response = client.get(f"/jobs/{job_id}/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = [message for message in response.text.split("\n\n") if message]
+    assert all(message.startswith("data: ") for message in messages)
+    events = [json.loads(message[len("data: "):]) for message in messages]
+    assert stages(events) == [("job", "started"), ("Step4", "completed"), ("job", "completed")]
+    assert events[1]["count"] == 2
+    assert events[2]["step_results"] == {"Step5": 3}
+
+
+def test_ndjson_of_a_finished_job(client):
+    client, queue, gate = client
+    gate.error = RuntimeError("worker crashed")
+    gate.set()
+    job_id = client.post("/AI-Takeoff/file1/jobs").json()["job_id"]
+    wait_for(client, job_id, "failed")
+
+    response = client.get(f"/jobs/{job_id}/events", params={"format": "ndjson"})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert stages(events) == [("job", "started"), ("job", "failed")]
+    assert events[-1]["error"] == "worker crashed"
+
+
+def test_stream_ends_without_a_terminal_event(client):
+    client, queue, gate = client
+    gate.set()
+    job_id = client.post("/AI-Takeoff/file1/jobs").json()["job_id"]
+    wait_for(client, job_id, "completed")
+    # As if the worker died before writing its final event
+    path = Workspace(job_id).path("progress.ndjson")
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        f.writelines(lines[:1])
+
+    response = client.get(f"/jobs/{job_id}/events", params={"format": "ndjson"})
+
+    assert stages(json.loads(line) for line in response.text.splitlines()) == [("job", "started")]
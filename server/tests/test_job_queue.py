@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+for module in ("requests", "fastapi", "httpx", "dotenv", "pdf2image", "pytesseract", "PIL"):
+    pytest.importorskip(module)
+
+from utils.job_queue import JobQueue
+from utils.progress import PROGRESS_FILE, job_started, read_progress
+from utils.workspace import Workspace
+
+
+def wait_for(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get_status(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job never became {status}: {queue.get_status(job_id)}")
+
+
+def test_queued_until_the_worker_starts(thread_job_queue):
+    queue, gate = thread_job_queue
+    # Occupy the only worker so the second job waits in the executor's queue
+    first = queue.submit("file1")
+    wait_for(queue, first, "running")
+
+    second = queue.submit("file2")
+    time.sleep(0.05)
+    job = queue.get_status(second)
+
+    assert job["status"] == "queued"
+    assert job["upload_id"] == "file2"
+    assert not os.path.exists(Workspace(second).path(PROGRESS_FILE))
+
+
+def test_running_then_completed(thread_job_queue):
+    queue, gate = thread_job_queue
+    job_id = queue.submit("file1")
+
+    job = wait_for(queue, job_id, "running")
+    assert job["finished_at"] is None
+    assert "result" not in job
+    assert queue.get_result(job_id) is None
+
+    gate.set()
+    job = wait_for(queue, job_id, "completed")
+
+    assert job["finished_at"] is not None
+    assert job["error"] is None
+    assert queue.get_result(job_id) == gate.result
+    events, _ = read_progress(Workspace(job_id))
+    assert [(event["stage"], event["status"]) for event in events] == [("job", "started"), ("job", "completed")]
+
+
+def test_error_result_fails_the_job(thread_job_queue):
+    queue, gate = thread_job_queue
+    gate.result = {"status": "error", "stage": "download", "error": "404"}
+    gate.set()
+
+    job_id = queue.submit("file1")
+    job = wait_for(queue, job_id, "failed")
+
+    assert job["error"] == "404"
+    assert queue.get_result(job_id) == gate.result
+
+
+def test_exception_fails_the_job(thread_job_queue):
+    queue, gate = thread_job_queue
+    gate.error = RuntimeError("worker crashed")
+    gate.set()
+
+    job_id = queue.submit("file1")
+    job = wait_for(queue, job_id, "failed")
+
+    assert job["error"] == "worker crashed"
+    assert queue.get_result(job_id) is None
+    with pytest.raises(RuntimeError):
+        asyncio.run(queue.wait(job_id))
+
+
+def test_wait_returns_the_result(thread_job_queue):
+    queue, gate = thread_job_queue
+    job_id = queue.submit("file1")
+    gate.set()
+
+    assert asyncio.run(queue.wait(job_id)) == gate.result
+
+
+def test_discard_removes_job_and_workspace(thread_job_queue):
+    queue, gate = thread_job_queue
+    gate.set()
+    job_id = queue.submit("file1")
+    wait_for(queue, job_id, "completed")
+    files_dir = Workspace(job_id).files_dir
+
+    queue.discard(job_id)
+
+    assert queue.get_status(job_id) is None
+    assert not os.path.exists(files_dir)
+
+
+def test_oldest_finished_jobs_are_pruned(thread_job_queue):
+    queue, gate = thread_job_queue
+    queue.max_finished_jobs = 2
+    gate.set()
+
+    job_ids = [queue.submit(f"file{i}") for i in range(3)]
+    for job_id in job_ids:
+        asyncio.run(queue.wait(job_id))
+    # The done callback runs after the waiter is woken
+    deadline = time.monotonic() + 5
+    while len(queue.jobs) > 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert list(queue.jobs) == job_ids[1:]
+    assert not os.path.exists(Workspace(job_ids[0]).files_dir)
+
+
+def test_worker_pool_is_spawned():
+    queue = JobQueue(max_workers=1)
+    try:
+        assert queue._get_executor()._mp_context.get_start_method() == "spawn"
+    finally:
+        queue.shutdown()
+
+
+def test_job_started_reads_the_first_event(tmp_path):
+    workspace = Workspace("job-test", root=str(tmp_path)).create()
+    assert not job_started(workspace)
+
+    with open(workspace.path(PROGRESS_FILE), "w") as f:
+        f.write('{"stage": "job", "sta')
+    assert not job_started(workspace)
+
+    with open(workspace.path(PROGRESS_FILE), "w") as f:
+        f.write(json.dumps({"stage": "job", "status": "started"}) + "\n")
+        f.write(json.dumps({"stage": "download", "status": "started"}) + "\n")
+    assert job_started(workspace)
@@ -0,0 +1,149 @@
+import random
+import re
+
+import pytest
+
+import PatternComponents as components
+import pattern_registry
+from path_classifier import CATEGORIES, classify
+from shape_signatures import ShapeTable, relative_runs
+
+
+def baseline_patterns():
+    """Step4's original tag regexes, built from the literal lists the way it built them"""
+    def tag_pattern(alternatives, flags=0):
+        return re.compile(rf'<path[^>]+d="[^"]*({alternatives})[^"]*"[^>]*>', flags)
+
+    def literals(values):
+        return "|".join(re.escape(value) for value in values)
+
+    frames_5x4_generic = r'h\s+(?:29[4-9]|30[0-1])\s+l\s+-?(?:29[4-9]|30[0-1]),-?(?:29[4-9]|30[0-1])'
+    return {
+        "shores_box": tag_pattern(literals(components.shores_box)),
+        "shores": re.compile(
+            r'<path[^>]+d="[^"]*m\s*(-?\d+),(-?\d+)\s+('
+            r'-?(33|34),-?(33|34)|'
+            r'-?(33|34),(33|34)|'
+            r'(33|34),-?(33|34)|'
+            r'(33|34),(33|34))[^"]*"[^>]*>'
+        ),
+        "frames_5x4": tag_pattern(f"?:({literals(components.frames_5x4)})|({frames_5x4_generic})", re.IGNORECASE),
+        "frames_inBox": tag_pattern(literals(components.frames_inBox)),
+        "frames_6x4": tag_pattern(literals(components.frames_6x4)),
+    }
+
+
+BASELINE = baseline_patterns()
+
+
+def baseline_categories(d):
+    tag = f'<path id="path1" style="fill:none;stroke:#000000" d="{d}" />'
+    return {name for name, pattern in BASELINE.items() if pattern.search(tag)}
+
+
+def categories(d):
+    mask = classify(d)
+    bits = pattern_registry.get_patterns().bits
+    return {name for name in CATEGORIES if mask & bits[name]}
+
+
+@pytest.fixture
+def shape_matching(monkeypatch, cache_dir):
+    """Compile the patterns with shape matching on or off"""
+    def use(enabled):
+        monkeypatch.setenv("SHAPE_MATCHING", "1" if enabled else "0")
+        monkeypatch.setattr(pattern_registry, "_patterns", None)
+    yield use
+    pattern_registry._patterns = None
+
+
+@pytest.fixture
+def literal_matching(shape_matching):
+    shape_matching(False)
+
+
+ALL_LITERALS = (
+    components.shores_box + components.frames_5x4 + components.frames_inBox + components.frames_6x4
+)
+
+# Paths the shape signatures would pick up that no literal ever matched
+NEVER_MATCHED = [
+    "m 0,0 h 59 v -59 h -59 v 59",
+    "m 0,0 h 60.4 v -60 h -60 v 60",
+    "M 0,0 H 60 V -60 H 0 V 0",
+    "m 0,0 h 60  v -60 h -60 v 60",
+    "m 0,0 h -73 v 73 h 73 v -73",
+    "m 0,0 h 72 v -72 h -72 v 72",
+    "m 0,0 v 300 h -300 v -300 h 300",
+]
+
+
+@pytest.mark.parametrize("literal", ALL_LITERALS)
+def test_every_baseline_literal_classifies_the_same(literal_matching, literal):
+    for d in (literal, f"m 10,10 {literal} z", f"M 14975,8549 {literal}", f"m 10,10 {literal.upper()}"):
+        assert categories(d) == baseline_categories(d), d
+
+
+def test_literals_still_match_their_own_category(literal_matching):
+    for name in ("shores_box", "frames_5x4", "frames_inBox", "frames_6x4"):
+        for literal in getattr(components, name):
+            assert name in categories(f"m 10,10 {literal} z"), literal
+
+
+def test_uppercase_frames_5x4_still_match(literal_matching):
+    assert "frames_5x4" in categories("M 9000,7000 V 300 L 375,-300")
+    assert "frames_5x4" in categories("m 0,0 H 298 L -296,297")
+
+
+@pytest.mark.parametrize("d", NEVER_MATCHED)
+def test_nothing_new_is_picked_up(literal_matching, d):
+    assert categories(d) == baseline_categories(d) == set()
+
+
+def test_random_paths_classify_the_same(literal_matching):
+    rng = random.Random(23)
+    fragments = [
+        "h 60", "v -61", "h -60", "v 61", "h 73", "v -73", "l -300,-450", "h 300", "v 300", "l 375,-300",
+        "V 300", "L 375,-300", "l 300,525", "l 525,300", "33,34", "-34,33", "m 5,5", "M 9057,7032",
+        "h 297", "l -299,300", "003,525", "c 1,2 3,4 5,6", "z", "H 300", "L 300,525",
+    ]
+    for _ in range(3000):
+        d = " ".join(rng.choice(fragments) for _ in range(rng.randint(1, 8)))
+        if rng.random() < 0.5:
+            d = f"m {rng.randint(0, 99)},{rng.randint(0, 99)} {d}"
+        assert categories(d) == baseline_categories(d), d
+
+
+def test_shape_matching_changes_the_pattern_version(shape_matching):
+    shape_matching(False)
+    literal_version = pattern_registry.patterns_version()
+    shape_matching(True)
+
+    assert pattern_registry.patterns_version() != literal_version
+
+
+def test_shape_matching_is_opt_in(shape_matching):
+    shape_matching(True)
+
+    assert "shores_box" in categories("m 0,0 h -73 v 73 h 73 v -73")
+    assert "shores_box" in categories("m 0,0 h 61 v 61 h -61 v -61")
+    assert "shores_box" not in categories("m 0,0 h 59 v -59 h -59 v 59")
+    assert "shores_box" not in categories("m 0,0 h 60.4 v -60 h -60 v 60")
+    # The literal lists still apply
+    assert "frames_5x4" in categories("M 9000,7000 V 300 L 375,-300")
+
+
+def test_shape_table_lengths_only_grow_by_the_tolerance():
+    table = ShapeTable(1)
+    table.add("h 60 v -60 h -60 v 60", 1)
+
+    assert table.lookup("m 0,0 h 61 v -60 h -61 v 60") == 1
+    assert table.lookup("m 0,0 v 60 h 60 v -60 h -60") == 1
+    assert table.lookup("m 0,0 h 59 v -60 h -59 v 60") == 0
+    assert table.lookup("m 0,0 h 62 v -62 h -62 v 62") == 0
+    assert table.lookup("m 0,0 h 60.5 v -60 h -60.5 v 60") == 0
+
+
+def test_relative_runs_keeps_fractional_lengths():
+    assert relative_runs("m 10,10 h 60 v -60.4 c 1,1 2,2 3,3 h 5") == [[(60, 0), (0, -60.4)], [(5, 0)]]
+    assert relative_runs("M 14975.3,8549 H 15035.3 Z") == [[(60, 0), (-60, 0)]]
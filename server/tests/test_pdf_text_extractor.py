@@ -0,0 +1,54 @@
+import pytest
+
+for module in ("pdf2image", "pytesseract", "PIL"):
+    pytest.importorskip(module)
+
+import pdf_text_extractor as extractor
+
+PAGE_TEXT = "GENERAL NOTES: all dimensions in millimetres unless noted"
+OPTIONS = {
+    "dpi": 300,
+    "preprocess": False,
+    "binarize_threshold": 160,
+    "pages": None,
+    "regions": {"title_block": (0.7, 0.8, 0.3, 0.2), "notes": (0, 0, 0.3, 0.3)},
+}
+
+
+@pytest.fixture
+def pdf(monkeypatch, cache_dir):
+    """Two pages: page 1 has a text layer but a scanned title block, page 2 is scanned"""
+    ocred = []
+
+    def ocr_items(pdf_path, items, options, progress_callback=None):
+        ocred.extend(items)
+        return {item: f"ocr {item[1]} {item[0]}" for item in items}
+
+    def region_text(pdf_path, page, box):
+        return "notes text" if box == OPTIONS["regions"]["notes"] else " \n"
+
+    monkeypatch.setenv("AI_TAKEOFF_CACHE", "0")
+    monkeypatch.setattr(extractor, "pdfinfo_from_path", lambda path: {"Pages": 2})
+    monkeypatch.setattr(extractor, "extract_text_layer", lambda path: {1: PAGE_TEXT, 2: ""})
+    monkeypatch.setattr(extractor, "extract_region_text_layer", region_text)
+    monkeypatch.setattr(extractor.pytesseract, "get_tesseract_version", lambda: "5.0")
+    monkeypatch.setattr(extractor, "pdf_sha256", lambda path: "hash")
+    monkeypatch.setattr(extractor, "_ocr_items", ocr_items)
+    return ocred
+
+
+def test_blank_region_text_layer_is_ocred(pdf):
+    pages = extractor.extract_pdf_pages("drawing.pdf", options=OPTIONS)
+
+    assert sorted(pdf) == [(1, "title_block"), (2, "notes"), (2, "title_block")]
+    assert pages[0]["regions"] == {"title_block": "ocr title_block 1", "notes": "notes text"}
+    assert pages[0]["method"] == "ocr"
+    assert pages[1]["regions"] == {"title_block": "ocr title_block 2", "notes": "ocr notes 2"}
+
+
+def test_whole_pages_use_the_text_layer(pdf):
+    pages = extractor.extract_pdf_pages("drawing.pdf", options=dict(OPTIONS, regions={}))
+
+    assert pdf == [(2, None)]
+    assert [page["method"] for page in pages] == ["text_layer", "ocr"]
+    assert pages[0]["text"] == PAGE_TEXT
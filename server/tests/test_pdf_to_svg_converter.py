@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("dotenv")
+pytest.importorskip("requests")
+
+import fake_convertio
+import pdf_to_svg_converter as converters
+
+
+def test_converter_interface_is_abstract():
+    with pytest.raises(TypeError):
+        converters.PdfToSvgConverter()
+
+
+def test_convertio_is_the_default(monkeypatch):
+    monkeypatch.delenv("SVG_CONVERTER", raising=False)
+    monkeypatch.setattr(converters.config_manager, "get_converter_config", lambda: {})
+    monkeypatch.setattr(converters, "CONVERTIO_API_KEY", "test")
+    # Even with pdftocairo installed, local conversion is opt-in
+    monkeypatch.setattr(converters.PopplerConverter, "is_available", lambda self: True)
+
+    assert isinstance(converters.get_converter(), converters.ConvertioConverter)
+
+
+def test_poppler_when_chosen(monkeypatch):
+    monkeypatch.setattr(converters.PopplerConverter, "is_available", lambda self: True)
+
+    assert isinstance(converters.get_converter("poppler"), converters.PopplerConverter)
+
+
+def test_auto_tries_convertio_first(monkeypatch):
+    monkeypatch.setattr(converters, "CONVERTIO_API_KEY", "test")
+    monkeypatch.setattr(converters.PopplerConverter, "is_available", lambda self: True)
+
+    converter = converters.get_converter("auto")
+
+    assert [backend.name for backend in converter.converters] == ["convertio", "poppler"]
+
+
+def test_unknown_backend(monkeypatch):
+    with pytest.raises(ValueError):
+        converters.get_converter("inkscape")
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """ConvertioConverter factory talking to api/fake_convertio.py in process"""
+    monkeypatch.setattr(fake_convertio, "CONVERSION_DELAY", 0.2)
+    fake_convertio.conversions.clear()
+
+    def create(**options):
+        return converters.ConvertioConverter(
+            "test",
+            base_url="http://convertio.test/convert",
+            transport=httpx.ASGITransport(app=fake_convertio.app),
+            **options
+        )
+    return create
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "original.pdf"
+    path.write_bytes(b"%PDF-1.4 test")
+    return str(path)
+
+
+def test_convert(fake, pdf, tmp_path):
+    output = tmp_path / "original.svg"
+    progress = []
+
+    async def convert():
+        converter = fake(poll_initial=0.01)
+        try:
+            await converter.convert(pdf, str(output), progress.append)
+        finally:
+            await converter.aclose()
+
+    asyncio.run(convert())
+
+    assert output.read_text() == fake_convertio.DEFAULT_SVG
+    assert progress == ["PDF uploaded to conversion service"]
+    assert not (tmp_path / "original.svg.part").exists()
+
+
+def test_polling_backs_off(fake, pdf, tmp_path, monkeypatch):
+    delays = []
+    sleep = asyncio.sleep
+
+    async def recording_sleep(delay):
+        delays.append(delay)
+        await sleep(delay)
+
+    monkeypatch.setattr(converters.asyncio, "sleep", recording_sleep)
+
+    async def convert():
+        converter = fake(poll_initial=0.01, poll_factor=2, poll_max=0.04)
+        try:
+            await converter.convert(pdf, str(tmp_path / "original.svg"))
+        finally:
+            await converter.aclose()
+
+    asyncio.run(convert())
+
+    assert delays[:3] == [0.01, 0.02, 0.04]
+    assert max(delays) == 0.04
+
+
+def test_deadline(fake, pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(fake_convertio, "CONVERSION_DELAY", 60)
+
+    async def convert():
+        converter = fake(timeout=0.1, poll_initial=0.01)
+        try:
+            await converter.convert(pdf, str(tmp_path / "original.svg"))
+        finally:
+            await converter.aclose()
+
+    with pytest.raises(Exception, match="did not finish within"):
+        asyncio.run(convert())
+    assert not (tmp_path / "original.svg").exists()
+
+
+def test_failed_conversion(fake, tmp_path):
+    not_pdf = tmp_path / "drawing.txt"
+    not_pdf.write_text("not a pdf")
+
+    async def convert():
+        converter = fake(poll_initial=0.01)
+        try:
+            await converter.convert(str(not_pdf), str(tmp_path / "original.svg"))
+        finally:
+            await converter.aclose()
+
+    with pytest.raises(Exception, match="Conversion failed"):
+        asyncio.run(convert())
+
+
+def test_client_is_reused_across_conversions(fake, pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(fake_convertio, "CONVERSION_DELAY", 0)
+
+    async def convert_twice():
+        converter = fake(poll_initial=0.01)
+        await converter.convert(pdf, str(tmp_path / "first.svg"))
+        client = converter._client
+        await converter.convert(pdf, str(tmp_path / "second.svg"))
+        assert converter._client is client and not client.is_closed
+        await converter.aclose()
+        assert client.is_closed
+
+    asyncio.run(convert_twice())
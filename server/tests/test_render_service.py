@@ -0,0 +1,54 @@
+import pytest
+
+try:
+    import cairosvg  # noqa: F401
+except (ImportError, OSError) as e:
+    # cairosvg raises OSError when the cairo library itself is missing
+    pytest.skip(f"cairosvg unavailable: {e}", allow_module_level=True)
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from utils import render_service
+
+SVG = ('<svg xmlns="http://www.w3.org/2000/svg" width="20" height="10">'
+       '<rect x="0" y="0" width="10" height="10" fill="#ff0000"/></svg>')
+
+
+@pytest.fixture
+def render_cache(cache_dir, monkeypatch):
+    monkeypatch.setattr(render_service, "_render_cache", None)
+    return cache_dir
+
+
+def test_render_is_read_only_rgba(render_cache):
+    array = render_service.render(SVG)
+
+    assert array.shape == (10, 20, 4)
+    assert tuple(array[5, 2]) == (255, 0, 0, 255)
+    assert not array.flags.writeable
+
+
+def test_renders_are_not_stored_by_default(render_cache, monkeypatch):
+    monkeypatch.delenv("RENDER_CACHE", raising=False)
+    monkeypatch.setattr(render_service, "render_key", None)
+
+    render_service.render(SVG)
+
+    assert not (render_cache / "renders").exists()
+
+
+def test_repeat_render_comes_from_disk(render_cache, monkeypatch):
+    monkeypatch.setenv("RENDER_CACHE", "1")
+    first = render_service.render(SVG)
+
+    def fail(**kwargs):
+        raise AssertionError("rendered again")
+
+    monkeypatch.setattr(render_service.cairosvg, "svg2png", fail)
+    assert (render_service.render(SVG) == first).all()
+    assert render_service.render_png(SVG.encode("utf-8"))
+
+
+def test_spec_is_part_of_the_key():
+    assert (render_service.render_key(SVG.encode(), render_service.RenderSpec())
+            != render_service.render_key(SVG.encode(), render_service.RenderSpec(scale=2)))
@@ -0,0 +1,83 @@
+import random
+import re
+
+from Step1 import find_and_remove_duplicate_paths
+
+
+def baseline_remove_duplicates(svg_text):
+    """The original Step1: drops every line holding a duplicate path's id"""
+    paths = list(re.finditer(r'<path[^>]*?id="([^"]*)"[^>]*?d="([^"]*)"', svg_text))
+    d_params = {}
+    paths_to_remove = set()
+    for path in paths:
+        path_id = path.group(1)
+        d_param = re.sub(r'\s+', ' ', path.group(2).strip())
+        if d_param in d_params:
+            paths_to_remove.add(path_id)
+        else:
+            d_params[d_param] = path_id
+    if not paths_to_remove:
+        return svg_text
+
+    new_lines = [
+        line for line in svg_text.split('\n')
+        if not any(f'id="{path_id}"' in line for path_id in paths_to_remove)
+    ]
+    return '\n'.join(new_lines)
+
+
+def convertio_document(rng, count):
+    """A document laid out like Convertio's output: one path per line, unique ids"""
+    shapes = [f"m {rng.randint(0, 99)},{rng.randint(0, 99)} h {rng.randint(1, 9)} v {rng.randint(1, 9)}" for _ in range(count // 3 + 1)]
+    lines = ['<?xml version="1.0"?>', '<svg xmlns="http://www.w3.org/2000/svg">', '  <g id="g1">']
+    for number in range(1, count + 1):
+        d = rng.choice(shapes)
+        if rng.random() < 0.3:
+            d = f"  {d.replace(' ', '   ')} "
+        color = rng.choice(["#000000", "#ff0000", "#0000ff"])
+        lines.append(f'    <path id="path{number}" style="fill:none;stroke:{color}" d="{d}" />')
+    lines += ['  </g>', '</svg>']
+    return '\n'.join(lines) + rng.choice(['', '\n'])
+
+
+def test_matches_the_original_step1():
+    rng = random.Random(1)
+    for _ in range(300):
+        document = convertio_document(rng, rng.randint(0, 40))
+        assert find_and_remove_duplicate_paths(document) == baseline_remove_duplicates(document)
+
+
+def test_keeps_first_of_each_d():
+    document = (
+        '<svg>\n'
+        '<path id="path1" d="m 0,0 h 1" />\n'
+        '<path id="path2" d="m 0,0  h 1" />\n'
+        '<path id="path3" d="m 0,0 h 2" />\n'
+        '</svg>'
+    )
+
+    assert find_and_remove_duplicate_paths(document) == document.replace('<path id="path2" d="m 0,0  h 1" />\n', '')
+
+
+def test_removes_elements_spanning_lines():
+    document = (
+        '<svg>\n'
+        '<path id="path1" d="m 0,0 h 1" />\n'
+        '<path id="path2"\n'
+        '   d="m 0,0 h 1"></path>\n'
+        '</svg>'
+    )
+
+    assert find_and_remove_duplicate_paths(document) == '<svg>\n<path id="path1" d="m 0,0 h 1" />\n</svg>'
+
+
+def test_geometric_dedup():
+    document = (
+        '<svg>\n'
+        '<path id="path1" d="m 10,10 h 5 v 5" />\n'
+        '<path id="path2" d="M 10,10 L 15,10 L 15,15" />\n'
+        '</svg>'
+    )
+
+    assert 'path2' in find_and_remove_duplicate_paths(document)
+    assert 'path2' not in find_and_remove_duplicate_paths(document, geometric=True)
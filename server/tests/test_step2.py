@@ -0,0 +1,87 @@
+import io
+import random
+
+import pytest
+
+from Step2 import stroke_and_fill_modifier
+from benchmarks.step2_baseline import modify_svg_stroke_and_fill
+from svg_stream import rewrite_stream
+
+COLORS = ["#000000", "#ffdf7f", "#fb3205", "#4e4e4e", "#ABCDEF", "#123"]
+
+
+def style(rng):
+    props = [
+        f"{rng.choice(['stroke', 'fill', 'stroke-width', 'x'])}:{rng.choice(COLORS + ['1'])}"
+        for _ in range(rng.randint(0, 3))
+    ]
+    return ";".join(props) + rng.choice(["", ";", " ", "<"])
+
+
+def tag(rng):
+    attributes = []
+    if rng.random() < 0.7:
+        attributes.append(f'style="{style(rng)}"')
+    if rng.random() < 0.5:
+        attributes.append(f'id="path{rng.randint(1, 9)}"')
+    if rng.random() < 0.3:
+        attributes.append(f'fill="{rng.choice(COLORS)}"')
+    rng.shuffle(attributes)
+    name = rng.choice(["path", "text", "tspan", "g"])
+    return f"<{name}{' ' if attributes else ''}{' '.join(attributes)}{rng.choice(['/>', '>', ' />'])}"
+
+
+def document(rng):
+    """Random markup whose attribute values contain no '>'"""
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        kind = rng.random()
+        if kind < 0.6:
+            parts.append(tag(rng))
+        elif kind < 0.75:
+            parts.append(rng.choice(["</text>", "</tspan>", "</g>"]))
+        else:
+            parts.append(rng.choice(["\n", "label ", " stroke:#000000 ", "fill:#ffdf7f", ";"]))
+    return "".join(parts)
+
+
+def streamed(svg_text, chunk_size):
+    output = io.StringIO()
+    rewrite_stream(io.StringIO(svg_text), output, stroke_and_fill_modifier(), chunk_size)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_streaming_matches_whole_document(chunk_size):
+    rng = random.Random(chunk_size)
+    for _ in range(3000):
+        svg_text = document(rng)
+        assert streamed(svg_text, chunk_size) == modify_svg_stroke_and_fill(svg_text)
+
+
+def test_recolors_convertio_markup():
+    svg_text = (
+        '<svg>\n'
+        '<path id="path1" style="fill:none;stroke:#000000" d="m 0,0 h 1" />\n'
+        '<path id="path2" style="fill:#123456;stroke:#abcdef" d="m 0,0 h 1" />\n'
+        '<path id="path3" style="fill:none;stroke:#ffdf7f" d="m 0,0 h 1" />\n'
+        '<text x="1">A</text>\n'
+        '</svg>'
+    )
+
+    assert streamed(svg_text, 16) == (
+        '<svg>\n'
+        '<path id="path1" style="fill:none;stroke:#4e4e4e" d="m 0,0 h 1" />\n'
+        '<path id="path2" style="fill:#4e4e4e;stroke:#4e4e4e" d="m 0,0 h 1" />\n'
+        '<path id="path3" style="fill:none;stroke:#000000" d="m 0,0 h 1" />\n'
+        '<text x="1" style="fill:#4e4e4e; stroke:#4e4e4e">A</text>\n'
+        '</svg>'
+    )
+
+
+def test_gt_inside_attribute_values_is_outside_the_guarantee():
+    # The whole-document text rule reaches past the '>' inside the style value
+    svg_text = '<text style="x:1/>stroke:#fb3205">'
+
+    assert modify_svg_stroke_and_fill(svg_text) == '<text style="x:1/>stroke:#4e4e4e">'
+    assert streamed(svg_text, 1 << 20) == svg_text
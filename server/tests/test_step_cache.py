@@ -0,0 +1,165 @@
+import io
+import os
+
+import pytest
+
+import step_cache
+from step_result import StepResult
+from utils.workspace import Workspace
+
+INPUT_SVG = '<svg><path d="m 0,0 h 60 v -60 h -60 v 60"/></svg>'
+
+
+def test_shared_modules_exist():
+    for filename in step_cache.SHARED_MODULES:
+        assert os.path.isfile(os.path.join(step_cache.PROCESSORS_DIR, filename)), filename
+
+
+def test_step_version_covers_render_service(monkeypatch, tmp_path):
+    version = step_cache.step_version("Step5")
+    step_cache._step_versions.clear()
+
+    # Hash a copy of the processors with render_service edited
+    processors = tmp_path / "processors"
+    utils = tmp_path / "utils"
+    processors.mkdir()
+    utils.mkdir()
+    for filename in ("Step5.py",) + step_cache.SHARED_MODULES:
+        source = os.path.join(step_cache.PROCESSORS_DIR, filename)
+        target = processors / filename
+        with open(source, "rb") as f:
+            data = f.read()
+        if filename.endswith("render_service.py"):
+            data += b"\n# edited\n"
+        os.makedirs(os.path.dirname(os.path.normpath(target)), exist_ok=True)
+        with open(os.path.normpath(target), "wb") as f:
+            f.write(data)
+    monkeypatch.setattr(step_cache, "PROCESSORS_DIR", str(processors))
+
+    try:
+        assert step_cache.step_version("Step5") != version
+    finally:
+        step_cache._step_versions.clear()
+
+
+@pytest.fixture
+def step_cache_dir(cache_dir, monkeypatch):
+    monkeypatch.setattr(step_cache, "_step_cache", None)
+    step_cache._step_versions.clear()
+    yield cache_dir
+    step_cache._step_versions.clear()
+
+
+def make_workspace(tmp_path, name, keep_artifacts=False):
+    return Workspace(name, root=str(tmp_path / "jobs"), keep_artifacts=keep_artifacts).create()
+
+
+def key(step_name, svg=INPUT_SVG):
+    return step_cache.step_cache_key(step_name, io.StringIO(svg))
+
+
+def step4_result(workspace):
+    workspace.put_svg("Step4", "<svg>output</svg>")
+    png_path = workspace.path("Step4-results.png")
+    with open(png_path, "wb") as f:
+        f.write(b"png")
+    return StepResult(
+        step="Step4",
+        success=True,
+        count=3,
+        counts={"shores_box": 2, "frames_5x4": 1},
+        artifacts={"document": "Step4", "results_png": png_path},
+    )
+
+
+def test_store_then_load(step_cache_dir, tmp_path):
+    first = make_workspace(tmp_path, "first")
+    result = step4_result(first)
+    step_cache.store_step_result(key("Step4"), result, first)
+
+    workspace = make_workspace(tmp_path, "second")
+    loaded = step_cache.load_step_result("Step4", key("Step4"), workspace)
+
+    assert loaded.success and loaded.count == 3
+    assert loaded.counts == result.counts
+    assert workspace.get_svg("Step4") == "<svg>output</svg>"
+    assert loaded.artifacts["results_png"] == workspace.path("Step4-results.png")
+    with open(loaded.artifacts["results_png"], "rb") as f:
+        assert f.read() == b"png"
+    assert set(loaded.timings) == {"cache"}
+
+
+def test_streamed_document_round_trip(step_cache_dir, tmp_path):
+    first = make_workspace(tmp_path, "first", keep_artifacts=True)
+    with first.svg_writer("Step2") as f:
+        f.write("<svg>streamed</svg>")
+    result = StepResult(step="Step2", success=True, artifacts={"document": "Step2"})
+    step_cache.store_step_result(key("Step2"), result, first)
+
+    assert not os.path.exists(first.path("Step2.svg.cache"))
+    workspace = make_workspace(tmp_path, "second")
+    assert step_cache.load_step_result("Step2", key("Step2"), workspace) is not None
+    assert workspace.get_svg("Step2") == "<svg>streamed</svg>"
+
+
+def test_key_depends_on_input_and_step(step_cache_dir):
+    assert key("Step4") == key("Step4")
+    assert key("Step4") != key("Step4", INPUT_SVG.replace("60", "61"))
+    assert key("Step4") != key("Step5")
+
+
+def test_miss_after_settings_change(step_cache_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("GEOMETRIC_DEDUP", "0")
+    workspace = make_workspace(tmp_path, "first")
+    workspace.put_svg("Step1", "<svg/>")
+    result = StepResult(step="Step1", success=True, artifacts={"document": "Step1"})
+    step_cache.store_step_result(key("Step1"), result, workspace)
+    assert step_cache.load_step_result("Step1", key("Step1"), workspace) is not None
+
+    monkeypatch.setenv("GEOMETRIC_DEDUP", "1")
+    assert step_cache.load_step_result("Step1", key("Step1"), workspace) is None
+
+
+def test_miss_after_pattern_version_change(step_cache_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("SHAPE_MATCHING", "0")
+    workspace = make_workspace(tmp_path, "first")
+    step_cache.store_step_result(key("Step4"), step4_result(workspace), workspace)
+    assert step_cache.load_step_result("Step4", key("Step4"), workspace) is not None
+
+    monkeypatch.setenv("SHAPE_MATCHING", "1")
+    step_cache._step_versions.clear()
+    assert step_cache.load_step_result("Step4", key("Step4"), workspace) is None
+
+
+def test_failed_and_errored_results_are_not_stored(step_cache_dir, tmp_path):
+    workspace = make_workspace(tmp_path, "first")
+    step_cache.store_step_result(key("Step4"), StepResult(step="Step4", success=False), workspace)
+    errored = StepResult(step="Step6", success=True, count=0, error="Detection could not process the rendered image")
+    step_cache.store_step_result(key("Step6"), errored, workspace)
+
+    assert step_cache.load_step_result("Step4", key("Step4"), workspace) is None
+    assert step_cache.load_step_result("Step6", key("Step6"), workspace) is None
+
+
+@pytest.mark.parametrize("damage", ["corrupt_result", "missing_image"])
+def test_unreadable_entry_is_dropped(step_cache_dir, tmp_path, damage):
+    workspace = make_workspace(tmp_path, "first")
+    step_cache.store_step_result(key("Step4"), step4_result(workspace), workspace)
+    entry_dir = step_cache.get_step_cache().get(key("Step4"))
+    if damage == "corrupt_result":
+        with open(os.path.join(entry_dir, step_cache.RESULT_FILE), "w") as f:
+            f.write("{not json")
+    else:
+        os.remove(os.path.join(entry_dir, "Step4-results.png"))
+
+    assert step_cache.load_step_result("Step4", key("Step4"), make_workspace(tmp_path, "second")) is None
+    assert step_cache.get_step_cache().get(key("Step4")) is None
+
+
+def test_disabled_cache(step_cache_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("AI_TAKEOFF_CACHE", "0")
+    workspace = make_workspace(tmp_path, "first")
+    step_cache.store_step_result(key("Step4"), step4_result(workspace), workspace)
+
+    assert not os.path.exists(step_cache_dir / "steps")
+    assert step_cache.load_step_result("Step4", key("Step4"), workspace) is None
@@ -0,0 +1,98 @@
+import re
+
+from svg_paths import PathTable
+
+DOCUMENT = (
+    '<svg>\n'
+    '  <path id="path1" style="stroke:#000000" d="m 0,0 h 10" />\n'
+    '  <path id="path2" style="stroke:#ff0000" d="m 5,5 v 10"></path>\n'
+    '  <g><path id="path3" d="m 1,1 h 2" /></g>\n'
+    '  <path id="path4"\n'
+    '     d="m 2,2 h 4" />\n'
+    '</svg>'
+)
+
+
+def test_parses_every_path():
+    table = PathTable(DOCUMENT)
+
+    assert [path.id for path in table] == ["path1", "path2", "path3", "path4"]
+    assert [path.number for path in table] == [1, 2, 3, 4]
+    assert table.paths[0].d == "m 0,0 h 10"
+    assert table.paths[0].style == "stroke:#000000"
+    assert table.paths[2].style is None
+    assert table.tag(table.paths[1]) == '<path id="path2" style="stroke:#ff0000" d="m 5,5 v 10">'
+
+
+def test_render_without_edits_is_the_source():
+    table = PathTable(DOCUMENT)
+
+    assert not table.edited
+    assert table.render() is DOCUMENT
+
+
+def test_replace():
+    table = PathTable(DOCUMENT)
+    path = table.paths[0]
+    table.replace(path, table.tag(path).replace("#000000", "#ff00ff"))
+
+    assert table.edited
+    assert table.tag(path) == '<path id="path1" style="stroke:#ff00ff" d="m 0,0 h 10" />'
+    assert table.render() == DOCUMENT.replace("#000000", "#ff00ff")
+
+
+def test_remove_drops_the_whole_line():
+    table = PathTable(DOCUMENT)
+    table.remove(table.paths[0])
+
+    assert table.render() == DOCUMENT.replace('  <path id="path1" style="stroke:#000000" d="m 0,0 h 10" />\n', "")
+
+
+def test_remove_element_with_closing_tag():
+    table = PathTable(DOCUMENT)
+    table.remove(table.paths[1])
+
+    assert 'path2' not in table.render()
+    assert '</path>' not in table.render()
+
+
+def test_remove_keeps_other_content_on_the_line():
+    table = PathTable(DOCUMENT)
+    table.remove(table.paths[2])
+
+    assert '  <g></g>\n' in table.render()
+
+
+def test_remove_tag_spanning_lines():
+    table = PathTable(DOCUMENT)
+    table.remove(table.paths[3])
+
+    assert table.render().endswith('</g>\n</svg>')
+
+
+def test_remove_last_line_without_newline():
+    source = '<svg>\n<path id="path1" d="m 0,0 h 1" />'
+    table = PathTable(source)
+    table.remove(table.paths[0])
+
+    assert table.render() == '<svg>'
+
+
+def test_edits_are_applied_in_document_order():
+    table = PathTable(DOCUMENT)
+    table.remove(table.paths[3])
+    table.replace(table.paths[0], '<path id="path1" />')
+    table.remove(table.paths[1])
+
+    rendered = table.render()
+    assert rendered.index('<path id="path1" />') < rendered.index('path3')
+    assert 'path2' not in rendered and 'path4' not in rendered
+
+
+def test_matching_tag_pattern():
+    table = PathTable(DOCUMENT)
+    pattern = re.compile(r'<path[^>]+d="[^"]*(v 10)[^"]*"[^>]*>')
+
+    assert [path.id for path in table.matching(pattern)] == ["path2"]
+    record, match = table.matches(pattern)[0]
+    assert match.group(1) == "v 10"
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+for module in ("requests", "fastapi", "httpx", "dotenv", "pdf2image", "pytesseract", "PIL"):
+    pytest.importorskip(module)
+
+from utils import takeoff_job
+from utils.progress import PROGRESS_FILE
+from utils.workspace import Workspace
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    return Workspace("job-test", root=str(tmp_path)).create()
+
+
+@pytest.fixture
+def downloaded(monkeypatch, tmp_path):
+    pdf = tmp_path / "original.pdf"
+    pdf.write_bytes(b"%PDF-1.4 test")
+    monkeypatch.setattr(takeoff_job, "download_pdf_from_drive", lambda upload_id, folder: str(pdf))
+    return pdf
+
+
+def events(workspace):
+    with open(workspace.path(PROGRESS_FILE)) as f:
+        return [json.loads(line) for line in f]
+
+
+def failures(workspace):
+    return [(event["stage"], event["status"]) for event in events(workspace) if event["status"] == "failed"]
+
+
+def test_download_failure(monkeypatch, workspace):
+    def fail(upload_id, folder):
+        raise Exception("File not found or not accessible. Status code: 404")
+    monkeypatch.setattr(takeoff_job, "download_pdf_from_drive", fail)
+
+    result = asyncio.run(takeoff_job.process_ai_takeoff("file1", workspace))
+
+    assert result["status"] == "error"
+    assert result["stage"] == "download"
+    assert result["message"] == "Failed to download PDF from Google Drive"
+    assert failures(workspace) == [("download", "failed")]
+
+
+def test_failure_after_download_reports_its_stage_and_waits_for_text(monkeypatch, workspace, downloaded):
+    extracted = []
+
+    def slow_extract(file_path, workspace):
+        time.sleep(0.2)
+        extracted.append(file_path)
+        return "", []
+
+    def broken_converter():
+        raise RuntimeError("converter crashed")
+
+    monkeypatch.setattr(takeoff_job, "extract_job_text", slow_extract)
+    monkeypatch.setattr(takeoff_job, "get_converter", broken_converter)
+
+    result = asyncio.run(takeoff_job.process_ai_takeoff("file1", workspace))
+
+    assert result["stage"] == "convert"
+    assert result["message"] == "Failed to convert PDF to SVG"
+    assert failures(workspace) == [("convert", "failed")]
+    # The text extraction finished before the job returned
+    assert extracted == [str(downloaded)]
+
+
+def test_text_storage_failure(monkeypatch, workspace, downloaded):
+    def store(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(takeoff_job, "extract_job_text", lambda file_path, workspace: ("text", []))
+    monkeypatch.setattr(takeoff_job, "get_converter", lambda: None)
+    monkeypatch.setattr(takeoff_job, "store_text_in_data_json", store)
+
+    result = asyncio.run(takeoff_job.process_ai_takeoff("file1", workspace))
+
+    assert result["stage"] == "ocr"
+    assert ("ocr", "failed") in failures(workspace)
+
+
+class FakeConverter:
+    def __init__(self, name):
+        self.name = name
+
+    async def convert(self, pdf_path, output_path, on_progress=None):
+        with open(output_path, "w") as f:
+            f.write("<svg/>")
+
+
+@pytest.mark.parametrize("backend, warned", [("convertio", False), ("poppler", True)])
+def test_non_convertio_svg_is_warned(monkeypatch, workspace, downloaded, backend, warned):
+    monkeypatch.setattr(takeoff_job, "extract_job_text", lambda file_path, workspace: ("", []))
+    monkeypatch.setattr(takeoff_job, "get_converter", lambda: FakeConverter(backend))
+    monkeypatch.setattr(takeoff_job, "run_pipeline_with_logging", lambda upload_id, workspace: True)
+
+    result = asyncio.run(takeoff_job.process_ai_takeoff("file1", workspace))
+
+    converted = [event for event in events(workspace) if (event["stage"], event["status"]) == ("convert", "completed")]
+    assert converted[0]["backend"] == backend
+    assert ("warning" in converted[0]) == warned
+    assert ("warning" in result) == warned
+    assert result["status"] == "completed"
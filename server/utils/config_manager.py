@@ -24,7 +24,43 @@ class ConfigManager:
                         "port": 5001,
                         "title": "AI-Takeoff Server",
                         "description": "AI-Takeoff API server",
-                        "version": "1.0.0"
+                        "version": "1.0.0",
+                        "max_workers": None
+                    },
+                    "pipeline": {
+                        "keep_artifacts": False,
+                        "parallel_detectors": True,
+                        "detector_workers": 4,
+                        "geometric_dedup": False,
+                        "dedup_quantum": 0.5,
+                        "shape_matching": False
+                    },
+                    "converter": {
+                        "backend": "convertio",
+                        "page": 1,
+                        "timeout_seconds": 300,
+                        "convertio_timeout_seconds": 600
+                    },
+                    "ocr": {
+                        "workers": None,
+                        "text_layer": True,
+                        "min_text_chars": 20,
+                        "dpi": 200,
+                        "preprocess": "none",
+                        "binarize_threshold": 160,
+                        "pages": None,
+                        "regions": {}
+                    },
+                    "cache": {
+                        "enabled": True,
+                        "dir": None,
+                        "steps_max_mb": 2048,
+                        "downloads_max_mb": 2048,
+                        "downloads_ttl_seconds": 300,
+                        "ocr_max_mb": 256,
+                        "patterns_max_mb": 64,
+                        "renders_max_mb": 2048,
+                        "renders_enabled": False
                     },
                     "current_state": {
                         "google_drive_file_id": None,
@@ -67,6 +103,22 @@ class ConfigManager:
     def get_app_config(self) -> Dict[str, Any]:
         """Get application configuration"""
         return self.config.get('app_config', {})
+    
+    def get_pipeline_config(self) -> Dict[str, Any]:
+        """Get processing pipeline configuration"""
+        return self.config.get('pipeline', {})
+    
+    def get_converter_config(self) -> Dict[str, Any]:
+        """Get PDF to SVG converter configuration"""
+        return self.config.get('converter', {})
+    
+    def get_ocr_config(self) -> Dict[str, Any]:
+        """Get text extraction (OCR) configuration"""
+        return self.config.get('ocr', {})
+    
+    def get_cache_config(self) -> Dict[str, Any]:
+        """Get on-disk cache configuration"""
+        return self.config.get('cache', {})
 
 # Global config manager instance
 config_manager = ConfigManager()
@@ -0,0 +1,180 @@
+import os
+import time
+import shutil
+import uuid
+from typing import Dict, Optional
+
+from utils.config_manager import config_manager
+
+# Caches live outside files/ so clearing a workspace never wipes them
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_ROOT = os.path.join(SERVER_DIR, "cache")
+
+# Other processes write to the same caches, so the size is rescanned at least this often
+RESCAN_SECONDS = 300
+
+
+def get_cache_root() -> str:
+    """Cache directory: AI_TAKEOFF_CACHE_DIR env var, then cache.dir, then server/cache"""
+    return os.environ.get("AI_TAKEOFF_CACHE_DIR") or config_manager.get_cache_config().get("dir") or DEFAULT_CACHE_ROOT
+
+
+def cache_enabled() -> bool:
+    """Whether the on-disk caches are used (AI_TAKEOFF_CACHE env var or cache.enabled)"""
+    value = os.environ.get("AI_TAKEOFF_CACHE")
+    if value is not None:
+        return value.lower() in ("1", "true", "yes")
+    return bool(config_manager.get_cache_config().get("enabled", True))
+
+
+def cache_limit_bytes(setting: str, default_mb: int) -> int:
+    """Size limit for one cache from cache.<setting> (in MB)"""
+    value = config_manager.get_cache_config().get(setting, default_mb)
+    try:
+        return int(float(value) * 1024 * 1024)
+    except (TypeError, ValueError):
+        print(f"⚠️  Invalid cache.{setting} value {value!r}, using {default_mb} MB")
+        return default_mb * 1024 * 1024
+
+
+class DiskCache:
+    """
+    Size-bounded, least-recently-used cache of small file sets on local disk.
+
+    Each key maps to a directory of files. Entries are written to a temporary
+    directory and renamed into place, so readers in other processes never see
+    a half-written entry. Reading an entry marks it as recently used; once the
+    cache grows past max_bytes the least recently used entries are removed.
+
+    The size is kept as a running total of what this process writes, so a put
+    only scans the cache when the total goes over max_bytes or the last scan
+    is more than RESCAN_SECONDS old.
+    """
+
+    def __init__(self, name: str, max_bytes: int, root: Optional[str] = None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.root = os.path.join(root or get_cache_root(), name)
+        self._size: Optional[int] = None
+        self._scanned_at = 0.0
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the entry directory for key, or None on a miss"""
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return None
+        try:
+            # The directory mtime is the entry's last use
+            os.utime(entry_dir)
+        except OSError:
+            return None
+        return entry_dir
+
+    def get_file(self, key: str, filename: str) -> Optional[str]:
+        """Return the path of one file of an entry, or None on a miss"""
+        entry_dir = self.get(key)
+        if entry_dir is None:
+            return None
+        path = os.path.join(entry_dir, filename)
+        return path if os.path.exists(path) else None
+
+    def put(self, key: str, files: Dict[str, bytes], move_files: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        Store an entry and return its directory
+
+        Args:
+            key: Cache key (a hex digest)
+            files: File contents to write, by file name
+            move_files: Existing files to move into the entry, by file name
+
+        Returns:
+            The entry directory, or None if it could not be written
+        """
+        tmp_dir = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        written = 0
+        try:
+            os.makedirs(tmp_dir)
+            for filename, data in files.items():
+                with open(os.path.join(tmp_dir, filename), "wb") as f:
+                    f.write(data)
+                written += len(data)
+            for filename, source in (move_files or {}).items():
+                written += os.path.getsize(source)
+                shutil.move(source, os.path.join(tmp_dir, filename))
+
+            entry_dir = self._entry_dir(key)
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except Exception as e:
+            print(f"⚠️  Could not write {self.name} cache entry: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return None
+
+        # A replaced entry is still counted; the next scan corrects that
+        if self._size is not None:
+            self._size += written
+        if (
+            self._size is None
+            or self._size > self.max_bytes
+            or time.monotonic() - self._scanned_at > RESCAN_SECONDS
+        ):
+            self.evict()
+        return entry_dir
+
+    def delete(self, key: str) -> None:
+        """Remove an entry"""
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _entries(self):
+        """(last_used, size, path) for every entry"""
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if prefix.startswith(".tmp-") or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    size = sum(
+                        os.path.getsize(os.path.join(entry_dir, filename))
+                        for filename in os.listdir(entry_dir)
+                    )
+                    entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+                except OSError:
+                    # Removed by another process while scanning
+                    continue
+        return entries
+
+    def size(self) -> int:
+        """Total size of all entries in bytes"""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        self._scanned_at = time.monotonic()
+        self._size = total
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+        self._size = total
+        print(f"🧹 {self.name} cache trimmed to {total / (1024 * 1024):.1f} MB")
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        shutil.rmtree(self.root, ignore_errors=True)
+        self._size = 0
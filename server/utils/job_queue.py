@@ -0,0 +1,180 @@
+import os
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from utils.config_manager import config_manager
+from utils.workspace import Workspace, new_job_id
+from utils.progress import job_started
+from utils.takeoff_job import run_takeoff_job, preload_worker
+
+# Terminal job states
+FINISHED_STATES = ("completed", "failed")
+
+
+def get_max_workers() -> int:
+    """Worker pool size: AI_TAKEOFF_WORKERS env var, then app_config.max_workers, then CPU count"""
+    value = os.environ.get("AI_TAKEOFF_WORKERS") or config_manager.get_app_config().get("max_workers")
+    try:
+        if value:
+            return max(1, int(value))
+    except (TypeError, ValueError):
+        print(f"⚠️  Invalid max_workers value {value!r}, using CPU count")
+    return os.cpu_count() or 1
+
+
+class JobQueue:
+    """
+    Runs AI-Takeoff jobs in a bounded process pool so the API event loop never blocks.
+
+    Job records are kept in memory; finished jobs are dropped (and their workspaces
+    removed) once more than max_finished_jobs have accumulated.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_finished_jobs: int = 100):
+        self.max_workers = max_workers or get_max_workers()
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use"""
+        if self._executor is None:
+            # Spawn rather than fork: the API process runs threads (uvicorn, the event
+            # loop's executors) whose locks a forked child could inherit held
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=preload_worker
+            )
+            print(f"✅ Job worker pool started with {self.max_workers} workers")
+        return self._executor
+
+    def submit(self, upload_id: str) -> str:
+        """
+        Queue a job for the given upload and return its job id immediately
+
+        Args:
+            upload_id: Google Drive file ID of the PDF
+
+        Returns:
+            The new job's id
+        """
+        job_id = new_job_id()
+        Workspace(job_id).create(upload_id)
+
+        with self._lock:
+            try:
+                future = self._get_executor().submit(run_takeoff_job, upload_id, job_id)
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool and retry once
+                print("⚠️  Worker pool was broken, restarting it")
+                self._executor = None
+                future = self._get_executor().submit(run_takeoff_job, upload_id, job_id)
+
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "upload_id": upload_id,
+                "status": "queued",
+                "submitted_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        print(f"📥 Queued job {job_id} for upload_id: {upload_id}")
+        return job_id
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        """Record the outcome of a finished job"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+
+            job["finished_at"] = datetime.now().isoformat()
+            if future.cancelled():
+                job["status"] = "failed"
+                job["error"] = "Job was cancelled"
+            elif future.exception() is not None:
+                job["status"] = "failed"
+                job["error"] = str(future.exception())
+            else:
+                result = future.result()
+                job["result"] = result
+                job["status"] = "failed" if result.get("status") == "error" else "completed"
+                job["error"] = result.get("error")
+            status = job["status"]
+
+        print(f"🏁 Job {job_id} {status}")
+        self._prune()
+
+    def _prune(self) -> None:
+        """Drop the oldest finished jobs beyond max_finished_jobs"""
+        with self._lock:
+            finished = [job for job in self.jobs.values() if job["status"] in FINISHED_STATES]
+            excess = len(finished) - self.max_finished_jobs
+            if excess <= 0:
+                return
+            finished.sort(key=lambda job: job["finished_at"])
+            expired = [job["job_id"] for job in finished[:excess]]
+
+        for job_id in expired:
+            self.discard(job_id)
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job record without its result, or None if unknown"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            queued = job["status"] == "queued"
+
+        # The executor marks futures as running as soon as they enter its call
+        # queue, so only the worker's own "started" event counts. It is read
+        # outside the lock so polling never holds up submit or discard.
+        started = queued and job_started(Workspace(job_id))
+
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if started and job["status"] == "queued":
+                job["status"] = "running"
+            return {key: value for key, value in job.items() if key != "result"}
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the result of a finished job, or None if unknown or not finished"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return job["result"] if job else None
+
+    async def wait(self, job_id: str) -> Dict[str, Any]:
+        """Wait for a job without blocking the event loop and return its result"""
+        future = self._futures[job_id]
+        return await asyncio.wrap_future(future)
+
+    def discard(self, job_id: str) -> None:
+        """Forget a job and remove its workspace"""
+        with self._lock:
+            self.jobs.pop(job_id, None)
+            self._futures.pop(job_id, None)
+        Workspace(job_id).cleanup()
+
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global job queue instance
+job_queue = JobQueue()
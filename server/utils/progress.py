@@ -0,0 +1,96 @@
+import os
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from utils.workspace import Workspace
+
+# Progress events are appended to this file inside the job workspace, one JSON object
+# per line, so any process working on the job can report and the API can tail it
+PROGRESS_FILE = "progress.ndjson"
+
+# Stage that marks the end of a job
+JOB_STAGE = "job"
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def report_progress(workspace: Workspace, stage: str, status: str, **details: Any) -> None:
+    """
+    Append a progress event to the job's progress log
+
+    Args:
+        workspace: The job workspace
+        stage: Pipeline stage, e.g. "download", "ocr", "convert", "Step4", "upload", "job"
+        status: "started", "progress", "completed", "failed" or "skipped"
+        **details: Extra JSON-serializable fields (counts, sizes, messages)
+    """
+    event = {
+        "timestamp": datetime.now().isoformat(),
+        "job_id": workspace.job_id,
+        "stage": stage,
+        "status": status,
+    }
+    event.update(details)
+
+    try:
+        # One write per event keeps appends from different processes from interleaving
+        with open(workspace.path(PROGRESS_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, default=str) + "\n")
+    except Exception as e:
+        print(f"⚠️  Could not record progress event: {e}")
+
+
+def read_progress(workspace: Workspace, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Read the progress events written after the given byte offset
+
+    Args:
+        workspace: The job workspace
+        offset: Byte offset returned by the previous call (0 to start from the beginning)
+
+    Returns:
+        The new events and the offset to pass to the next call
+    """
+    path = workspace.path(PROGRESS_FILE)
+    if not os.path.exists(path):
+        return [], offset
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        chunk = f.read()
+
+    # Only consume complete lines; a partially written event is picked up next time
+    end = chunk.rfind(b"\n") + 1
+    events = []
+    for line in chunk[:end].splitlines():
+        if line.strip():
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+    return events, offset + end
+
+
+def is_terminal_event(event: Dict[str, Any]) -> bool:
+    """True if the event marks the end of the job"""
+    return event.get("stage") == JOB_STAGE and event.get("status") in TERMINAL_STATUSES
+
+
+def job_started(workspace: Workspace) -> bool:
+    """
+    True once a worker has picked up the job. The worker's "job" started event
+    is always the first line of the progress log, so only that line is read.
+    """
+    try:
+        with open(workspace.path(PROGRESS_FILE), 'rb') as f:
+            first_line = f.readline()
+    except FileNotFoundError:
+        return False
+
+    try:
+        event = json.loads(first_line)
+    except json.JSONDecodeError:
+        # Not completely written yet
+        return False
+    return event.get("stage") == JOB_STAGE and event.get("status") == "started"
@@ -0,0 +1,138 @@
+import io
+import os
+import json
+import hashlib
+from dataclasses import dataclass, asdict
+from typing import Optional, Union
+
+import cairosvg
+import numpy as np
+from PIL import Image
+
+from utils.config_manager import config_manager
+from utils.disk_cache import DiskCache, cache_enabled, cache_limit_bytes
+
+# Bump to invalidate every cached render
+RENDER_FORMAT = "1"
+RENDER_FILE = "render.png"
+
+
+@dataclass(frozen=True)
+class RenderSpec:
+    """How to rasterize a document; the fields are cairosvg.svg2png's options"""
+    dpi: float = 96
+    scale: float = 1
+    background_color: Optional[str] = None
+    output_width: Optional[int] = None
+    output_height: Optional[int] = None
+
+
+DEFAULT_SPEC = RenderSpec()
+
+_render_cache: Optional[DiskCache] = None
+
+
+def get_render_cache() -> DiskCache:
+    """Get the cache of rendered PNGs"""
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = DiskCache("renders", cache_limit_bytes("renders_max_mb", 2048))
+    return _render_cache
+
+
+def render_cache_enabled() -> bool:
+    """
+    Whether renders are kept on disk (RENDER_CACHE env var or cache.renders_enabled).
+    Off by default: within a job every step renders a different document, and a
+    repeat job is already served by the step cache, so stored renders are rarely read.
+    """
+    if not cache_enabled():
+        return False
+    value = os.environ.get("RENDER_CACHE")
+    if value is not None:
+        return value.lower() in ("1", "true", "yes")
+    return bool(config_manager.get_cache_config().get("renders_enabled", False))
+
+
+def render_key(svg_bytes: bytes, spec: RenderSpec) -> str:
+    """Cache key of a render: the document's content hash and the spec"""
+    digest = hashlib.sha256(f"{RENDER_FORMAT}:{getattr(cairosvg, '__version__', '')}".encode())
+    digest.update(json.dumps(asdict(spec), sort_keys=True).encode())
+    digest.update(hashlib.sha256(svg_bytes).digest())
+    return digest.hexdigest()
+
+
+def _as_bytes(svg: Union[str, bytes]) -> bytes:
+    return svg.encode("utf-8") if isinstance(svg, str) else svg
+
+
+def _svg2png(svg_bytes: bytes, spec: RenderSpec) -> bytes:
+    # Set fontconfig path if not already set
+    if not os.environ.get('FONTCONFIG_PATH'):
+        os.environ['FONTCONFIG_PATH'] = '/etc/fonts'
+    return cairosvg.svg2png(bytestring=svg_bytes, **asdict(spec))
+
+
+def _cached_png(svg_bytes: bytes, spec: RenderSpec) -> bytes:
+    """PNG of a document from the disk cache, rendering and storing it on a miss"""
+    key = render_key(svg_bytes, spec)
+    path = get_render_cache().get_file(key, RENDER_FILE)
+    if path is not None:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+
+    png_data = _svg2png(svg_bytes, spec)
+    try:
+        get_render_cache().put(key, {RENDER_FILE: png_data})
+    except Exception as e:
+        print(f"⚠️  Could not cache render: {e}")
+    return png_data
+
+
+def render_png(svg: Union[str, bytes], spec: RenderSpec = DEFAULT_SPEC) -> bytes:
+    """
+    Rasterize a document to PNG, reusing an identical earlier render when the
+    render cache is enabled
+
+    Args:
+        svg: SVG document text or bytes
+        spec: Render options
+
+    Returns:
+        PNG file contents
+
+    Raises:
+        Exception: Whatever cairosvg raises when the document can't be rendered
+    """
+    svg_bytes = _as_bytes(svg)
+    if render_cache_enabled():
+        return _cached_png(svg_bytes, spec)
+    return _svg2png(svg_bytes, spec)
+
+
+def render(svg: Union[str, bytes], spec: RenderSpec = DEFAULT_SPEC) -> np.ndarray:
+    """
+    Rasterize a document to a read-only RGBA array (height x width x 4)
+
+    Raises:
+        Exception: Whatever cairosvg raises when the document can't be rendered
+    """
+    image = Image.open(io.BytesIO(render_png(svg, spec)))
+    array = np.array(image.convert("RGBA") if image.mode != "RGBA" else image)
+    array.flags.writeable = False
+    return array
+
+
+def save_png(svg: Union[str, bytes], png_path: str, spec: RenderSpec = DEFAULT_SPEC) -> None:
+    """
+    Rasterize a document into a PNG file
+
+    Raises:
+        Exception: Whatever cairosvg raises when the document can't be rendered
+    """
+    png_data = render_png(svg, spec)
+    with open(png_path, "wb") as f:
+        f.write(png_data)
@@ -0,0 +1,328 @@
+import os
+import sys
+import json
+import asyncio
+import multiprocessing.util
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.workspace import Workspace, SERVER_DIR
+from utils.progress import report_progress, JOB_STAGE
+
+# Add the api directory to the Python path
+sys.path.append(os.path.join(SERVER_DIR, 'api'))
+
+from gdrive_pdf_downloader import download_pdf_from_drive
+from pdf_to_svg_converter import get_converter as create_converter, PIPELINE_BACKEND
+from api.pdf_text_extractor import read_pdf_text, store_text_in_data_json
+
+# The PDF to SVG converter is created once per worker process
+converter = None
+converter_error = None
+
+# Jobs in a worker process share one event loop, so the converter's HTTP
+# connections (which can't cross event loops) are reused from job to job
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_converter():
+    """Get or create this process's PDF to SVG converter (None if no backend is available)"""
+    global converter, converter_error
+    if converter is None and converter_error is None:
+        try:
+            converter = create_converter()
+            print(f"✅ PDF to SVG converter initialized successfully ({converter.name})")
+        except ValueError as e:
+            converter_error = str(e)
+            print(f"⚠️  Warning: {e}. SVG conversion will not work.")
+    return converter
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get or create this process's event loop for running jobs"""
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+    return _event_loop
+
+
+def close_worker():
+    """Close the converter's connections and the event loop when the process exits"""
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        return
+    try:
+        if converter is not None:
+            _event_loop.run_until_complete(converter.aclose())
+        _event_loop.run_until_complete(_event_loop.shutdown_default_executor())
+    except Exception as e:
+        print(f"⚠️  Could not close worker connections: {e}")
+    finally:
+        _event_loop.close()
+        _event_loop = None
+
+
+def preload_worker():
+    """
+    Job pool initializer: load the compiled Step4/Step6 patterns before the
+    first job so no job pays for compiling them, and close the worker's
+    connections when the pool shuts it down
+    """
+    # Pool workers skip atexit handlers but run multiprocessing's finalizers
+    multiprocessing.util.Finalize(None, close_worker, exitpriority=10)
+    
+    processors_dir = os.path.join(SERVER_DIR, "processors")
+    if processors_dir not in sys.path:
+        sys.path.insert(0, processors_dir)
+    try:
+        from pattern_registry import preload_patterns
+        preload_patterns()
+    except Exception as e:
+        print(f"⚠️  Could not preload patterns: {e}")
+
+
+# Custom logging function
+async def log_to_client(upload_id: str, message: str, log_type: str = "info"):
+    """Log message to console"""
+    print(message)
+
+
+# Modified pipeline runner with logging support
+def run_pipeline_with_logging(upload_id: str, workspace: Workspace):
+    """Run the processing pipeline with logging using the proper pipeline from processors/index.py"""
+    # Add processors directory to Python path
+    processors_dir = os.path.join(SERVER_DIR, "processors")
+    if processors_dir not in sys.path:
+        sys.path.insert(0, processors_dir)
+    
+    try:
+        # Import the main function from processors/index.py
+        from index import main as pipeline_main
+        
+        print(f"\n{'='*60}")
+        print(f"🚀 Starting AI TakeOff Processing Pipeline")
+        print(f"{'='*60}")
+        
+        # Run the proper pipeline that includes data.json population
+        success = pipeline_main(upload_id, workspace)
+        
+        if success:
+            print(f"🎉 All steps completed successfully!")
+        else:
+            print(f"⚠️  Pipeline completed with some failures")
+        
+        return success
+        
+    except Exception as e:
+        print(f"❌ Error running pipeline: {str(e)}")
+        return False
+
+
+def extract_job_text(file_path: str, workspace: Workspace) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Extract the PDF's text for a job without touching data.json
+    
+    Runs alongside conversion and the pipeline, which own data.json until they
+    finish; the job stores the text afterwards.
+    
+    Returns:
+        The text and per-page entries (empty if extraction failed)
+    """
+    report_progress(workspace, "ocr", "started")
+    try:
+        extracted_text, pages = read_pdf_text(
+            file_path,
+            progress_callback=lambda done, total: report_progress(workspace, "ocr", "progress", page=done, pages=total)
+        )
+        report_progress(workspace, "ocr", "completed", characters=len(extracted_text))
+        print(f"✅ Text extraction completed, {len(extracted_text)} characters extracted")
+        return extracted_text, pages
+    except Exception as text_error:
+        report_progress(workspace, "ocr", "failed", error=str(text_error))
+        print(f"⚠️  Text extraction failed: {text_error}")
+        return "", []
+
+
+# What to tell the client when a job stops at each stage
+STAGE_FAILURE_MESSAGES = {
+    "download": "Failed to download PDF from Google Drive",
+    "convert": "Failed to convert PDF to SVG",
+    "pipeline": "Processing pipeline failed",
+    "ocr": "Failed to store the extracted text",
+}
+
+
+async def process_ai_takeoff(upload_id: str, workspace: Workspace):
+    """Download, extract text, convert and run the pipeline inside the job's workspace"""
+    stage = "download"
+    text_task = None
+    try:
+        await log_to_client(upload_id, f"📄 Starting PDF download for upload_id: {upload_id}")
+        
+        # Step 1: Download the PDF
+        report_progress(workspace, "download", "started", upload_id=upload_id)
+        file_path = download_pdf_from_drive(upload_id, workspace.files_dir)
+        report_progress(workspace, "download", "completed", size=os.path.getsize(file_path))
+        await log_to_client(upload_id, f"📄 PDF downloaded successfully to: {file_path}")
+        
+        # Step 1.5: Extract text from PDF. It only needs the PDF, so it runs in a
+        # thread while the PDF is converted and the pipeline runs
+        await log_to_client(upload_id, f"📖 Extracting text from PDF in the background...")
+        text_task = asyncio.create_task(asyncio.to_thread(extract_job_text, file_path, workspace))
+        
+        # Step 2: Convert PDF to SVG
+        stage = "convert"
+        svg_path = None
+        svg_size = None
+        conversion_warning = None
+        
+        converter = get_converter()
+        if converter:
+            await log_to_client(upload_id, f"🔄 Starting PDF to SVG conversion...")
+            report_progress(workspace, "convert", "started", backend=converter.name)
+            try:
+                svg_path = workspace.path('original.svg')
+                await converter.convert(
+                    file_path,
+                    svg_path,
+                    on_progress=lambda message: report_progress(workspace, "convert", "progress", message=message)
+                )
+                await log_to_client(upload_id, f"✅ SVG saved to: {svg_path}")
+                
+                svg_size = os.path.getsize(svg_path) if os.path.exists(svg_path) else 0
+                backend = getattr(converter, "last_used", None) or converter.name
+                if backend != PIPELINE_BACKEND:
+                    # The steps' patterns only match Convertio's SVG; other output runs but counts ~nothing
+                    conversion_warning = (
+                        f"SVG was converted with {backend}, not {PIPELINE_BACKEND}; "
+                        f"the processing steps expect {PIPELINE_BACKEND}'s SVG, so counts are not reliable"
+                    )
+                    print(f"⚠️  {conversion_warning}")
+                    await log_to_client(upload_id, f"⚠️  {conversion_warning}", "warning")
+                report_progress(
+                    workspace, "convert", "completed", size=svg_size, backend=backend,
+                    **({"warning": conversion_warning} if conversion_warning else {})
+                )
+                
+                # Start the processing pipeline
+                stage = "pipeline"
+                await log_to_client(upload_id, f"🚀 Starting AI processing pipeline...")
+                report_progress(workspace, "pipeline", "started")
+                try:
+                    pipeline_success = run_pipeline_with_logging(upload_id, workspace)
+                    if pipeline_success:
+                        report_progress(workspace, "pipeline", "completed")
+                        await log_to_client(upload_id, f"✅ Processing pipeline completed successfully")
+                    else:
+                        report_progress(workspace, "pipeline", "failed")
+                        await log_to_client(upload_id, f"⚠️  Processing pipeline completed with some failures")
+                except Exception as pipeline_error:
+                    report_progress(workspace, "pipeline", "failed", error=str(pipeline_error))
+                    await log_to_client(upload_id, f"❌ Error in processing pipeline: {pipeline_error}", "error")
+                
+            except Exception as conversion_error:
+                report_progress(workspace, "convert", "failed", error=str(conversion_error))
+                await log_to_client(upload_id, f"❌ Error in SVG conversion: {conversion_error}", "error")
+        else:
+            report_progress(workspace, "convert", "skipped", message=converter_error)
+            await log_to_client(upload_id, f"⚠️  Skipping SVG conversion - {converter_error}", "warning")
+        
+        # Join the text extraction; data.json is only written here, after the pipeline is done with it
+        stage = "ocr"
+        extracted_text, text_pages = await text_task
+        if extracted_text:
+            store_text_in_data_json(extracted_text, file_path, workspace.data_json, text_pages)
+        
+        # Get file sizes
+        pdf_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        
+        # Read the data.json file that was generated by the pipeline
+        data_json_path = workspace.data_json
+        if os.path.exists(data_json_path):
+            try:
+                with open(data_json_path, 'r') as f:
+                    data_results = json.load(f)
+                
+                result = {
+                    "id": upload_id,
+                    "job_id": workspace.job_id,
+                    "status": "completed",
+                    "pdf_path": file_path,
+                    "pdf_size": pdf_size,
+                    "svg_path": svg_path,
+                    "svg_size": svg_size,
+                    "message": "AI-Takeoff processing completed successfully",
+                    "results": data_results
+                }
+            except Exception as e:
+                await log_to_client(upload_id, f"❌ Error reading data.json: {e}", "error")
+                result = {
+                    "id": upload_id,
+                    "job_id": workspace.job_id,
+                    "status": "completed",
+                    "pdf_path": file_path,
+                    "pdf_size": pdf_size,
+                    "svg_path": svg_path,
+                    "svg_size": svg_size,
+                    "message": "PDF downloaded and converted to SVG successfully, but could not read results"
+                }
+        else:
+            result = {
+                "id": upload_id,
+                "job_id": workspace.job_id,
+                "status": "completed",
+                "pdf_path": file_path,
+                "pdf_size": pdf_size,
+                "svg_path": svg_path,
+                "svg_size": svg_size,
+                "message": "PDF downloaded and converted to SVG successfully, but no results file found"
+            }
+        if conversion_warning:
+            result["warning"] = conversion_warning
+        
+    except Exception as e:
+        report_progress(workspace, stage, "failed", error=str(e))
+        await log_to_client(upload_id, f"❌ Error during {stage}: {e}", "error")
+        
+        result = {
+            "id": upload_id,
+            "status": "error",
+            "stage": stage,
+            "error": str(e),
+            "message": STAGE_FAILURE_MESSAGES[stage]
+        }
+    finally:
+        # The extraction thread can't be interrupted, so let it finish rather
+        # than leave it running after the job has returned
+        if text_task is not None and not text_task.done():
+            await asyncio.gather(text_task, return_exceptions=True)
+    
+    # Log final result
+    await log_to_client(upload_id, f"📊 Result: {result}")
+    await log_to_client(upload_id, "-" * 50)
+    
+    return result
+
+
+def run_takeoff_job(upload_id: str, job_id: str) -> Dict[str, Any]:
+    """
+    Entry point for worker processes: run a whole AI-Takeoff job in its workspace
+    
+    Args:
+        upload_id: Google Drive file ID of the PDF
+        job_id: ID of the job's workspace
+    
+    Returns:
+        The job result dictionary
+    """
+    workspace = Workspace(job_id).create(upload_id)
+    report_progress(workspace, JOB_STAGE, "started", upload_id=upload_id)
+    
+    try:
+        result = get_event_loop().run_until_complete(process_ai_takeoff(upload_id, workspace))
+    except Exception as e:
+        report_progress(workspace, JOB_STAGE, "failed", error=str(e))
+        raise
+    
+    status = "failed" if result.get("status") == "error" else "completed"
+    report_progress(workspace, JOB_STAGE, status, step_results=result.get("results", {}).get("step_results"))
+    return result
@@ -0,0 +1,246 @@
+import io
+import os
+import re
+import json
+import shutil
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+from utils.config_manager import config_manager
+
+# Absolute server directory so paths don't depend on the current working directory
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FILES_DIR = os.path.join(SERVER_DIR, "files")
+JOBS_DIR = os.path.join(FILES_DIR, "jobs")
+
+EMPTY_DATA = {
+    "step_results": {},
+    "cloudinary_urls": {},
+    "extracted_text": ""
+}
+
+_JOB_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def new_job_id() -> str:
+    """Generate a unique job id"""
+    return uuid.uuid4().hex
+
+
+def keep_artifacts_default() -> bool:
+    """Whether job workspaces write intermediate SVGs to disk (KEEP_PIPELINE_ARTIFACTS env var or pipeline.keep_artifacts)"""
+    value = os.environ.get("KEEP_PIPELINE_ARTIFACTS")
+    if value is not None:
+        return value.lower() in ("1", "true", "yes")
+    return bool(config_manager.get_pipeline_config().get("keep_artifacts", False))
+
+
+class _TextReader:
+    """Minimal read-only text stream over a string that hands out slices without copying it"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.position = 0
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            size = len(self.text) - self.position
+        chunk = self.text[self.position:self.position + size]
+        self.position += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Workspace:
+    """
+    Per-job working directory holding the downloaded PDF, the SVG intermediates,
+    the result images and the job's data.json.
+
+    A Workspace without a job_id points at the shared legacy layout
+    (files/ and data.json in the server directory), which the step scripts use
+    when run on their own from the command line.
+
+    SVG documents are handed from step to step in memory through put_svg/get_svg.
+    They are only written to disk when keep_artifacts is set (always for the
+    legacy layout, so the step scripts keep producing StepN.svg files).
+    
+    Steps that only rewrite individual elements can stream documents with
+    open_svg/svg_writer instead; when artifacts are kept those documents go
+    straight to disk and are never held in memory as a whole.
+    """
+
+    def __init__(self, job_id: Optional[str] = None, root: str = JOBS_DIR, keep_artifacts: Optional[bool] = None):
+        if job_id is not None and not _JOB_ID_PATTERN.match(job_id):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+
+        if keep_artifacts is None:
+            keep_artifacts = True if job_id is None else keep_artifacts_default()
+
+        self.job_id = job_id
+        self.keep_artifacts = keep_artifacts
+        self.documents: Dict[str, str] = {}
+        if job_id is None:
+            self.files_dir = FILES_DIR
+            self.data_json = os.path.join(SERVER_DIR, "data.json")
+        else:
+            self.files_dir = os.path.join(root, job_id)
+            self.data_json = os.path.join(self.files_dir, "data.json")
+
+    def __repr__(self) -> str:
+        return f"Workspace(job_id={self.job_id!r}, files_dir={self.files_dir!r})"
+
+    def create(self, upload_id: Optional[str] = None) -> "Workspace":
+        """Create the workspace directory and an empty data.json, recording the upload it is for"""
+        os.makedirs(self.files_dir, exist_ok=True)
+        if not os.path.exists(self.data_json):
+            data = dict(EMPTY_DATA)
+            if upload_id:
+                data["upload_id"] = upload_id
+            self.write_data(data)
+        return self
+
+    def path(self, filename: str) -> str:
+        """Absolute path of a file inside the workspace"""
+        return os.path.join(self.files_dir, filename)
+
+    def svg_path(self, name: str) -> str:
+        """Path of a named SVG document, e.g. "Step4" -> <files_dir>/Step4.svg"""
+        return self.path(f"{name}.svg")
+
+    def put_svg(self, name: str, svg_text: str) -> None:
+        """Store a step's output document, writing it to disk only if artifacts are kept"""
+        self.documents[name] = svg_text
+        if self.keep_artifacts:
+            with open(self.svg_path(name), "w", encoding="utf-8") as file:
+                file.write(svg_text)
+
+    def get_svg(self, name: str) -> Optional[str]:
+        """Return a named document from memory, falling back to <name>.svg on disk"""
+        if name in self.documents:
+            return self.documents[name]
+
+        svg_path = self.svg_path(name)
+        if not os.path.exists(svg_path):
+            return None
+        with open(svg_path, "r", encoding="utf-8") as file:
+            svg_text = file.read()
+        self.documents[name] = svg_text
+        return svg_text
+
+    def put_svg_file(self, name: str, source_path: str) -> None:
+        """Store a document from a file, copying it into place when artifacts are kept"""
+        self.documents.pop(name, None)
+        if self.keep_artifacts:
+            shutil.copyfile(source_path, self.svg_path(name))
+        else:
+            with open(source_path, "r", encoding="utf-8") as file:
+                self.documents[name] = file.read()
+
+    def open_svg(self, name: str) -> Optional[TextIO]:
+        """Open a named document for streaming reads, from memory or <name>.svg (None if missing)"""
+        if name in self.documents:
+            return _TextReader(self.documents[name])
+        svg_path = self.svg_path(name)
+        if not os.path.exists(svg_path):
+            return None
+        return open(svg_path, "r", encoding="utf-8")
+
+    @contextmanager
+    def svg_writer(self, name: str) -> Iterator[TextIO]:
+        """
+        Stream a step's output document: written straight to <name>.svg when
+        artifacts are kept, otherwise collected in memory like put_svg
+        """
+        self.documents.pop(name, None)
+        if not self.keep_artifacts:
+            buffer = io.StringIO()
+            yield buffer
+            self.documents[name] = buffer.getvalue()
+            return
+        
+        part_path = self.svg_path(name) + ".part"
+        try:
+            with open(part_path, "w", encoding="utf-8") as file:
+                yield file
+            os.replace(part_path, self.svg_path(name))
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def has_svg(self, name: str) -> bool:
+        """True if the named document is in memory or on disk"""
+        return name in self.documents or os.path.exists(self.svg_path(name))
+
+    def release_svg(self, name: str) -> None:
+        """Drop a document that no later step needs from memory"""
+        self.documents.pop(name, None)
+
+    def read_data(self) -> Dict[str, Any]:
+        """Read the workspace data.json (empty dict if missing or invalid)"""
+        try:
+            with open(self.data_json, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def write_data(self, data: Dict[str, Any]) -> None:
+        """Write the workspace data.json"""
+        with open(self.data_json, 'w') as f:
+            json.dump(data, f, indent=4)
+
+    def cleanup(self) -> None:
+        """Remove this job's files. The shared workspace is emptied and its data.json reset."""
+        try:
+            if self.job_id is not None:
+                if os.path.exists(self.files_dir):
+                    shutil.rmtree(self.files_dir)
+                print(f"✅ Workspace {self.job_id} removed")
+                return
+
+            if os.path.exists(self.files_dir):
+                for filename in os.listdir(self.files_dir):
+                    file_path = os.path.join(self.files_dir, filename)
+                    # Never touch other jobs' workspaces
+                    if os.path.abspath(file_path) == os.path.abspath(JOBS_DIR):
+                        continue
+                    try:
+                        if os.path.isfile(file_path) or os.path.islink(file_path):
+                            os.unlink(file_path)
+                        elif os.path.isdir(file_path):
+                            shutil.rmtree(file_path)
+                    except Exception as e:
+                        print(f"Failed to delete {file_path}. Reason: {e}")
+                print("✅ Files folder cleared successfully")
+
+            self.write_data(dict(EMPTY_DATA))
+            print("✅ data.json reset to empty structure")
+
+        except Exception as e:
+            print(f"❌ Error during cleanup: {e}")
+
+
+def find_workspace_for_upload(upload_id: str, root: str = JOBS_DIR) -> Optional[Workspace]:
+    """Return the most recent job workspace whose data.json belongs to upload_id"""
+    if not os.path.isdir(root):
+        return None
+
+    candidates = []
+    for job_id in os.listdir(root):
+        if not _JOB_ID_PATTERN.match(job_id):
+            continue
+        workspace = Workspace(job_id, root)
+        if workspace.read_data().get('upload_id') == upload_id:
+            candidates.append((os.path.getmtime(workspace.data_json), workspace))
+
+    if not candidates:
+        return None
+    return max(candidates, key=lambda item: item[0])[1]